@@ -0,0 +1,135 @@
+"""
+Registro de actividad del admin
+
+Cada cambio hecho desde el panel (CRUD de productos, ofertas, noticias,
+carrusel, contenidos y categorías, y cambios de estado de pedidos y
+reservas) añade una fila a activity_log en la misma transacción. La tabla
+está acotada a ACTIVITY_LOG_CAP filas: al insertar se borran las más
+antiguas por rango de id.
+
+El dashboard lee la actividad reciente de un buffer circular en memoria.
+Solo se consulta la base de datos cuando la caché de consultas detecta que
+alguien (este u otro worker) ha escrito en el registro, y entonces solo se
+leen las filas nuevas.
+"""
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import db_pool
+import query_cache
+
+ACTIVITY_LOG_CAP = int(os.getenv("ACTIVITY_LOG_CAP", "10000"))
+RING_SIZE = int(os.getenv("ACTIVITY_RING_SIZE", "50"))
+
+# Nombre legible de cada tipo de elemento, leído mientras la fila existe
+DESCRIBE_SQL = {
+    "product": "SELECT name FROM products WHERE id = ?",
+    "special": '''
+        SELECT p.name || ' ' || CAST(s.discount AS INTEGER) || '% OFF'
+        FROM specials s JOIN products p ON p.id = s.product_id WHERE s.id = ?
+    ''',
+    "category": "SELECT name FROM product_categories WHERE id = ?",
+    "news": "SELECT title FROM news_articles WHERE id = ?",
+    "carousel": "SELECT title FROM carousel_images WHERE id = ?",
+    "content": "SELECT page || ' / ' || title FROM page_content WHERE id = ?",
+    "order": "SELECT '#' || id || ' ' || customer_name FROM orders WHERE id = ?",
+    "reservation": "SELECT '#' || id || ' ' || customer_name FROM reservations WHERE id = ?",
+}
+
+COLUMNS = "id, action, item, entity, entity_id, actor, created_at"
+
+def create_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS activity_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            item TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            entity_id TEXT,
+            actor TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_log_created ON activity_log (created_at)")
+
+def record(cursor, action: str, entity: str, entity_id, actor: str = None):
+    """
+    Registrar un cambio en la transacción del llamador. Debe llamarse
+    mientras la fila existe (después de crearla o editarla, antes de borrarla).
+    """
+    cursor.execute(DESCRIBE_SQL[entity], (entity_id,))
+    row = cursor.fetchone()
+    item = row[0] if row and row[0] else f"#{entity_id}"
+
+    cursor.execute('''
+        INSERT INTO activity_log (action, item, entity, entity_id, actor)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (action, item, entity, str(entity_id), actor))
+    # Tabla acotada: descartar lo que quede fuera de las últimas ACTIVITY_LOG_CAP filas
+    cursor.execute("DELETE FROM activity_log WHERE id <= ?", (cursor.lastrowid - ACTIVITY_LOG_CAP,))
+    query_cache.bump_versions(cursor, "activity")
+
+def time_ago(created_at: str, now: datetime = None) -> str:
+    """'Hace 5min', 'Hace 2h', 'Hace 3d' a partir de un timestamp UTC de SQLite"""
+    try:
+        created = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return created_at or ""
+    minutes = max(0, int(((now or datetime.utcnow()) - created).total_seconds() // 60))
+    if minutes < 60:
+        return f"Hace {minutes}min"
+    if minutes < 1440:
+        return f"Hace {minutes // 60}h"
+    return f"Hace {minutes // 1440}d"
+
+class ActivityFeed:
+    """Buffer circular con las últimas RING_SIZE entradas del registro"""
+
+    def __init__(self, size: int = RING_SIZE):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._seen_version = None
+
+    def _load_new(self):
+        conn = db_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {COLUMNS} FROM activity_log
+                WHERE id > ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (self._last_id, self._entries.maxlen))
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+        for row in reversed(rows):
+            self._entries.append(dict(zip(COLUMNS.split(", "), row)))
+            self._last_id = row[0]
+
+    def recent(self, limit: int = 10) -> list:
+        """Últimas entradas, la más reciente primero"""
+        # Versión compartida de cache_versions (comprobada como mucho una vez
+        # por CACHE_SYNC_INTERVAL), igual que los ETag de la caché
+        cache = query_cache.cache
+        if cache.watcher is not None:
+            cache.sync()
+            version = cache.watcher.version("activity")
+        else:
+            version = cache.version("activity")
+        with self._lock:
+            if version != self._seen_version:
+                # Si la carga falla se vuelve a intentar en la siguiente llamada
+                self._load_new()
+                self._seen_version = version
+            entries = list(self._entries)[-limit:]
+        now = datetime.utcnow()
+        return [
+            {**entry, "time": time_ago(entry["created_at"], now)}
+            for entry in reversed(entries)
+        ]
+
+feed = ActivityFeed()
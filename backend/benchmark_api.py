@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia de la API
+
+Mide la latencia de GET /products mientras varios hilos crean pedidos
+(POST /orders) en paralelo. Requiere el servidor en marcha:
+
+    uvicorn main:app --port 8000
+    python benchmark_api.py --readers 8 --writers 4 --duration 20
+
+Para comparar las respuestas pre-serializadas con la serialización de
+FastAPI en cada petición, medir solo lecturas con cada modo del servidor:
+
+    PRESERIALIZE_RESPONSES=false uvicorn main:app --port 8000
+    python benchmark_api.py --writers 0 --path /products
+    uvicorn main:app --port 8000
+    python benchmark_api.py --writers 0 --path /products
+
+Resultado de referencia (1 CPU compartida con el cliente, 8 lectores, 10 s,
+/products con 308 productos ≈ 70 KB de JSON):
+
+    PRESERIALIZE_RESPONSES=false   ≈ 280 req/s, p50 29 ms, p95 40 ms
+    pre-serializado (por defecto)  ≈ 345 req/s, p50 22 ms, p95 34 ms
+
+Con los datos de ejemplo (8 productos) no hay diferencia medible en
+/products, /news ni /carousel (≈ 350 req/s en ambos modos): el límite es
+el propio cliente y el servidor, no la serialización.
+
+Como prueba de estrés de escritura (pedidos + notificación en la misma
+transacción), lanzar muchos escritores y comprobar que no hay errores HTTP 500
+por "database is locked":
+
+    python benchmark_api.py --readers 0 --writers 32 --duration 30
+
+Para medir la valoración de pedidos grandes en el servidor (precios
+resueltos con el índice en memoria), enviar pedidos de 50 líneas o más:
+
+    python benchmark_api.py --readers 0 --writers 4 --order-lines 60
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+import requests
+
+BASE_URL = "http://localhost:8000"
+
+def percentile(samples, pct):
+    """Percentil por rango más cercano"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def summarize(name, samples, errors, duration):
+    """Imprimir resumen de latencias en milisegundos"""
+    print(f"\n📊 {name}")
+    print(f"   Peticiones: {len(samples)} ({len(samples) / duration:.1f} req/s), errores: {sum(errors.values())}")
+    for reason, count in errors.most_common():
+        print(f"   ✗ {reason}: {count}")
+    if samples:
+        print(f"   p50: {percentile(samples, 50):.1f} ms")
+        print(f"   p95: {percentile(samples, 95):.1f} ms")
+        print(f"   p99: {percentile(samples, 99):.1f} ms")
+        print(f"   máx: {max(samples):.1f} ms")
+
+def run_worker(method, path, payload, stop_event, samples, errors, lock):
+    """Lanzar peticiones en bucle hasta que se active stop_event"""
+    session = requests.Session()
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        error = None
+        try:
+            response = session.request(method, f"{BASE_URL}{path}", json=payload, timeout=30)
+            if response.status_code >= 400:
+                # "database is locked" llega como HTTP 500
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            if error is None:
+                samples.append(elapsed_ms)
+            else:
+                errors[error] += 1
+
+def sample_order(lines=1):
+    """Pedido de prueba con `lines` líneas repartidas entre los productos disponibles"""
+    products = requests.get(f"{BASE_URL}/products", timeout=10).json()
+    return {
+        "customer_name": "Benchmark",
+        "customer_email": "benchmark@example.com",
+        "items": [{
+            "product_id": product["id"],
+            "product_name": product["name"],
+            "quantity": 1,
+            "price": product["price"]
+        } for product in (products[i % len(products)] for i in range(lines))]
+    }
+
+def main():
+    global BASE_URL
+    parser = argparse.ArgumentParser(description="Latencia de GET /products con POST /orders concurrentes")
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--path", default="/products", help="Endpoint GET a medir")
+    parser.add_argument("--readers", type=int, default=8, help="Hilos haciendo GET")
+    parser.add_argument("--writers", type=int, default=4, help="Hilos haciendo POST /orders")
+    parser.add_argument("--duration", type=float, default=20, help="Duración en segundos")
+    parser.add_argument("--order-lines", type=int, default=1, help="Líneas por pedido")
+    args = parser.parse_args()
+    BASE_URL = args.url.rstrip("/")
+
+    order = sample_order(args.order_lines) if args.writers else None
+    stop_event = threading.Event()
+    lock = threading.Lock()
+    read_samples, read_errors = [], Counter()
+    write_samples, write_errors = [], Counter()
+
+    threads = [
+        threading.Thread(target=run_worker, args=("GET", args.path, None, stop_event, read_samples, read_errors, lock))
+        for _ in range(args.readers)
+    ] + [
+        threading.Thread(target=run_worker, args=("POST", "/orders", order, stop_event, write_samples, write_errors, lock))
+        for _ in range(args.writers)
+    ]
+
+    print(f"🚀 {args.readers} lectores + {args.writers} escritores durante {args.duration}s contra {BASE_URL}")
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+
+    summarize(f"GET {args.path}", read_samples, read_errors, args.duration)
+    if args.writers:
+        summarize(f"POST /orders ({args.order_lines} líneas)", write_samples, write_errors, args.duration)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Resúmenes diarios de pedidos y reservas
+
+Tres tablas agregadas por día y estado (pedidos e ingresos, unidades por
+producto y reservas) que se actualizan en la misma transacción que cada
+escritura: antes de modificar un pedido o una reserva se resta su
+aportación (apply_order(cursor, id, -1)) y después se vuelve a sumar con los
+datos nuevos (+1). Las estadísticas del admin leen unas pocas filas en vez
+de recorrer todo el histórico.
+
+Para reconstruirlas desde cero (por ejemplo tras cambios manuales en la
+base de datos):
+
+    python daily_rollups.py
+"""
+import db_pool
+
+# Estados que cuentan como ingresos (los mismos que las estadísticas de pedidos)
+REVENUE_STATUSES = ("completed", "pending")
+
+def create_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_order_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_product_sales (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_name TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status, product_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_reservation_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            reservations INTEGER NOT NULL DEFAULT 0,
+            guests INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        ) WITHOUT ROWID
+    ''')
+
+def apply_order(cursor, order_id: int, sign: int):
+    """Sumar (sign=1) o restar (sign=-1) la aportación de un pedido a los resúmenes"""
+    cursor.execute(
+        "SELECT date(created_at), COALESCE(status, 'pending'), total_amount FROM orders WHERE id = ?",
+        (order_id,)
+    )
+    order = cursor.fetchone()
+    if order is None:
+        return
+    day, status, total = order
+
+    cursor.execute('''
+        INSERT INTO daily_order_stats (day, status, orders, revenue) VALUES (?, ?, ?, ?)
+        ON CONFLICT(day, status) DO UPDATE SET
+            orders = orders + excluded.orders,
+            revenue = revenue + excluded.revenue
+    ''', (day, status, sign, sign * (total or 0)))
+
+    cursor.execute('''
+        SELECT product_id, MAX(product_name), SUM(quantity), SUM(quantity * unit_price)
+        FROM order_items WHERE order_id = ?
+        GROUP BY product_id
+    ''', (order_id,))
+    cursor.executemany('''
+        INSERT INTO daily_product_sales (day, status, product_id, product_name, orders, units, revenue)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(day, status, product_id) DO UPDATE SET
+            orders = orders + excluded.orders,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue
+    ''', [
+        (day, status, product_id, name, sign, sign * units, sign * revenue)
+        for product_id, name, units, revenue in cursor.fetchall()
+    ])
+
+def apply_reservation(cursor, reservation_id: int, sign: int):
+    """Sumar (sign=1) o restar (sign=-1) la aportación de una reserva a los resúmenes"""
+    cursor.execute(
+        "SELECT reservation_date, COALESCE(status, 'pending'), party_size FROM reservations WHERE id = ?",
+        (reservation_id,)
+    )
+    reservation = cursor.fetchone()
+    if reservation is None:
+        return
+    day, status, guests = reservation
+    cursor.execute('''
+        INSERT INTO daily_reservation_stats (day, status, reservations, guests) VALUES (?, ?, ?, ?)
+        ON CONFLICT(day, status) DO UPDATE SET
+            reservations = reservations + excluded.reservations,
+            guests = guests + excluded.guests
+    ''', (day, status, sign, sign * (guests or 0)))
+
+def rebuild(cursor) -> dict:
+    """Recalcular todos los resúmenes desde orders, order_items y reservations"""
+    cursor.execute("DELETE FROM daily_order_stats")
+    cursor.execute('''
+        INSERT INTO daily_order_stats (day, status, orders, revenue)
+        SELECT date(created_at), COALESCE(status, 'pending'), COUNT(*), COALESCE(SUM(total_amount), 0)
+        FROM orders
+        GROUP BY 1, 2
+    ''')
+    cursor.execute("DELETE FROM daily_product_sales")
+    cursor.execute('''
+        INSERT INTO daily_product_sales (day, status, product_id, product_name, orders, units, revenue)
+        SELECT date(o.created_at), COALESCE(o.status, 'pending'), i.product_id, MAX(i.product_name),
+               COUNT(DISTINCT i.order_id), SUM(i.quantity), SUM(i.quantity * i.unit_price)
+        FROM order_items i
+        JOIN orders o ON o.id = i.order_id
+        GROUP BY 1, 2, 3
+    ''')
+    cursor.execute("DELETE FROM daily_reservation_stats")
+    cursor.execute('''
+        INSERT INTO daily_reservation_stats (day, status, reservations, guests)
+        SELECT reservation_date, COALESCE(status, 'pending'), COUNT(*), COALESCE(SUM(party_size), 0)
+        FROM reservations
+        GROUP BY 1, 2
+    ''')
+
+    counts = {}
+    for table in ("daily_order_stats", "daily_product_sales", "daily_reservation_stats"):
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+def needs_backfill(cursor) -> bool:
+    """Resúmenes vacíos con pedidos o reservas ya guardados (primera ejecución)"""
+    cursor.execute('''
+        SELECT (SELECT COUNT(*) FROM daily_order_stats) + (SELECT COUNT(*) FROM daily_reservation_stats) = 0
+           AND (EXISTS (SELECT 1 FROM orders) OR EXISTS (SELECT 1 FROM reservations))
+    ''')
+    return bool(cursor.fetchone()[0])
+
+def order_totals(cursor) -> dict:
+    """Pedidos e ingresos por estado de todo el histórico"""
+    cursor.execute('''
+        SELECT status, SUM(orders), SUM(revenue)
+        FROM daily_order_stats
+        GROUP BY status
+    ''')
+    return {status: (orders, revenue) for status, orders, revenue in cursor.fetchall()}
+
+def reservation_totals(cursor, day: str = None) -> dict:
+    """Reservas por estado, de todo el histórico o de un día"""
+    if day:
+        cursor.execute('''
+            SELECT status, reservations FROM daily_reservation_stats WHERE day = ?
+        ''', (day,))
+    else:
+        cursor.execute('''
+            SELECT status, SUM(reservations) FROM daily_reservation_stats GROUP BY status
+        ''')
+    return {status: count for status, count in cursor.fetchall()}
+
+def product_sales(cursor, limit: int = 10, date_from: str = None, date_to: str = None) -> list:
+    """Unidades, ingresos y pedidos por producto en un rango de días (ambos inclusive)"""
+    conditions = [f"status IN ({', '.join('?' for _ in REVENUE_STATUSES)})"]
+    params = list(REVENUE_STATUSES)
+    if date_from:
+        conditions.append("day >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("day <= ?")
+        params.append(date_to)
+    cursor.execute(f'''
+        SELECT product_id, MAX(product_name), SUM(units), SUM(revenue), SUM(orders)
+        FROM daily_product_sales
+        WHERE {" AND ".join(conditions)}
+        GROUP BY product_id
+        HAVING SUM(units) > 0
+        ORDER BY SUM(revenue) DESC
+        LIMIT ?
+    ''', (*params, limit))
+    return [
+        {
+            "product_id": row[0],
+            "product_name": row[1],
+            "units_sold": row[2],
+            "revenue": round(row[3] or 0, 2),
+            "orders": row[4],
+        } for row in cursor.fetchall()
+    ]
+
+def main():
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        counts = rebuild(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"📊 Resúmenes diarios reconstruidos: {counts}")
+
+if __name__ == "__main__":
+    main()
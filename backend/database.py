@@ -3,7 +3,7 @@ Configuración de base de datos con SQLAlchemy
 Soporta tanto SQLite (desarrollo) como PostgreSQL (producción)
 """
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
@@ -112,6 +112,11 @@ class ContactMessage(Base):
     subject = Column(String, nullable=False)
     message = Column(Text, nullable=False)
     created_at = Column(DateTime, default=func.now())
+    
+    # Paginación por cursor de los listados del admin
+    __table_args__ = (
+        Index("idx_contact_messages_created", "created_at", "id"),
+    )
 
 class NewsletterSubscriber(Base):
     __tablename__ = "newsletter_subscribers"
@@ -121,6 +126,11 @@ class NewsletterSubscriber(Base):
     name = Column(String)
     subscribed_at = Column(DateTime, default=func.now())
     active = Column(Boolean, default=True)
+    
+    # Paginación por cursor de los listados del admin
+    __table_args__ = (
+        Index("idx_newsletter_subscribers_active_subscribed", "active", "subscribed_at", "id"),
+    )
 
 class JobApplication(Base):
     __tablename__ = "job_applications"
@@ -134,6 +144,11 @@ class JobApplication(Base):
     motivation = Column(Text, nullable=False)
     cv_filename = Column(String)
     created_at = Column(DateTime, default=func.now())
+    
+    # Paginación por cursor de los listados del admin
+    __table_args__ = (
+        Index("idx_job_applications_created", "created_at", "id"),
+    )
 
 class Order(Base):
     __tablename__ = "orders"
@@ -147,6 +162,24 @@ class Order(Base):
     notes = Column(Text)
     status = Column(String, default="pending")  # pending, completed, cancelled
     created_at = Column(DateTime, default=func.now())
+    
+    # Paginación por cursor de los listados del admin
+    __table_args__ = (
+        Index("idx_orders_created", "created_at", "id"),
+        Index("idx_orders_status_created", "status", "created_at", "id"),
+    )
+
+class OrderItemRow(Base):
+    __tablename__ = "order_items"
+    
+    # Líneas de pedido normalizadas (orders.items queda como copia JSON)
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False, index=True)
+    product_name = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)
+    notes = Column(Text)
 
 class Reservation(Base):
     __tablename__ = "reservations"
@@ -161,6 +194,12 @@ class Reservation(Base):
     notes = Column(Text)
     status = Column(String, default="pending")  # pending, confirmed, cancelled
     created_at = Column(DateTime, default=func.now())
+    
+    # Paginación por cursor de los listados del admin
+    __table_args__ = (
+        Index("idx_reservations_created", "created_at", "id"),
+        Index("idx_reservations_status_created", "status", "created_at", "id"),
+    )
 
 class AdminNotification(Base):
     __tablename__ = "admin_notifications"
@@ -172,6 +211,18 @@ class AdminNotification(Base):
     related_id = Column(Integer)  # ID del elemento relacionado
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=func.now())
+    
+    __table_args__ = (
+        Index("idx_admin_notifications_read_created", "is_read", "created_at"),
+        Index("idx_admin_notifications_created", "created_at"),
+    )
+
+class NotificationCounter(Base):
+    __tablename__ = "notification_counters"
+    
+    # No leídos por tipo, actualizados en la misma transacción que admin_notifications
+    type = Column(String, primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
 
 # ================================
 # FUNCIONES DE SESIÓN
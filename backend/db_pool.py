@@ -0,0 +1,291 @@
+"""
+Pool de conexiones SQLite reutilizables por hilo
+
+Cada hilo conserva sus conexiones abiertas y las reutiliza entre peticiones,
+de modo que los PRAGMAs y el esquema solo se procesan una vez por conexión.
+
+Las escrituras que leen y deciden en la misma transacción (por ejemplo,
+comprobar la capacidad antes de reservar) usan write_transaction(): toma
+el bloqueo de escritura desde el principio con BEGIN IMMEDIATE y reintenta
+unas pocas veces si la base de datos sigue ocupada.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# Configuración del pool (variables de entorno opcionales)
+SQLITE_PATH = os.getenv("SQLITE_PATH", "cafe.db")
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "16"))
+POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("SQLITE_HEALTH_CHECK_INTERVAL", "30"))
+MAX_IDLE_PER_THREAD = 2
+# Intentos de BEGIN IMMEDIATE (cada uno espera hasta BUSY_TIMEOUT_MS)
+WRITE_RETRIES = int(os.getenv("SQLITE_WRITE_RETRIES", "3"))
+# Hilos de trabajo para los endpoints síncronos que acceden a la base de datos
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "32"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+class PoolTimeout(Exception):
+    """No se obtuvo una conexión libre dentro del tiempo de espera"""
+
+class WriteBusy(Exception):
+    """No se obtuvo el bloqueo de escritura tras WRITE_RETRIES intentos"""
+
+class PooledConnection:
+    """
+    Envoltorio de sqlite3.Connection: close() devuelve la conexión al pool
+    en lugar de cerrarla. El resto de métodos se delegan a la conexión real.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def cursor(self):
+        return self._raw.cursor()
+
+    def execute(self, sql, parameters=()):
+        return self._raw.execute(sql, parameters)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        finally:
+            self.close()
+
+    def __del__(self):
+        # Red de seguridad: una conexión olvidada sin close() no debe agotar el pool
+        if not getattr(self, "_released", True):
+            self.close()
+
+class _ThreadIdle:
+    """Conexiones libres de un hilo; se cierran cuando el hilo termina"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.connections = []
+
+    def __del__(self):
+        for raw, _ in self.connections:
+            self.pool._discard(raw)
+        self.connections = []
+
+class SQLitePool:
+    """Pool de conexiones SQLite con afinidad por hilo y métricas"""
+
+    def __init__(self, path: str = SQLITE_PATH, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._local = threading.local()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "opened": 0,
+            "closed": 0,
+            "reused": 0,
+            "in_use": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total_ms": 0.0,
+            "wait_time_max_ms": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+        }
+
+    def _idle(self) -> list:
+        holder = getattr(self._local, "idle", None)
+        if holder is None:
+            holder = _ThreadIdle(self)
+            self._local.idle = holder
+        return holder.connections
+
+    def _open(self) -> sqlite3.Connection:
+        raw = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        for pragma in PRAGMAS:
+            raw.execute(pragma)
+        with self._lock:
+            self._stats["opened"] += 1
+        return raw
+
+    def _discard(self, raw: sqlite3.Connection):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["closed"] += 1
+
+    def _healthy(self, raw: sqlite3.Connection) -> bool:
+        try:
+            raw.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def connect(self) -> PooledConnection:
+        """Obtener una conexión del pool (reutilizando la del hilo actual si existe)"""
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"No hay conexiones SQLite libres tras {self.timeout}s")
+            waited_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._stats["waits"] += 1
+                self._stats["wait_time_total_ms"] += waited_ms
+                self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], waited_ms)
+
+        try:
+            raw = None
+            idle = self._idle()
+            while idle:
+                candidate, last_used = idle.pop()
+                if time.monotonic() - last_used < HEALTH_CHECK_INTERVAL or self._healthy(candidate):
+                    raw = candidate
+                    break
+                self._discard(candidate)
+
+            reused = raw is not None
+            if raw is None:
+                raw = self._open()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            if reused:
+                self._stats["reused"] += 1
+        return PooledConnection(self, raw)
+
+    def _release(self, raw: sqlite3.Connection):
+        try:
+            # Nunca devolver al pool una transacción a medias
+            if raw.in_transaction:
+                raw.rollback()
+            idle = self._idle()
+            if len(idle) < MAX_IDLE_PER_THREAD:
+                idle.append((raw, time.monotonic()))
+            else:
+                self._discard(raw)
+        except sqlite3.Error:
+            self._discard(raw)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Métricas del pool: tamaño, conexiones abiertas/en uso y esperas"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_size"] = self.max_size
+        stats["open"] = stats["opened"] - stats["closed"]
+        stats["wait_time_avg_ms"] = round(stats["wait_time_total_ms"] / stats["waits"], 3) if stats["waits"] else 0.0
+        stats["wait_time_total_ms"] = round(stats["wait_time_total_ms"], 3)
+        stats["wait_time_max_ms"] = round(stats["wait_time_max_ms"], 3)
+        return stats
+
+    def health(self) -> dict:
+        """Comprobar que la base de datos responde y devolver las métricas"""
+        try:
+            conn = self.connect()
+            try:
+                conn.execute("SELECT 1").fetchone()
+            finally:
+                conn.close()
+            healthy = True
+        except (sqlite3.Error, PoolTimeout) as e:
+            print(f"❌ Health check SQLite fallido: {e}")
+            healthy = False
+        return {"type": "SQLite", "path": self.path, "healthy": healthy, "pool": self.stats()}
+
+# Pool global compartido por toda la aplicación
+pool = SQLitePool()
+
+def connect() -> PooledConnection:
+    """Sustituto de sqlite3.connect('cafe.db') que reutiliza conexiones"""
+    return pool.connect()
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def write_transaction(work, retries: int = WRITE_RETRIES):
+    """
+    Ejecutar work(cursor) en una transacción BEGIN IMMEDIATE y hacer commit.
+
+    Con el bloqueo tomado antes de la primera lectura, nadie puede escribir
+    entre lo que work() comprueba y lo que inserta. Si la base de datos está
+    ocupada se deshace todo y se reintenta con una espera creciente; tras
+    `retries` intentos se lanza WriteBusy. Las excepciones de work() hacen
+    rollback y se propagan sin reintentar. Devuelve lo que devuelva work().
+    """
+    for attempt in range(1, retries + 1):
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            result = work(cursor)
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            print(f"⏳ Base de datos ocupada (intento {attempt}/{retries}): {e}")
+        finally:
+            # Devolver la conexión deshace la transacción si no hubo commit
+            conn.close()
+        if attempt < retries:
+            time.sleep(random.uniform(0.05, 0.2) * attempt)
+    raise WriteBusy(f"Base de datos ocupada tras {retries} intentos")
+
+def configure_worker_threads(max_workers: int = DB_MAX_WORKERS):
+    """
+    Limitar el pool de hilos donde FastAPI ejecuta los endpoints declarados
+    con def. Las consultas SQLite bloqueantes corren ahí y no en el event loop;
+    la concurrencia real contra la base de datos queda acotada por POOL_SIZE.
+    Debe llamarse desde el event loop (evento de arranque).
+    """
+    from anyio import to_thread
+    to_thread.current_default_thread_limiter().total_tokens = max_workers
+    print(f"🧵 Hilos de base de datos: {max_workers} (conexiones máx.: {pool.max_size})")
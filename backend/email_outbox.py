@@ -0,0 +1,167 @@
+"""
+Bandeja de salida transaccional de emails
+
+Los endpoints insertan los emails en la tabla email_outbox dentro de la misma
+transacción que el pedido/reserva/mensaje y responden en cuanto hacen commit.
+Un hilo en segundo plano envía los emails pendientes con reintentos y
+espera exponencial entre intentos.
+"""
+import os
+import threading
+import time
+
+import db_pool
+import mailer
+
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "30"))
+BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+# Tiempo durante el que un email en envío queda reservado para un worker
+LEASE_SECONDS = 120
+
+def enqueue_email(cursor, subject: str, body: str, recipient: str) -> int:
+    """
+    Añadir un email a la bandeja de salida usando el cursor del llamador,
+    de modo que se guarda (o se descarta) junto con su transacción.
+    """
+    cursor.execute('''
+        INSERT INTO email_outbox (recipient, subject, body, next_attempt_at)
+        VALUES (?, ?, ?, ?)
+    ''', (recipient, subject, body, time.time()))
+    return cursor.lastrowid
+
+def backoff_delay(attempts: int) -> float:
+    """Espera antes del siguiente intento: base * 2^(intentos-1), con tope"""
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+
+class OutboxWorker(threading.Thread):
+    """Hilo que vacía la bandeja de salida"""
+
+    def __init__(self):
+        super().__init__(name="email-outbox", daemon=True)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        """Despertar al worker tras un commit para no esperar al siguiente sondeo"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        print("📮 Worker de emails iniciado")
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                print(f"❌ Error en el worker de emails: {e}")
+                processed = 0
+            # Si el lote estaba lleno probablemente quedan más emails pendientes
+            if processed < BATCH_SIZE:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+
+    def claim_batch(self) -> list:
+        """Reservar emails pendientes para este worker (seguro entre procesos)"""
+        now = time.time()
+        conn = db_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, recipient, subject, body, attempts
+                FROM email_outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at
+                LIMIT ?
+            ''', (now, BATCH_SIZE))
+            candidates = cursor.fetchall()
+
+            claimed = []
+            for row in candidates:
+                # El UPDATE condicional evita que dos workers envíen el mismo email
+                cursor.execute('''
+                    UPDATE email_outbox
+                    SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                    WHERE id = ? AND attempts = ? AND next_attempt_at <= ?
+                ''', (now + LEASE_SECONDS, row[0], row[4], now))
+                if cursor.rowcount == 1:
+                    claimed.append((row[0], row[1], row[2], row[3], row[4] + 1))
+            conn.commit()
+            return claimed
+        finally:
+            conn.close()
+
+    def process_batch(self) -> int:
+        claimed = self.claim_batch()
+        for email_id, recipient, subject, body, attempts in claimed:
+            try:
+                mailer.deliver(subject, body, recipient)
+                self.mark_sent(email_id)
+                print(f"✅ Email #{email_id} enviado a {recipient}")
+            except Exception as e:
+                self.mark_failed(email_id, attempts, e)
+        return len(claimed)
+
+    def mark_sent(self, email_id: int):
+        conn = db_pool.connect()
+        try:
+            conn.execute('''
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+                WHERE id = ?
+            ''', (email_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def mark_failed(self, email_id: int, attempts: int, error: Exception):
+        if attempts >= MAX_ATTEMPTS:
+            status, next_attempt_at = 'failed', time.time()
+            print(f"❌ Email #{email_id} descartado tras {attempts} intentos: {error}")
+        else:
+            status, next_attempt_at = 'pending', time.time() + backoff_delay(attempts)
+            print(f"⚠️ Email #{email_id} falló (intento {attempts}), reintento en {backoff_delay(attempts):.0f}s: {error}")
+
+        conn = db_pool.connect()
+        try:
+            conn.execute('''
+                UPDATE email_outbox
+                SET status = ?, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+            ''', (status, next_attempt_at, str(error)[:500], email_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+_worker = None
+
+def start_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = OutboxWorker()
+        _worker.start()
+
+def stop_worker():
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+def wake_worker():
+    if _worker is not None:
+        _worker.wake()
+
+def outbox_stats() -> dict:
+    """Número de emails por estado en la bandeja de salida"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    finally:
+        conn.close()
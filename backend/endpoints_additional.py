@@ -1,7 +1,7 @@
 """
 Endpoints adicionales para orders, reservations, news
 """
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Response, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, date
@@ -11,9 +11,10 @@ from database import (
 )
 from main_new import (
     OrderCreate, OrderResponse, ReservationCreate, ReservationResponse, 
-    NewsArticleResponse, verify_token, JobApplicationModel
+    NewsArticleResponse, verify_token, JobApplicationModel, admin_page
 )
 from utils import create_admin_notification, serialize_json, deserialize_json
+import reservation_capacity
 
 def setup_additional_routes(app):
     
@@ -68,8 +69,24 @@ def setup_additional_routes(app):
             raise HTTPException(status_code=500, detail="Error interno del servidor")
     
     @app.get("/admin/orders", summary="[ADMIN] Obtener todos los pedidos")
-    async def get_admin_orders(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-        orders = db.query(Order).order_by(Order.created_at.desc()).all()
+    async def get_admin_orders(
+        response: Response,
+        after: Optional[str] = Query(None, alias="cursor"),
+        limit: int = Query(100, ge=1, le=500),
+        order: str = "desc",
+        status: Optional[str] = None,
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        current_user: str = Depends(verify_token),
+        db: Session = Depends(get_db)
+    ):
+        query = db.query(Order)
+        if status:
+            query = query.filter(Order.status == status)
+        orders = admin_page(
+            response, query, (Order.created_at,), Order.id,
+            after, limit, order, Order.created_at, date_from, date_to
+        )
         
         return [
             {
@@ -135,35 +152,61 @@ def setup_additional_routes(app):
             raise HTTPException(status_code=500, detail="Error interno del servidor")
     
     @app.get("/reservations/availability/{reservation_date}", summary="Verificar disponibilidad")
-    async def check_availability(reservation_date: str, db: Session = Depends(get_db)):
-        """Endpoint básico de disponibilidad - siempre disponible por ahora"""
-        # Crear horarios con la estructura que espera el frontend
-        time_slots = [
-            "09:00", "09:30", "10:00", "10:30", "11:00", "11:30",
-            "12:00", "12:30", "13:00", "13:30", "14:00", "14:30",
-            "15:00", "15:30", "16:00", "16:30", "17:00", "17:30",
-            "18:00", "18:30", "19:00", "19:30", "20:00", "20:30"
-        ]
+    async def check_availability(reservation_date: str, party_size: int = 1, db: Session = Depends(get_db)):
+        """Asientos libres en cada hora de inicio según las reservas activas del día"""
+        try:
+            datetime.strptime(reservation_date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
         
-        # Convertir a la estructura que espera el frontend
-        available_times = [
-            {
+        reservations = db.query(Reservation.reservation_time, Reservation.party_size).filter(
+            Reservation.reservation_date == reservation_date,
+            Reservation.status.in_(reservation_capacity.ACTIVE_STATUSES)
+        ).all()
+        
+        occupancy = [0] * reservation_capacity.SLOT_COUNT
+        for reservation_time, reserved_seats in reservations:
+            try:
+                slots = reservation_capacity.slot_range(reservation_time)
+            except reservation_capacity.CapacityError:
+                continue
+            for slot in slots:
+                occupancy[slot] += reserved_seats or 0
+        
+        available_times = []
+        for time_slot in reservation_capacity.slot_times():
+            free = reservation_capacity.seats_free(occupancy, reservation_capacity.slot_range(time_slot))
+            available_times.append({
                 "time": time_slot,
-                "available": True,
-                "current_reservations": 0
-            }
-            for time_slot in time_slots
-        ]
+                "available": free >= party_size,
+                "seats_available": max(free, 0)
+            })
         
         return {
             "date": reservation_date,
-            "available": True,
+            "available": any(slot["available"] for slot in available_times),
             "available_times": available_times
         }
     
     @app.get("/admin/reservations", summary="[ADMIN] Obtener todas las reservas")
-    async def get_admin_reservations(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-        reservations = db.query(Reservation).order_by(Reservation.created_at.desc()).all()
+    async def get_admin_reservations(
+        response: Response,
+        after: Optional[str] = Query(None, alias="cursor"),
+        limit: int = Query(200, ge=1, le=500),
+        order: str = "desc",
+        status: Optional[str] = None,
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        current_user: str = Depends(verify_token),
+        db: Session = Depends(get_db)
+    ):
+        query = db.query(Reservation)
+        if status:
+            query = query.filter(Reservation.status == status)
+        reservations = admin_page(
+            response, query, (Reservation.created_at,), Reservation.id,
+            after, limit, order, Reservation.created_at, date_from, date_to
+        )
         
         return [
             {
@@ -340,8 +383,20 @@ Equipo de Café Demo"""
             raise HTTPException(status_code=500, detail="Error interno del servidor")
     
     @app.get("/admin/job-applications", summary="[ADMIN] Obtener todas las aplicaciones")
-    async def get_job_applications(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-        applications = db.query(JobApplication).order_by(JobApplication.created_at.desc()).all()
+    async def get_job_applications(
+        response: Response,
+        after: Optional[str] = Query(None, alias="cursor"),
+        limit: int = Query(50, ge=1, le=500),
+        order: str = "desc",
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        current_user: str = Depends(verify_token),
+        db: Session = Depends(get_db)
+    ):
+        applications = admin_page(
+            response, db.query(JobApplication), (JobApplication.created_at,), JobApplication.id,
+            after, limit, order, JobApplication.created_at, date_from, date_to
+        )
         
         return [
             {
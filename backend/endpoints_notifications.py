@@ -5,13 +5,13 @@ from fastapi import HTTPException, Depends
 from sqlalchemy.orm import Session
 from typing import List
 
-from database import get_db, AdminNotification, ProductCategory
+from database import get_db, AdminNotification, NotificationCounter, ProductCategory
 from main_new import (
     NotificationResponse, CategoryResponse, verify_token, DashboardStats, AdminLogin,
     ADMIN_USERNAME, ADMIN_PASSWORD_HASH, hash_password, create_access_token,
     CategoryCreate, CategoryUpdate
 )
-from utils import get_unread_notifications_count
+from utils import get_unread_notifications_count, adjust_notification_counter, reconcile_notification_counters
 
 # ================================
 # ENDPOINTS DE NOTIFICACIONES ADMIN
@@ -50,13 +50,8 @@ def setup_notifications_routes(app):
         """Obtener el conteo de notificaciones no leídas por tipo"""
         unread_counts = get_unread_notifications_count(db)
         
-        # También obtener el total
-        total_unread = db.query(AdminNotification).filter(
-            AdminNotification.is_read == False
-        ).count()
-        
         return {
-            "total_unread": total_unread,
+            "total_unread": sum(unread_counts.values()),
             "by_type": unread_counts
         }
 
@@ -74,7 +69,9 @@ def setup_notifications_routes(app):
         if not notification:
             raise HTTPException(status_code=404, detail="Notificación no encontrada")
         
-        notification.is_read = True
+        if not notification.is_read:
+            notification.is_read = True
+            adjust_notification_counter(db, notification.type, -1)
         db.commit()
         
         return {"message": "Notificación marcada como leída", "id": notification_id}
@@ -88,6 +85,7 @@ def setup_notifications_routes(app):
         updated_count = db.query(AdminNotification).filter(
             AdminNotification.is_read == False
         ).update({"is_read": True})
+        db.query(NotificationCounter).update({"unread": 0})
         
         db.commit()
         
@@ -107,6 +105,8 @@ def setup_notifications_routes(app):
         if not notification:
             raise HTTPException(status_code=404, detail="Notificación no encontrada")
         
+        if not notification.is_read:
+            adjust_notification_counter(db, notification.type, -1)
         db.delete(notification)
         db.commit()
         
@@ -120,10 +120,21 @@ def setup_notifications_routes(app):
         """Eliminar todas las notificaciones (usar con precaución)"""
         deleted_count = db.query(AdminNotification).count()
         db.query(AdminNotification).delete()
+        db.query(NotificationCounter).update({"unread": 0})
         db.commit()
         
         return {"message": f"{deleted_count} notificaciones eliminadas"}
 
+    @app.post("/admin/notifications/reconcile", summary="[ADMIN] Recalcular contadores de notificaciones no leídas")
+    async def reconcile_notifications(
+        current_user: str = Depends(verify_token),
+        db: Session = Depends(get_db)
+    ):
+        changes = reconcile_notification_counters(db)
+        return {
+            "corrected": {type_: {"before": old, "after": new} for type_, (old, new) in changes.items()}
+        }
+
     # ================================
     # ENDPOINT DE CATEGORÍAS 
     # ================================
@@ -0,0 +1,117 @@
+"""
+Exportación de datos del admin en CSV o NDJSON
+
+Las filas se leen por páginas de BATCH_SIZE con paginación keyset (columna
+de fecha + id, como los listados del admin) y se escriben en la respuesta a
+medida que se generan, así que la memoria usada no depende del tamaño de la
+exportación: meses de pedidos ocupan lo mismo que un día. Cada página es
+una lectura corta que devuelve la conexión al pool antes de enviarse: un
+cliente lento no retiene una conexión ni una transacción de lectura (que
+impediría los checkpoints del WAL) durante toda la descarga.
+"""
+import csv
+import io
+import json
+
+import db_pool
+import pagination
+
+BATCH_SIZE = 500
+
+# dataset: (tabla, columnas, columna de fecha para from/to)
+DATASETS = {
+    "orders": (
+        "orders",
+        ("id", "customer_name", "customer_email", "customer_phone", "items",
+         "total_amount", "notes", "status", "created_at"),
+        "created_at",
+    ),
+    "reservations": (
+        "reservations",
+        ("id", "customer_name", "customer_email", "customer_phone", "party_size",
+         "reservation_date", "reservation_time", "notes", "status", "created_at"),
+        "reservation_day",
+    ),
+    "subscribers": (
+        "newsletter_subscribers",
+        ("id", "email", "name", "subscribed_at", "active"),
+        "subscribed_at",
+    ),
+    "contacts": (
+        "contact_messages",
+        ("id", "name", "email", "subject", "message", "created_at"),
+        "created_at",
+    ),
+}
+
+# Orden de la exportación cuando no basta con la columna de fecha (+ id)
+# (el mismo que el índice, para no ordenar en un B-tree temporal)
+SORT_COLUMNS = {
+    "reservations": ("reservation_day", "reservation_minute"),
+}
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def _csv_value(value):
+    # Evitar que una hoja de cálculo interprete como fórmula un texto del cliente
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+def build_filters(dataset: str, date_from: str = None, date_to: str = None) -> list:
+    """Filtros de fecha de la exportación; lanza pagination.InvalidCursor si las fechas no son válidas"""
+    date_column = DATASETS[dataset][2]
+    return pagination.date_filters(date_column, date_from, date_to)
+
+def _passes(dataset: str, filters: list) -> list:
+    """
+    (filtros, columnas de orden) de cada recorrido keyset. Las filas sin
+    fecha no se pueden comparar con el cursor: sin filtro de fechas se
+    exportan primero (como en un ORDER BY) en un recorrido solo por id.
+    """
+    sort_columns = SORT_COLUMNS.get(dataset, (DATASETS[dataset][2],))
+    passes = [(list(filters) + [(f"{sort_columns[0]} IS NOT NULL", ())], sort_columns)]
+    if not filters:
+        passes.insert(0, ([(f"{sort_columns[0]} IS NULL", ())], ()))
+    return passes
+
+def fetch_page(dataset: str, filters: list, sort_columns: tuple, after: str = None) -> tuple:
+    """Una página de la exportación en su propia lectura corta: (filas, cursor siguiente)"""
+    table, columns, _ = DATASETS[dataset]
+    conn = db_pool.connect()
+    try:
+        return pagination.keyset_page(conn.cursor(), table, ", ".join(columns), sort_columns, filters,
+                                      after=after, limit=BATCH_SIZE, descending=False)
+    finally:
+        conn.close()
+
+def stream_rows(dataset: str, fmt: str, filters: list):
+    """Generador de la exportación: una cabecera (CSV) y un bloque de texto por página"""
+    columns = DATASETS[dataset][1]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    for pass_filters, sort_columns in _passes(dataset, filters):
+        after = None
+        while True:
+            rows, after = fetch_page(dataset, pass_filters, sort_columns, after)
+            for row in rows:
+                if writer is not None:
+                    writer.writerow([_csv_value(value) for value in row])
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    buffer.write("\n")
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+            if after is None:
+                break
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
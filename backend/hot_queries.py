@@ -0,0 +1,114 @@
+"""
+SQL de las consultas más frecuentes
+
+Los endpoints públicos, el dashboard, el índice de precios y la ocupación
+de reservas ejecutan estas constantes, y query_plans.py y los tests
+comprueban con EXPLAIN QUERY PLAN que cada una usa un índice después de
+migrations.migrate(). Así el plan se comprueba sobre el mismo texto que se
+ejecuta: al cambiar una consulta caliente, cambiarla aquí.
+"""
+import pagination
+
+NEWS_COLUMNS = "id, title, excerpt, content, author, category, featured, image, tags, published, created_at, updated_at"
+PAGE_CONTENT_COLUMNS = "id, title, content, section, page, updated_at"
+
+PRODUCTS = "SELECT * FROM products WHERE available = 1 ORDER BY category, name"
+PRODUCTS_BY_CATEGORY = "SELECT * FROM products WHERE available = 1 AND category = ? ORDER BY name"
+PRODUCT = "SELECT * FROM products WHERE id = ? AND available = 1"
+
+SPECIALS = '''
+    SELECT s.id, s.product_id, s.date, s.discount,
+           p.id, p.name, p.description, p.price, p.category, p.image, p.available
+    FROM specials s
+    JOIN products p ON s.product_id = p.id
+    WHERE s.date = ? AND p.available = 1
+    ORDER BY s.discount DESC
+'''
+
+# Subconsulta por producto: usa idx_specials_product_date sin agrupar
+PRICE_INDEX = '''
+    SELECT p.id, p.name, p.price,
+           (SELECT MAX(s.discount) FROM specials s WHERE s.product_id = p.id AND s.date = ?)
+    FROM products p
+    WHERE p.available = 1
+'''
+
+CATEGORIES = "SELECT id, name, description, icon FROM product_categories ORDER BY name"
+
+NEWS = f"SELECT {NEWS_COLUMNS} FROM news_articles WHERE published = 1 ORDER BY created_at DESC LIMIT ?"
+FEATURED_NEWS = (f"SELECT {NEWS_COLUMNS} FROM news_articles WHERE published = 1 AND featured = 1 "
+                 "ORDER BY created_at DESC LIMIT ?")
+NEWS_ARTICLE = f"SELECT {NEWS_COLUMNS} FROM news_articles WHERE id = ? AND published = 1"
+
+CAROUSEL = '''
+    SELECT id, title, subtitle, description, image, link, active, order_position, created_at
+    FROM carousel_images
+    WHERE active = 1
+    ORDER BY order_position ASC, created_at DESC
+'''
+
+PAGE_SECTION = f"SELECT {PAGE_CONTENT_COLUMNS} FROM page_content WHERE page = ? AND section = ?"
+PAGE = f"SELECT {PAGE_CONTENT_COLUMNS} FROM page_content WHERE page = ?"
+ALL_CONTENT = f"SELECT {PAGE_CONTENT_COLUMNS} FROM page_content ORDER BY page, section"
+
+DASHBOARD_PRODUCTS = "SELECT COUNT(*) FROM products WHERE available = 1"
+DASHBOARD_SPECIALS = "SELECT COUNT(*) FROM specials WHERE date = date('now')"
+DASHBOARD_CATEGORIES = "SELECT COUNT(DISTINCT category) FROM products WHERE available = 1"
+RECENT_ORDERS = "SELECT id, customer_name, total_amount, status, created_at FROM orders ORDER BY created_at DESC LIMIT 5"
+RECENT_RESERVATIONS = ("SELECT id, customer_name, party_size, reservation_date, reservation_time, status "
+                       "FROM reservations ORDER BY created_at DESC LIMIT 5")
+
+DAY_OCCUPANCY = "SELECT slot, seats FROM slot_occupancy WHERE day = ?"
+
+# Columnas de los listados paginados del admin (la consulta la arma pagination.keyset_query)
+ADMIN_ORDER_COLUMNS = "id, customer_name, customer_email, customer_phone, items, total_amount, notes, status, created_at"
+ADMIN_RESERVATION_COLUMNS = ("id, customer_name, customer_email, customer_phone, party_size, "
+                             "reservation_date, reservation_time, notes, status, created_at")
+RESERVATION_SORT = {
+    "date": ("reservation_day", "reservation_minute"),
+    "created": ("created_at",),
+}
+
+def plans() -> list:
+    """(nombre, SQL, parámetros de ejemplo, paso esperado) de cada consulta caliente, para EXPLAIN QUERY PLAN"""
+    admin_orders = pagination.keyset_query(
+        "orders", ADMIN_ORDER_COLUMNS, ("created_at",), [("status = ?", ("pending",))], limit=50
+    )
+    admin_reservations = pagination.keyset_query(
+        "reservations", ADMIN_RESERVATION_COLUMNS, RESERVATION_SORT["date"], [("status = ?", ("confirmed",))], limit=200
+    )
+    # El último campo es el paso que debe aparecer en el plan: SEARCH con el
+    # índice previsto si la consulta filtra; SCAN ... USING INDEX solo en
+    # lecturas completas que usan el índice para ordenar
+    return [
+        ("GET /products", PRODUCTS, (), "SEARCH products USING INDEX idx_products_available_category_name"),
+        ("GET /products?category=", PRODUCTS_BY_CATEGORY, ("cat3",),
+         "SEARCH products USING INDEX idx_products_available_category_name"),
+        ("GET /products/{id}", PRODUCT, (12345,), "SEARCH products USING INTEGER PRIMARY KEY"),
+        ("GET /specials", SPECIALS, ("2026-01-15",), "SEARCH s USING INDEX idx_specials_date_discount"),
+        ("POST /orders (índice de precios)", PRICE_INDEX, ("2026-01-15",),
+         "SEARCH s USING COVERING INDEX idx_specials_product_date"),
+        ("GET /categories", CATEGORIES, (), "SCAN product_categories USING INDEX idx_product_categories_name"),
+        ("GET /news", NEWS, (50,), "SEARCH news_articles USING INDEX idx_news_articles_published_created"),
+        ("GET /news?featured_only=true", FEATURED_NEWS, (50,),
+         "SEARCH news_articles USING INDEX idx_news_articles_published_featured_created"),
+        ("GET /news/{id}", NEWS_ARTICLE, (12345,), "SEARCH news_articles USING INTEGER PRIMARY KEY"),
+        ("GET /carousel", CAROUSEL, (), "SEARCH carousel_images USING INDEX idx_carousel_images_active_position"),
+        ("GET /content?page=&section=", PAGE_SECTION, ("page7", "seccion7"),
+         "SEARCH page_content USING INDEX idx_page_content_page_section"),
+        ("GET /content?page=", PAGE, ("page7",), "SEARCH page_content USING INDEX idx_page_content_page_section"),
+        ("GET /content", ALL_CONTENT, (), "SCAN page_content USING INDEX idx_page_content_page_section"),
+        ("Dashboard: productos disponibles", DASHBOARD_PRODUCTS, (),
+         "SEARCH products USING COVERING INDEX idx_products_available_category_name"),
+        ("Dashboard: categorías con productos", DASHBOARD_CATEGORIES, (),
+         "SEARCH products USING COVERING INDEX idx_products_available_category_name"),
+        ("Dashboard: ofertas de hoy", DASHBOARD_SPECIALS, (),
+         "SEARCH specials USING COVERING INDEX idx_specials_date_discount"),
+        ("Dashboard: pedidos recientes", RECENT_ORDERS, (), "SCAN orders USING INDEX idx_orders_created"),
+        ("Dashboard: reservas recientes", RECENT_RESERVATIONS, (),
+         "SCAN reservations USING INDEX idx_reservations_created"),
+        ("GET /admin/orders?status=", *admin_orders, "SEARCH orders USING INDEX idx_orders_status_created"),
+        ("GET /admin/reservations?status=", *admin_reservations,
+         "SEARCH reservations USING INDEX idx_reservations_status_day_minute"),
+        ("Ocupación de un día", DAY_OCCUPANCY, ("2026-01-15",), "SEARCH slot_occupancy USING PRIMARY KEY"),
+    ]
@@ -0,0 +1,127 @@
+"""
+Caché HTTP de los endpoints públicos
+
+Cada respuesta lleva un ETag calculado a partir de la versión del recurso
+(query_cache) y una política Cache-Control propia. Si el navegador o la CDN
+envían If-None-Match con el ETag vigente se responde 304 sin consultar la
+base de datos.
+
+El cuerpo JSON se serializa una sola vez por versión del recurso y se guarda
+como bytes en la caché; los endpoints devuelven esos bytes directamente, sin
+que FastAPI vuelva a validar el response_model en cada petición.
+"""
+import hashlib
+import json
+import os
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+import query_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Desactivar para volver a la serialización de FastAPI en cada petición
+PRESERIALIZE_RESPONSES = os.getenv("PRESERIALIZE_RESPONSES", "true").lower() != "false"
+
+# Política de Cache-Control por espacio de nombres de la caché
+CACHE_CONTROL = {
+    "products": "public, max-age=60, stale-while-revalidate=300",
+    "product": "public, max-age=60, stale-while-revalidate=300",
+    # Los especiales cambian cada día: revalidar pronto
+    "specials": "public, max-age=60, stale-while-revalidate=60",
+    "news": "public, max-age=120, stale-while-revalidate=600",
+    "news_article": "public, max-age=300, stale-while-revalidate=3600",
+    "carousel": "public, max-age=300, stale-while-revalidate=3600",
+    "content": "public, max-age=300, stale-while-revalidate=3600",
+    "categories": "public, max-age=600, stale-while-revalidate=3600",
+    # La disponibilidad cambia con cada reserva: revalidar siempre (304 si no cambió)
+    "occupancy": "public, no-cache",
+}
+# /bootstrap agrupa varias secciones: usar la política más corta
+BUNDLE_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+def etag_matches(if_none_match: Optional[str], etag: str, exists: bool = False) -> bool:
+    """
+    Comparación débil de If-None-Match (RFC 9110), admite listas y *.
+    * solo coincide si el llamador ya sabe que el recurso existe (exists).
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            if exists:
+                return True
+            continue
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def dumps(value) -> bytes:
+    """Serializar a JSON compacto con orjson si está instalado"""
+    value = jsonable_encoder(value)
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def cache_headers(namespace: str, params: tuple = ()) -> dict:
+    return {
+        "ETag": query_cache.cache.etag(namespace, params),
+        "Cache-Control": CACHE_CONTROL[namespace],
+    }
+
+def fragment(namespace: str, params: tuple, loader: Callable) -> bytes:
+    """JSON serializado de un recurso, el mismo que sirve su endpoint"""
+    if PRESERIALIZE_RESPONSES:
+        return query_cache.cache.get_or_load(namespace, params, lambda: dumps(loader()))
+    return dumps(query_cache.cache.get_or_load(namespace, params, loader))
+
+def cached_json(request: Request, response: Response, namespace: str, params: tuple, loader: Callable):
+    """
+    Respuesta de un endpoint público cacheable: 304 si el ETag coincide y,
+    si no, el JSON ya serializado de la caché (o el resultado de loader()
+    si PRESERIALIZE_RESPONSES está desactivado).
+    """
+    headers = cache_headers(namespace, params)
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    # Con If-None-Match: * hay que cargar antes: si el recurso no existe, loader() lanza el 404
+    if not PRESERIALIZE_RESPONSES:
+        value = query_cache.cache.get_or_load(namespace, params, loader)
+        if etag_matches(if_none_match, headers["ETag"], exists=True):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return value
+    body = fragment(namespace, params, loader)
+    if etag_matches(if_none_match, headers["ETag"], exists=True):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_bundle(request: Request, sections: dict) -> Response:
+    """
+    Respuesta con varias secciones {nombre: (namespace, params, loader)}.
+    El ETag combina los de todas las secciones y el cuerpo se compone
+    concatenando los fragmentos JSON ya serializados.
+    """
+    tags = "|".join(f"{name}={query_cache.cache.etag(namespace, params)}"
+                    for name, (namespace, params, _) in sections.items())
+    headers = {
+        "ETag": f'"{hashlib.sha1(tags.encode()).hexdigest()[:20]}"',
+        "Cache-Control": BUNDLE_CACHE_CONTROL,
+    }
+    # El bundle siempre existe: * también coincide
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"], exists=True):
+        return Response(status_code=304, headers=headers)
+    body = b"{" + b",".join(
+        json.dumps(name).encode("utf-8") + b":" + fragment(namespace, params, loader)
+        for name, (namespace, params, loader) in sections.items()
+    ) + b"}"
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,208 @@
+"""
+Envío de emails por SMTP
+
+Si SMTP_USER/SMTP_PASSWORD no están configurados los emails se simulan
+imprimiéndolos por consola, igual que en el resto del backend.
+"""
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Envíos masivos: conexiones SMTP en paralelo y mensajes por sesión antes de reconectar
+SMTP_POOL_CONNECTIONS = int(os.getenv("SMTP_POOL_CONNECTIONS", "4"))
+SMTP_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MESSAGES_PER_SESSION", "100"))
+
+def smtp_settings() -> dict:
+    """Leer la configuración SMTP desde variables de entorno"""
+    return {
+        "user": os.getenv("SMTP_USER"),
+        "password": os.getenv("SMTP_PASSWORD"),
+        "server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        # Desactivar STARTTLS solo para servidores locales de prueba (p. ej. aiosmtpd)
+        "use_tls": os.getenv("SMTP_USE_TLS", "true").lower() != "false",
+    }
+
+def smtp_configured() -> bool:
+    settings = smtp_settings()
+    return bool(settings["user"] and settings["password"])
+
+def build_message(sender: str, recipient: str, subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    return msg
+
+def open_smtp_session(settings: dict = None) -> smtplib.SMTP:
+    """Abrir una sesión SMTP autenticada"""
+    settings = settings or smtp_settings()
+    server = smtplib.SMTP(settings["server"], settings["port"], timeout=SMTP_TIMEOUT)
+    if settings["use_tls"]:
+        server.starttls()
+    server.login(settings["user"], settings["password"])
+    return server
+
+def simulate(subject: str, body: str, recipient: str):
+    print(f"📧 EMAIL SIMULADO (configurar SMTP_USER y SMTP_PASSWORD):")
+    print(f"Para: {recipient}")
+    print(f"Asunto: {subject}")
+    print(f"Cuerpo: {body[:200]}..." if len(body) > 200 else f"Cuerpo: {body}")
+    print("─" * 50)
+
+def deliver(subject: str, body: str, recipient: str):
+    """
+    Enviar un email. A diferencia de send_email() lanza la excepción si falla,
+    para que quien llama pueda reintentar.
+    """
+    settings = smtp_settings()
+    if not settings["user"] or not settings["password"]:
+        simulate(subject, body, recipient)
+        return
+
+    msg = build_message(settings["user"], recipient, subject, body)
+    server = open_smtp_session(settings)
+    try:
+        server.sendmail(settings["user"], recipient, msg.as_string())
+    finally:
+        try:
+            server.quit()
+        except smtplib.SMTPException:
+            pass
+
+class TokenBucket:
+    """
+    Limitador de ritmo token-bucket compartido entre hilos: permite ráfagas
+    de hasta `capacity` mensajes y un ritmo sostenido de `rate` por segundo.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquear hasta que haya un token disponible"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class SMTPSessionPool:
+    """
+    Envío masivo reutilizando sesiones SMTP autenticadas.
+
+    Abre hasta `connections` sesiones en paralelo; cada una envía como máximo
+    `messages_per_session` mensajes antes de cerrarse y volver a autenticarse,
+    en lugar de conectar/STARTTLS/login/quit por cada destinatario.
+    """
+
+    def __init__(self, connections: int = SMTP_POOL_CONNECTIONS, messages_per_session: int = SMTP_MESSAGES_PER_SESSION,
+                 rate_limiter: TokenBucket = None):
+        self.connections = max(1, connections)
+        self.messages_per_session = max(1, messages_per_session)
+        self.rate_limiter = rate_limiter
+
+    def send_many(self, messages, on_result=None) -> dict:
+        """
+        Enviar una lista de mensajes (recipient, subject, body, ...); los
+        elementos extra se ignoran y sirven para identificar el mensaje.
+        on_result(message, ok, error) se llama tras cada mensaje, serializado.
+        Devuelve {"sent", "failed", "elapsed", "per_second"}.
+        """
+        messages = list(messages)
+        settings = smtp_settings()
+        simulated = not settings["user"] or not settings["password"]
+        pending = queue.Queue()
+        for message in messages:
+            pending.put(message)
+
+        lock = threading.Lock()
+        totals = {"sent": 0, "failed": 0}
+
+        def report(message, ok, error=None):
+            with lock:
+                totals["sent" if ok else "failed"] += 1
+                if on_result:
+                    on_result(message, ok, error)
+
+        def worker():
+            session, used = None, 0
+            try:
+                while True:
+                    try:
+                        message = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    recipient, subject, body = message[:3]
+                    if self.rate_limiter:
+                        self.rate_limiter.acquire()
+                    if simulated:
+                        print(f"📧 [SIMULADO] {recipient}: {subject}")
+                        report(message, True)
+                        continue
+                    try:
+                        if session is None or used >= self.messages_per_session:
+                            self._close(session)
+                            session, used = open_smtp_session(settings), 0
+                        try:
+                            session.sendmail(settings["user"], recipient,
+                                             build_message(settings["user"], recipient, subject, body).as_string())
+                        except smtplib.SMTPServerDisconnected:
+                            # El servidor cerró la sesión: reconectar y reintentar una vez
+                            session, used = open_smtp_session(settings), 0
+                            session.sendmail(settings["user"], recipient,
+                                             build_message(settings["user"], recipient, subject, body).as_string())
+                        used += 1
+                        report(message, True)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Destinatario rechazado: la sesión sigue siendo válida
+                        used += 1
+                        report(message, False, e)
+                    except Exception as e:
+                        self._close(session)
+                        session, used = None, 0
+                        report(message, False, e)
+            finally:
+                self._close(session)
+
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=worker, name=f"smtp-pool-{i}", daemon=True)
+            for i in range(min(self.connections, len(messages)) or 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            "sent": totals["sent"],
+            "failed": totals["failed"],
+            "elapsed": round(elapsed, 3),
+            "per_second": round(len(messages) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    @staticmethod
+    def _close(session):
+        if session is None:
+            return
+        try:
+            session.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
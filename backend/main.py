@@ -1,7 +1,8 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request, Response
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import sqlite3
@@ -9,13 +10,47 @@ import json
 from datetime import datetime, date, timedelta
 import hashlib
 import jwt
+import logging
 import os
+import re
 import shutil
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 # Importar módulo del chatbot
 import chatbot
+# Pool de conexiones SQLite
+import db_pool
+# Envío de emails y bandeja de salida
+import mailer
+import email_outbox
+import newsletter_campaigns
+# Caché en memoria de los endpoints públicos
+import query_cache
+import http_cache
+# Notificaciones del admin en tiempo real (SSE)
+import notification_stream
+# Contadores de notificaciones no leídas
+import notification_counters
+# Retención y archivo de notificaciones antiguas
+import notification_retention
+# Líneas de pedido normalizadas (order_items)
+import order_items
+# Precios de los pedidos resueltos en el servidor
+import order_pricing
+# Paginación por cursor de los listados del admin
+import pagination
+# Exportaciones CSV/NDJSON en streaming
+import exports
+# SQL de las consultas calientes (compartido con query_plans.py)
+import hot_queries
+# Resúmenes diarios de pedidos y reservas
+import daily_rollups
+# Registro de actividad del admin
+import activity_log
+# Capacidad de reservas por franjas (asientos ocupados)
+import reservation_capacity
+# Fecha y hora de las reservas como enteros indexados
+import reservation_dates
+# Migraciones de esquema versionadas (índices y columnas nuevas)
+import migrations
 
 # Modelos Pydantic
 class Product(BaseModel):
@@ -273,9 +308,8 @@ class ReservationResponse(BaseModel):
 
 # Inicializar base de datos
 def init_db():
-    conn = sqlite3.connect('cafe.db')
-    # Activar modo WAL para mejorar concurrencia
-    conn.execute('PRAGMA journal_mode=WAL;')
+    # El pool activa WAL y el resto de PRAGMAs al abrir cada conexión
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Tabla productos
@@ -350,6 +384,8 @@ if not SECRET_KEY:
     
 ALGORITHM = "HS256"
 security = HTTPBearer()
+# Para el stream SSE, que también acepta un ticket en la query
+optional_security = HTTPBearer(auto_error=False)
 
 # Configuración Admin - Variables de entorno requeridas
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
@@ -369,16 +405,50 @@ def create_access_token(data: dict):
 
 # Función para verificar tokens
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = decode_token(credentials.credentials)
+    # Un ticket del stream SSE no sirve como token del admin
+    if payload.get("scope") is not None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return payload["sub"]
+
+def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-        return username
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token inválido")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return payload
+
+# Tickets del stream SSE: EventSource no puede enviar la cabecera Authorization
+# y la URL acaba en los logs de acceso y de los proxies, así que en la query
+# solo viaja un ticket de corta duración que no sirve para nada más
+STREAM_TICKET_SCOPE = "notifications-stream"
+STREAM_TICKET_SECONDS = int(os.getenv("STREAM_TICKET_SECONDS", "60"))
+
+def create_stream_ticket(username: str) -> str:
+    expire = datetime.utcnow() + timedelta(seconds=STREAM_TICKET_SECONDS)
+    return jwt.encode({"sub": username, "scope": STREAM_TICKET_SCOPE, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+def verify_stream_ticket(ticket: str) -> str:
+    payload = decode_token(ticket)
+    if payload.get("scope") != STREAM_TICKET_SCOPE:
+        raise HTTPException(status_code=401, detail="Ticket inválido")
+    return payload["sub"]
+
+class RedactStreamTicket(logging.Filter):
+    """Ocultar el ticket del stream SSE en el log de acceso de uvicorn"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple) and len(record.args) >= 3 and "ticket=" in str(record.args[2]):
+            args = list(record.args)
+            args[2] = re.sub(r"ticket=[^&]*", "ticket=***", str(args[2]))
+            record.args = tuple(args)
+        return True
+
+logging.getLogger("uvicorn.access").addFilter(RedactStreamTicket())
 
 # Hash de contraseña ya definido arriba
 
@@ -390,6 +460,57 @@ def init_uploads():
 # Crear app FastAPI
 app = FastAPI(title="Café Demo API", version="1.0.0")
 
+# Los endpoints con acceso a SQLite se declaran con def (no async def): FastAPI
+# los ejecuta en un pool de hilos acotado y el event loop nunca se bloquea
+@app.on_event("startup")
+async def configure_db_workers():
+    db_pool.configure_worker_threads()
+
+# Worker que envía en segundo plano los emails de la bandeja de salida
+@app.on_event("startup")
+async def start_email_worker():
+    email_outbox.start_worker()
+
+@app.on_event("shutdown")
+async def stop_email_worker():
+    email_outbox.stop_worker()
+
+# Worker de campañas de newsletter (reanuda las que quedaron a medias)
+@app.on_event("startup")
+async def start_campaign_runner():
+    newsletter_campaigns.start_runner()
+
+@app.on_event("shutdown")
+async def stop_campaign_runner():
+    newsletter_campaigns.stop_runner()
+
+# Canal SSE de notificaciones del admin
+@app.on_event("startup")
+async def start_notification_stream():
+    notification_stream.start_broker()
+
+@app.on_event("shutdown")
+async def stop_notification_stream():
+    notification_stream.stop_broker()
+
+# Reconciliación periódica de los contadores de notificaciones
+@app.on_event("startup")
+async def start_notification_counters_job():
+    notification_counters.start_reconcile_job()
+
+@app.on_event("shutdown")
+async def stop_notification_counters_job():
+    notification_counters.stop_reconcile_job()
+
+# Archivo periódico de notificaciones leídas antiguas / exceso de no leídas
+@app.on_event("startup")
+async def start_notification_retention_job():
+    notification_retention.start_retention_job()
+
+@app.on_event("shutdown")
+async def stop_notification_retention_job():
+    notification_retention.stop_retention_job()
+
 # Inicializar base de datos y uploads al inicio
 init_db()
 init_uploads()
@@ -418,6 +539,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El cursor de la página siguiente de los listados del admin
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
 
 # Servir archivos estáticos (imágenes)
@@ -433,19 +556,18 @@ async def root():
         "docs": "/docs"
     }
 
-@app.get("/products", response_model=List[ProductResponse], summary="Obtener todos los productos")
-async def get_products(category: Optional[str] = None):
-    conn = sqlite3.connect('cafe.db')
+def load_products(category: Optional[str] = None):
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    
+
     if category:
-        cursor.execute("SELECT * FROM products WHERE available = 1 AND category = ? ORDER BY name", (category,))
+        cursor.execute(hot_queries.PRODUCTS_BY_CATEGORY, (category,))
     else:
-        cursor.execute("SELECT * FROM products WHERE available = 1 ORDER BY category, name")
-    
+        cursor.execute(hot_queries.PRODUCTS)
+
     products = cursor.fetchall()
     conn.close()
-    
+
     return [
         ProductResponse(
             id=p[0], name=p[1], description=p[2], 
@@ -453,37 +575,42 @@ async def get_products(category: Optional[str] = None):
         ) for p in products
     ]
 
-@app.get("/products/{product_id}", response_model=ProductResponse, summary="Obtener producto por ID")
-async def get_product(product_id: int):
-    conn = sqlite3.connect('cafe.db')
+@app.get("/products", response_model=List[ProductResponse], summary="Obtener todos los productos")
+def get_products(request: Request, response: Response, category: Optional[str] = None):
+    return http_cache.cached_json(request, response, "products", (category,), lambda: load_products(category))
+
+
+def load_product(product_id: int):
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM products WHERE id = ? AND available = 1", (product_id,))
+    cursor.execute(hot_queries.PRODUCT, (product_id,))
     product = cursor.fetchone()
     conn.close()
-    
+
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    
+
     return ProductResponse(
         id=product[0], name=product[1], description=product[2],
         price=product[3], category=product[4], image=product[5], available=bool(product[6])
     )
 
-@app.get("/specials", response_model=List[SpecialResponse], summary="Obtener especiales del día")
-async def get_specials():
-    conn = sqlite3.connect('cafe.db')
+@app.get("/products/{product_id}", response_model=ProductResponse, summary="Obtener producto por ID")
+def get_product(request: Request, response: Response, product_id: int):
+    return http_cache.cached_json(request, response, "product", (product_id,), lambda: load_product(product_id))
+
+
+def specials_date() -> str:
+    """Fecha de hoy en UTC, la misma que date('now') en SQLite"""
+    return datetime.utcnow().date().isoformat()
+
+def load_specials(today: str):
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT s.id, s.product_id, s.date, s.discount,
-               p.id, p.name, p.description, p.price, p.category, p.image, p.available
-        FROM specials s 
-        JOIN products p ON s.product_id = p.id 
-        WHERE s.date = date('now') AND p.available = 1
-        ORDER BY s.discount DESC
-    ''')
+    cursor.execute(hot_queries.SPECIALS, (today,))
     specials = cursor.fetchall()
     conn.close()
-    
+
     return [
         SpecialResponse(
             id=s[0],
@@ -496,20 +623,21 @@ async def get_specials():
         ) for s in specials
     ]
 
-@app.get("/categories", summary="Obtener categorías disponibles")
-async def get_categories():
-    conn = sqlite3.connect('cafe.db')
+@app.get("/specials", response_model=List[SpecialResponse], summary="Obtener especiales del día")
+def get_specials(request: Request, response: Response):
+    today = specials_date()
+    return http_cache.cached_json(request, response, "specials", (today,), lambda: load_specials(today))
+
+
+def load_categories():
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    
+
     # Obtener todas las categorías creadas desde la tabla product_categories
-    cursor.execute("""
-        SELECT id, name, description, icon 
-        FROM product_categories 
-        ORDER BY name
-    """)
+    cursor.execute(hot_queries.CATEGORIES)
     categories = cursor.fetchall()
     conn.close()
-    
+
     return [
         {
             "id": cat[0],
@@ -520,9 +648,18 @@ async def get_categories():
         for cat in categories
     ]
 
+@app.get("/categories", summary="Obtener categorías disponibles")
+def get_categories(request: Request, response: Response):
+    return http_cache.cached_json(request, response, "categories", (), load_categories)
+
+
 @app.get("/health", summary="Health Check")
-async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+def health_check():
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "database": db_pool.pool.health()
+    }
 
 # ================================
 # ENDPOINT DE SUBIDA DE IMÁGENES
@@ -582,29 +719,26 @@ async def admin_login(credentials: AdminLogin):
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
 
 @app.get("/admin/dashboard", response_model=DashboardStats, summary="Dashboard estadísticas")
-async def get_dashboard_stats(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_dashboard_stats(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Total productos
-    cursor.execute("SELECT COUNT(*) FROM products WHERE available = 1")
+    cursor.execute(hot_queries.DASHBOARD_PRODUCTS)
     total_products = cursor.fetchone()[0]
     
     # Especiales activos
-    cursor.execute("SELECT COUNT(*) FROM specials WHERE date = date('now')")
+    cursor.execute(hot_queries.DASHBOARD_SPECIALS)
     active_specials = cursor.fetchone()[0]
     
     # Total categorías
-    cursor.execute("SELECT COUNT(DISTINCT category) FROM products WHERE available = 1")
+    cursor.execute(hot_queries.DASHBOARD_CATEGORIES)
     total_categories = cursor.fetchone()[0]
     
     conn.close()
     
-    recent_activity = [
-        {"action": "Producto creado", "item": "Nuevo Latte", "time": "Hace 2 horas"},
-        {"action": "Especial actualizado", "item": "Cappuccino 20% OFF", "time": "Hace 4 horas"},
-        {"action": "Producto editado", "item": "Americano", "time": "Hace 1 día"},
-    ]
+    # Actividad reciente desde el buffer en memoria (sin consulta si no hay cambios)
+    recent_activity = activity_log.feed.recent(10)
     
     return DashboardStats(
         total_products=total_products,
@@ -615,8 +749,8 @@ async def get_dashboard_stats(current_user: str = Depends(verify_token)):
 
 # CRUD Productos para Admin
 @app.get("/admin/products", response_model=List[ProductResponse], summary="[ADMIN] Obtener todos los productos")
-async def get_admin_products(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_admin_products(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM products ORDER BY id DESC")
     products = cursor.fetchall()
@@ -630,8 +764,8 @@ async def get_admin_products(current_user: str = Depends(verify_token)):
     ]
 
 @app.post("/admin/products", response_model=ProductResponse, summary="[ADMIN] Crear producto")
-async def create_product(product: ProductCreate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def create_product(product: ProductCreate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -640,8 +774,15 @@ async def create_product(product: ProductCreate, current_user: str = Depends(ver
     ''', (product.name, product.description, product.price, product.category, product.image, product.available))
     
     product_id = cursor.lastrowid
+    query_cache.bump_versions(cursor, "products", "product", "specials", "prices")
+    activity_log.record(cursor, "Producto creado", "product", product_id, current_user)
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("products")
+    query_cache.cache.invalidate("product", (product_id,))
+    query_cache.cache.invalidate("specials")
+    query_cache.cache.invalidate("prices")
+    query_cache.cache.invalidate("activity")
     
     return ProductResponse(
         id=product_id,
@@ -654,8 +795,8 @@ async def create_product(product: ProductCreate, current_user: str = Depends(ver
     )
 
 @app.put("/admin/products/{product_id}", response_model=ProductResponse, summary="[ADMIN] Actualizar producto")
-async def update_product(product_id: int, product_update: ProductUpdate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def update_product(product_id: int, product_update: ProductUpdate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si el producto existe
@@ -694,12 +835,19 @@ async def update_product(product_id: int, product_update: ProductUpdate, current
             f"UPDATE products SET {', '.join(update_fields)} WHERE id = ?",
             update_values
         )
+        activity_log.record(cursor, "Producto editado", "product", product_id, current_user)
+        query_cache.bump_versions(cursor, "products", "product", "specials", "prices")
         conn.commit()
     
     # Obtener el producto actualizado
     cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
     updated_product = cursor.fetchone()
     conn.close()
+    query_cache.cache.invalidate("products")
+    query_cache.cache.invalidate("product", (product_id,))
+    query_cache.cache.invalidate("specials")
+    query_cache.cache.invalidate("prices")
+    query_cache.cache.invalidate("activity")
     
     return ProductResponse(
         id=updated_product[0],
@@ -712,8 +860,8 @@ async def update_product(product_id: int, product_update: ProductUpdate, current
     )
 
 @app.delete("/admin/products/{product_id}", summary="[ADMIN] Eliminar producto")
-async def delete_product(product_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_product(product_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
@@ -721,21 +869,29 @@ async def delete_product(product_id: int, current_user: str = Depends(verify_tok
         conn.close()
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
+    activity_log.record(cursor, "Producto eliminado", "product", product_id, current_user)
+    
     # Eliminar especiales relacionados
     cursor.execute("DELETE FROM specials WHERE product_id = ?", (product_id,))
     
     # Eliminar producto
     cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
     
+    query_cache.bump_versions(cursor, "products", "product", "specials", "prices")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("products")
+    query_cache.cache.invalidate("product", (product_id,))
+    query_cache.cache.invalidate("specials")
+    query_cache.cache.invalidate("prices")
+    query_cache.cache.invalidate("activity")
     
     return {"message": "Producto eliminado exitosamente"}
 
 # CRUD Especiales para Admin
 @app.get("/admin/specials", response_model=List[SpecialResponse], summary="[ADMIN] Obtener todos los especiales")
-async def get_admin_specials(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_admin_specials(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT s.id, s.product_id, s.date, s.discount,
@@ -760,8 +916,8 @@ async def get_admin_specials(current_user: str = Depends(verify_token)):
     ]
 
 @app.post("/admin/specials", summary="[ADMIN] Crear especial")
-async def create_special(special: SpecialCreate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def create_special(special: SpecialCreate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar que el producto existe
@@ -776,14 +932,19 @@ async def create_special(special: SpecialCreate, current_user: str = Depends(ver
     ''', (special.product_id, special.date, special.discount))
     
     special_id = cursor.lastrowid
+    query_cache.bump_versions(cursor, "specials", "prices")
+    activity_log.record(cursor, "Especial creado", "special", special_id, current_user)
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("specials")
+    query_cache.cache.invalidate("prices")
+    query_cache.cache.invalidate("activity")
     
     return {"id": special_id, "message": "Especial creado exitosamente"}
 
 @app.delete("/admin/specials/{special_id}", summary="[ADMIN] Eliminar especial")
-async def delete_special(special_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_special(special_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM specials WHERE id = ?", (special_id,))
@@ -791,9 +952,14 @@ async def delete_special(special_id: int, current_user: str = Depends(verify_tok
         conn.close()
         raise HTTPException(status_code=404, detail="Especial no encontrado")
     
+    activity_log.record(cursor, "Especial eliminado", "special", special_id, current_user)
     cursor.execute("DELETE FROM specials WHERE id = ?", (special_id,))
+    query_cache.bump_versions(cursor, "specials", "prices")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("specials")
+    query_cache.cache.invalidate("prices")
+    query_cache.cache.invalidate("activity")
     
     return {"message": "Especial eliminado exitosamente"}
 
@@ -802,8 +968,8 @@ async def delete_special(special_id: int, current_user: str = Depends(verify_tok
 # ================================
 
 @app.get("/admin/categories", response_model=List[CategoryResponse], summary="[ADMIN] Obtener todas las categorías")
-async def get_admin_categories(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_admin_categories(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     cursor.execute("SELECT id, name, description, icon, created_at FROM product_categories ORDER BY name")
     categories = cursor.fetchall()
@@ -820,8 +986,8 @@ async def get_admin_categories(current_user: str = Depends(verify_token)):
     ]
 
 @app.post("/admin/categories", response_model=CategoryResponse, summary="[ADMIN] Crear categoría")
-async def create_category(category: CategoryCreate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def create_category(category: CategoryCreate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si ya existe una categoría con ese ID
@@ -837,9 +1003,13 @@ async def create_category(category: CategoryCreate, current_user: str = Depends(
     
     cursor.execute("SELECT id, name, description, icon, created_at FROM product_categories WHERE id = ?", (category.id,))
     created_category = cursor.fetchone()
+    activity_log.record(cursor, "Categoría creada", "category", category.id, current_user)
     
+    query_cache.bump_versions(cursor, "categories")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("categories")
+    query_cache.cache.invalidate("activity")
     
     return CategoryResponse(
         id=created_category[0],
@@ -850,8 +1020,8 @@ async def create_category(category: CategoryCreate, current_user: str = Depends(
     )
 
 @app.put("/admin/categories/{category_id}", response_model=CategoryResponse, summary="[ADMIN] Actualizar categoría")
-async def update_category(category_id: str, category_update: CategoryUpdate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def update_category(category_id: str, category_update: CategoryUpdate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si la categoría existe
@@ -880,12 +1050,16 @@ async def update_category(category_id: str, category_update: CategoryUpdate, cur
             f"UPDATE product_categories SET {', '.join(update_fields)} WHERE id = ?",
             update_values
         )
+        activity_log.record(cursor, "Categoría editada", "category", category_id, current_user)
+        query_cache.bump_versions(cursor, "categories")
         conn.commit()
     
     # Obtener la categoría actualizada
     cursor.execute("SELECT id, name, description, icon, created_at FROM product_categories WHERE id = ?", (category_id,))
     updated_category = cursor.fetchone()
     conn.close()
+    query_cache.cache.invalidate("categories")
+    query_cache.cache.invalidate("activity")
     
     return CategoryResponse(
         id=updated_category[0],
@@ -896,8 +1070,8 @@ async def update_category(category_id: str, category_update: CategoryUpdate, cur
     )
 
 @app.delete("/admin/categories/{category_id}", summary="[ADMIN] Eliminar categoría")
-async def delete_category(category_id: str, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_category(category_id: str, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si la categoría existe
@@ -917,9 +1091,13 @@ async def delete_category(category_id: str, current_user: str = Depends(verify_t
             detail=f"No se puede eliminar la categoría. Hay {products_count} producto(s) que la usan."
         )
     
+    activity_log.record(cursor, "Categoría eliminada", "category", category_id, current_user)
     cursor.execute("DELETE FROM product_categories WHERE id = ?", (category_id,))
+    query_cache.bump_versions(cursor, "categories")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("categories")
+    query_cache.cache.invalidate("activity")
     
     return {"message": "Categoría eliminada exitosamente"}
 
@@ -935,58 +1113,32 @@ EMAIL_CONFIG = {
     "sender_name": "Café Demo"
 }
 
-# Función para enviar email
+# Función para enviar email (síncrona; los endpoints usan la bandeja de salida)
 def send_email(subject: str, body: str, recipient_email: str = None):
+    recipient = recipient_email or EMAIL_CONFIG['recipient_email']
     try:
-        # Obtener configuración SMTP desde variables de entorno
-        smtp_user = os.getenv("SMTP_USER")
-        smtp_password = os.getenv("SMTP_PASSWORD")
-        smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        
-        # Si no hay credenciales configuradas, enviar email simulado
-        if not smtp_user or not smtp_password:
-            print(f"📧 EMAIL SIMULADO (configurar SMTP_USER y SMTP_PASSWORD):")
-            print(f"Para: {recipient_email or EMAIL_CONFIG['recipient_email']}")
-            print(f"Asunto: {subject}")
-            print(f"Cuerpo: {body[:200]}..." if len(body) > 200 else f"Cuerpo: {body}")
-            print("─" * 50)
-            return True
-        
-        # Configurar email real
-        msg = MIMEMultipart()
-        msg['From'] = smtp_user
-        msg['To'] = recipient_email or EMAIL_CONFIG['recipient_email']
-        msg['Subject'] = subject
-        
-        # Adjuntar el cuerpo del mensaje
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        # Conectar al servidor SMTP y enviar
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Habilitar seguridad
-        server.login(smtp_user, smtp_password)
-        
-        text = msg.as_string()
-        server.sendmail(smtp_user, recipient_email or EMAIL_CONFIG['recipient_email'], text)
-        server.quit()
-        
-        print(f"✅ Email enviado exitosamente a {recipient_email or EMAIL_CONFIG['recipient_email']}")
+        mailer.deliver(subject, body, recipient)
+        if mailer.smtp_configured():
+            print(f"✅ Email enviado exitosamente a {recipient}")
         return True
         
     except Exception as e:
         print(f"❌ Error enviando email: {e}")
         # En caso de error, al menos mostrar que se intentó enviar
         print(f"📧 EMAIL FALLBACK (error en SMTP):")
-        print(f"Para: {recipient_email or EMAIL_CONFIG['recipient_email']}")
+        print(f"Para: {recipient}")
         print(f"Asunto: {subject}")
         print(f"Error: {str(e)}")
         print("─" * 50)
         return False
 
+# Encolar email en la misma transacción que el cursor del llamador
+def queue_email(cursor, subject: str, body: str, recipient_email: str = None):
+    return email_outbox.enqueue_email(cursor, subject, body, recipient_email or EMAIL_CONFIG['recipient_email'])
+
 # Inicializar tablas de contacto y newsletter
 def init_contact_db():
-    conn = sqlite3.connect('cafe.db')
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Tabla de mensajes de contacto
@@ -1061,6 +1213,9 @@ def init_contact_db():
         )
     ''')
     
+    # Líneas de pedido (los pedidos antiguos se copian en migrations.py)
+    order_items.create_table(cursor)
+    
     # Tabla de reservas
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS reservations (
@@ -1073,7 +1228,9 @@ def init_contact_db():
             reservation_time TEXT NOT NULL,
             notes TEXT,
             status TEXT DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reservation_day INTEGER,
+            reservation_minute INTEGER
         )
     ''')
     
@@ -1122,6 +1279,67 @@ def init_contact_db():
         )
     ''')
     
+    # Bandeja de salida de emails (se envían en segundo plano)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_status_next
+        ON email_outbox (status, next_attempt_at)
+    ''')
+    
+    # Campañas de newsletter (envío en segundo plano y reanudable)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS newsletter_campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subject TEXT NOT NULL,
+            content TEXT NOT NULL,
+            status TEXT DEFAULT 'queued',
+            total INTEGER DEFAULT 0,
+            sent INTEGER DEFAULT 0,
+            failed INTEGER DEFAULT 0,
+            last_subscriber_id INTEGER DEFAULT 0,
+            send_seconds REAL DEFAULT 0,
+            heartbeat_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    
+    # Estado de entrega por destinatario de cada campaña
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS newsletter_deliveries (
+            campaign_id INTEGER NOT NULL,
+            subscriber_id INTEGER NOT NULL,
+            email TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            error TEXT,
+            attempted_at TIMESTAMP,
+            PRIMARY KEY (campaign_id, subscriber_id)
+        )
+    ''')
+    
+    # Versiones de la caché de consultas, compartidas entre workers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            namespace TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
     # Tabla de notificaciones para el admin
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS admin_notifications (
@@ -1135,6 +1353,37 @@ def init_contact_db():
         )
     ''')
     
+    # Índices para el listado por fecha y la retención (leídas antiguas / no leídas más viejas)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_admin_notifications_read_created
+        ON admin_notifications (is_read, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_admin_notifications_created
+        ON admin_notifications (created_at)
+    ''')
+    
+    # No leídos por tipo, mantenidos junto con admin_notifications
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_counters (
+            type TEXT PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Registro de actividad del admin (acotado a ACTIVITY_LOG_CAP filas)
+    activity_log.create_table(cursor)
+    
+    # Ocupación de asientos por día y franja (se rellena la primera vez)
+    reservation_capacity.create_table(cursor)
+    if reservation_capacity.needs_backfill(cursor):
+        print(f"🪑 Ocupación calculada para {reservation_capacity.rebuild(cursor)} reservas activas")
+    
+    # Resúmenes diarios para las estadísticas (se rellenan la primera vez)
+    daily_rollups.create_tables(cursor)
+    if daily_rollups.needs_backfill(cursor):
+        print(f"📊 Resúmenes diarios generados: {daily_rollups.rebuild(cursor)}")
+    
     # Insertar categorías por defecto si no existen
     cursor.execute("SELECT COUNT(*) FROM product_categories")
     if cursor.fetchone()[0] == 0:
@@ -1152,54 +1401,93 @@ def init_contact_db():
     conn.close()
 
 # Funciones para gestionar notificaciones
-def create_notification(type_: str, title: str, message: str, related_id: int = None):
-    """Crear una nueva notificación para el admin"""
-    try:
-        conn = sqlite3.connect('cafe.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO admin_notifications (type, title, message, related_id)
-            VALUES (?, ?, ?, ?)
-        ''', (type_, title, message, related_id))
-        
-        conn.commit()
-        conn.close()
+def create_notification(type_: str, title: str, message: str, related_id: int = None, cursor=None):
+    """
+    Crear una nueva notificación para el admin.
+    
+    Con `cursor` la notificación se inserta en la transacción del llamador
+    (un solo commit por petición); el llamador debe llamar a
+    notification_stream.notify() después de su commit.
+    """
+    if cursor is not None:
+        # En la transacción del llamador un error se propaga: si la
+        # notificación o el contador fallan, no se guarda nada de la petición
+        insert_notification(cursor, type_, title, message, related_id)
         print(f"ñ Nueva notificación: {title}")
         return True
+    
+    conn = db_pool.connect()
+    try:
+        insert_notification(conn.cursor(), type_, title, message, related_id)
+        conn.commit()
     except Exception as e:
         print(f"Error creando notificación: {e}")
         return False
+    finally:
+        conn.close()
+    notification_stream.notify()
+    print(f"ñ Nueva notificación: {title}")
+    return True
+
+def insert_notification(cursor, type_: str, title: str, message: str, related_id: int = None):
+    cursor.execute('''
+        INSERT INTO admin_notifications (type, title, message, related_id)
+        VALUES (?, ?, ?, ?)
+    ''', (type_, title, message, related_id))
+    notification_counters.adjust(cursor, type_, 1)
 
 def get_unread_notifications_count():
     """Obtener el número de notificaciones no leídas por tipo"""
     try:
-        conn = sqlite3.connect('cafe.db')
+        conn = db_pool.connect()
         cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT type, COUNT(*) 
-            FROM admin_notifications 
-            WHERE is_read = 0 
-            GROUP BY type
-        """)
-        
-        results = cursor.fetchall()
+        counts = notification_counters.unread_counts(cursor)
         conn.close()
         
-        return {row[0]: row[1] for row in results}
+        return counts
     except Exception as e:
         print(f"Error obteniendo notificaciones: {e}")
         return {}
 
+def admin_page(response: Response, table: str, columns: str, sort_columns: tuple, after: Optional[str],
+               limit: int, order: str = "desc", filters: list = None, date_column: str = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None) -> list:
+    """
+    Página de un listado del admin paginado por cursor. El cursor de la
+    página siguiente se devuelve en la cabecera X-Next-Cursor.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order debe ser 'asc' o 'desc'")
+    
+    conn = db_pool.connect()
+    try:
+        all_filters = list(filters or [])
+        if date_column:
+            all_filters += pagination.date_filters(date_column, date_from, date_to)
+        rows, next_cursor = pagination.keyset_page(
+            conn.cursor(), table, columns, sort_columns, all_filters,
+            after=after, limit=limit, descending=(order == "desc")
+        )
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        conn.close()
+    
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
 # Inicializar al arrancar
 init_contact_db()
+# Índices y cambios de esquema pendientes (PRAGMA user_version)
+migrations.migrate()
 
 @app.post("/contact", summary="Enviar mensaje de contacto")
-async def send_contact_message(contact_data: ContactMessage):
+def send_contact_message(contact_data: ContactMessage):
+    conn = None
     try:
         # Guardar mensaje en base de datos
-        conn = sqlite3.connect('cafe.db')
+        conn = db_pool.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1208,16 +1496,6 @@ async def send_contact_message(contact_data: ContactMessage):
         ''', (contact_data.name, contact_data.email, contact_data.subject, contact_data.message))
         
         message_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        # Crear notificación para el admin
-        create_notification(
-            "contact",
-            "Nuevo mensaje de contacto",
-            f"De {contact_data.name}: {contact_data.subject}",
-            message_id
-        )
         
         # Preparar email
         email_subject = f"Nuevo mensaje de contacto: {contact_data.subject}"
@@ -1237,24 +1515,39 @@ async def send_contact_message(contact_data: ContactMessage):
         ID del mensaje: {message_id}
         """
         
-        # Enviar email
-        email_sent = send_email(email_subject, email_body)
+        # Encolar email y notificación en la misma transacción que el mensaje
+        queue_email(cursor, email_subject, email_body)
+        create_notification(
+            "contact",
+            "Nuevo mensaje de contacto",
+            f"De {contact_data.name}: {contact_data.subject}",
+            message_id,
+            cursor=cursor
+        )
+        conn.commit()
+        conn.close()
+        email_outbox.wake_worker()
+        notification_stream.notify()
         
         return {
             "success": True,
             "message": "Mensaje enviado correctamente",
-            "email_sent": email_sent,
+            "email_queued": True,
             "id": message_id
         }
         
     except Exception as e:
         print(f"Error procesando mensaje de contacto: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
+    finally:
+        if conn is not None:
+            conn.close()
 
 @app.post("/newsletter/subscribe", summary="Suscribirse al newsletter")
-async def subscribe_newsletter(subscription_data: NewsletterSubscription):
+def subscribe_newsletter(subscription_data: NewsletterSubscription):
+    conn = None
     try:
-        conn = sqlite3.connect('cafe.db')
+        conn = db_pool.connect()
         cursor = conn.cursor()
         
         # Verificar si ya está suscrito
@@ -1262,6 +1555,7 @@ async def subscribe_newsletter(subscription_data: NewsletterSubscription):
                       (subscription_data.email,))
         existing = cursor.fetchone()
         
+        subscriber_id = None
         if existing:
             if existing[1]:  # Ya está activo
                 conn.close()
@@ -1273,8 +1567,6 @@ async def subscribe_newsletter(subscription_data: NewsletterSubscription):
             else:  # Reactivar suscripción
                 cursor.execute("UPDATE newsletter_subscribers SET active = 1, name = ? WHERE email = ?",
                              (subscription_data.name, subscription_data.email))
-                conn.commit()
-                conn.close()
                 message = "Suscripción reactivada correctamente"
         else:
             # Nueva suscripción
@@ -1283,17 +1575,6 @@ async def subscribe_newsletter(subscription_data: NewsletterSubscription):
                 VALUES (?, ?)
             ''', (subscription_data.email, subscription_data.name))
             subscriber_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
-            # Crear notificación para el admin
-            create_notification(
-                "newsletter",
-                "Nueva suscripción al newsletter",
-                f"{subscription_data.name or subscription_data.email} se suscribió",
-                subscriber_id
-            )
-            
             message = "Suscripción exitosa al newsletter"
         
         # Enviar email de confirmación
@@ -1319,8 +1600,8 @@ async def subscribe_newsletter(subscription_data: NewsletterSubscription):
         Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         """
         
-        # Enviar confirmación a suscriptor
-        confirmation_sent = send_email(email_subject, email_body, subscription_data.email)
+        # Encolar confirmación al suscriptor
+        queue_email(cursor, email_subject, email_body, subscription_data.email)
         
         # Notificar al admin
         admin_subject = "Nueva suscripción al newsletter - Café Demo"
@@ -1332,34 +1613,52 @@ async def subscribe_newsletter(subscription_data: NewsletterSubscription):
         Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         """
         
-        admin_notification_sent = send_email(admin_subject, admin_body)
+        queue_email(cursor, admin_subject, admin_body)
+        
+        if subscriber_id is not None:
+            # Crear notificación para el admin
+            create_notification(
+                "newsletter",
+                "Nueva suscripción al newsletter",
+                f"{subscription_data.name or subscription_data.email} se suscribió",
+                subscriber_id,
+                cursor=cursor
+            )
+        conn.commit()
+        conn.close()
+        email_outbox.wake_worker()
+        notification_stream.notify()
         
         return {
             "success": True,
             "message": message,
-            "confirmation_sent": confirmation_sent,
-            "admin_notified": admin_notification_sent
+            "confirmation_queued": True,
+            "admin_notification_queued": True
         }
         
     except Exception as e:
         print(f"Error en suscripción al newsletter: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
+    finally:
+        if conn is not None:
+            conn.close()
 
 # Endpoints administrativos para gestión de contactos y newsletter
 @app.get("/admin/contacts", summary="[ADMIN] Obtener mensajes de contacto")
-async def get_contact_messages(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, name, email, subject, message, created_at
-        FROM contact_messages 
-        ORDER BY created_at DESC
-        LIMIT 50
-    ''')
-    
-    messages = cursor.fetchall()
-    conn.close()
+def get_contact_messages(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    order: str = "desc",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    messages = admin_page(
+        response, "contact_messages", "id, name, email, subject, message, created_at",
+        ("created_at",), after, limit, order,
+        date_column="created_at", date_from=date_from, date_to=date_to
+    )
     
     return [
         {
@@ -1373,19 +1672,22 @@ async def get_contact_messages(current_user: str = Depends(verify_token)):
     ]
 
 @app.get("/admin/newsletter/subscribers", summary="[ADMIN] Obtener suscriptores del newsletter")
-async def get_newsletter_subscribers(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, email, name, subscribed_at, active
-        FROM newsletter_subscribers 
-        WHERE active = 1
-        ORDER BY subscribed_at DESC
-    ''')
-    
-    subscribers = cursor.fetchall()
-    conn.close()
+def get_newsletter_subscribers(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(500, ge=1, le=500),
+    order: str = "desc",
+    active: bool = True,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    subscribers = admin_page(
+        response, "newsletter_subscribers", "id, email, name, subscribed_at, active",
+        ("subscribed_at",), after, limit, order,
+        filters=[("active = ?", (1 if active else 0,))],
+        date_column="subscribed_at", date_from=date_from, date_to=date_to
+    )
     
     return [
         {
@@ -1397,54 +1699,81 @@ async def get_newsletter_subscribers(current_user: str = Depends(verify_token)):
         } for sub in subscribers
     ]
 
+@app.get("/admin/email-outbox/stats", summary="[ADMIN] Estado de la bandeja de salida de emails")
+def get_email_outbox_stats(current_user: str = Depends(verify_token)):
+    return {"by_status": email_outbox.outbox_stats()}
+
+@app.get("/admin/activity", summary="[ADMIN] Historial de actividad del panel")
+def get_activity_log(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    rows = admin_page(
+        response, "activity_log", activity_log.COLUMNS, ("created_at",), after, limit,
+        date_column="created_at", date_from=date_from, date_to=date_to
+    )
+    return [dict(zip(activity_log.COLUMNS.split(", "), row)) for row in rows]
+
+@app.get("/admin/cache/stats", summary="[ADMIN] Estadísticas de la caché de consultas")
+def get_cache_stats(current_user: str = Depends(verify_token)):
+    return query_cache.cache.stats()
+
 @app.post("/admin/newsletter/send", summary="[ADMIN] Enviar newsletter")
-async def send_newsletter(newsletter_data: dict, current_user: str = Depends(verify_token)):
+def send_newsletter(newsletter_data: dict, current_user: str = Depends(verify_token)):
     try:
-        # Obtener todos los suscriptores activos
-        conn = sqlite3.connect('cafe.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT email, name FROM newsletter_subscribers WHERE active = 1")
-        subscribers = cursor.fetchall()
-        conn.close()
-        
-        if not subscribers:
-            return {"success": False, "message": "No hay suscriptores activos"}
-        
         subject = newsletter_data.get("subject", "Newsletter - Café Demo")
         content = newsletter_data.get("content", "Contenido del newsletter")
         
-        sent_count = 0
-        failed_count = 0
+        # El envío se hace en segundo plano como campaña
+        campaign = newsletter_campaigns.create_campaign(subject, content)
+        if not campaign:
+            return {"success": False, "message": "No hay suscriptores activos"}
         
-        for email, name in subscribers:
-            personalized_content = f"Hola {name or 'amigo cafetero'},\n\n{content}\n\n¡Gracias por ser parte de Café Demo!"
-            
-            if send_email(subject, personalized_content, email):
-                sent_count += 1
-            else:
-                failed_count += 1
+        campaign_id, total_subscribers = campaign
+        newsletter_campaigns.wake_runner()
         
         return {
             "success": True,
-            "message": f"Newsletter enviado a {sent_count} suscriptores",
-            "sent_count": sent_count,
-            "failed_count": failed_count,
-            "total_subscribers": len(subscribers)
+            "message": f"Newsletter en envío a {total_subscribers} suscriptores",
+            "campaign_id": campaign_id,
+            "total_subscribers": total_subscribers
         }
         
     except Exception as e:
         print(f"Error enviando newsletter: {e}")
         raise HTTPException(status_code=500, detail="Error enviando newsletter")
 
+@app.get("/admin/newsletter/campaigns", summary="[ADMIN] Listar campañas de newsletter")
+def get_newsletter_campaigns(current_user: str = Depends(verify_token), limit: int = 20):
+    return newsletter_campaigns.list_campaigns(limit)
+
+@app.get("/admin/newsletter/campaigns/{campaign_id}", summary="[ADMIN] Progreso de una campaña de newsletter")
+def get_newsletter_campaign(campaign_id: int, current_user: str = Depends(verify_token)):
+    campaign = newsletter_campaigns.get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaña no encontrada")
+    return campaign
+
+@app.get("/admin/newsletter/campaigns/{campaign_id}/deliveries", summary="[ADMIN] Estado por destinatario de una campaña")
+def get_newsletter_campaign_deliveries(campaign_id: int, status: Optional[str] = None, limit: int = 100,
+                                       current_user: str = Depends(verify_token)):
+    if not newsletter_campaigns.get_campaign(campaign_id):
+        raise HTTPException(status_code=404, detail="Campaña no encontrada")
+    return newsletter_campaigns.get_deliveries(campaign_id, status, limit)
+
 # ================================
 # ENDPOINTS DE APLICACIONES DE TRABAJO
 # ================================
 
 @app.post("/jobs/apply", summary="Aplicar para trabajo")
-async def submit_job_application(job_data: JobApplication):
+def submit_job_application(job_data: JobApplication):
     try:
         # Guardar aplicación en base de datos
-        conn = sqlite3.connect('cafe.db')
+        conn = db_pool.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1454,8 +1783,6 @@ async def submit_job_application(job_data: JobApplication):
               job_data.experience, job_data.motivation, job_data.cv_filename))
         
         application_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         # Preparar email para el admin
         email_subject = f"Nueva aplicación de trabajo: {job_data.position}"
@@ -1481,8 +1808,8 @@ async def submit_job_application(job_data: JobApplication):
         ID de la aplicación: {application_id}
         """
         
-        # Enviar email al admin
-        admin_email_sent = send_email(email_subject, email_body)
+        # Encolar email al admin
+        queue_email(cursor, email_subject, email_body)
         
         # Enviar confirmación al aplicante
         confirmation_subject = "¡Hemos recibido tu aplicación! - Café Demo"
@@ -1511,13 +1838,16 @@ async def submit_job_application(job_data: JobApplication):
         Número de referencia: #{application_id}
         """
         
-        confirmation_sent = send_email(confirmation_subject, confirmation_body, job_data.email)
+        queue_email(cursor, confirmation_subject, confirmation_body, job_data.email)
+        conn.commit()
+        conn.close()
+        email_outbox.wake_worker()
         
         return {
             "success": True,
             "message": "Aplicación enviada correctamente",
-            "admin_notified": admin_email_sent,
-            "confirmation_sent": confirmation_sent,
+            "admin_notification_queued": True,
+            "confirmation_queued": True,
             "id": application_id
         }
         
@@ -1527,19 +1857,21 @@ async def submit_job_application(job_data: JobApplication):
 
 # Admin endpoints para aplicaciones de trabajo
 @app.get("/admin/job-applications", summary="[ADMIN] Obtener aplicaciones de trabajo")
-async def get_job_applications(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, name, email, phone, position, experience, motivation, cv_filename, created_at
-        FROM job_applications 
-        ORDER BY created_at DESC
-        LIMIT 50
-    ''')
-    
-    applications = cursor.fetchall()
-    conn.close()
+def get_job_applications(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    order: str = "desc",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    applications = admin_page(
+        response, "job_applications",
+        "id, name, email, phone, position, experience, motivation, cv_filename, created_at",
+        ("created_at",), after, limit, order,
+        date_column="created_at", date_from=date_from, date_to=date_to
+    )
     
     return [
         {
@@ -1557,8 +1889,8 @@ async def get_job_applications(current_user: str = Depends(verify_token)):
 
 # Endpoints para eliminar mensajes (admin)
 @app.delete("/admin/contacts/{contact_id}", summary="[ADMIN] Eliminar mensaje de contacto")
-async def delete_contact_message(contact_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_contact_message(contact_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM contact_messages WHERE id = ?", (contact_id,))
@@ -1573,8 +1905,8 @@ async def delete_contact_message(contact_id: int, current_user: str = Depends(ve
     return {"message": "Mensaje eliminado exitosamente"}
 
 @app.delete("/admin/newsletter/subscribers/{subscriber_id}", summary="[ADMIN] Eliminar suscriptor")
-async def delete_newsletter_subscriber(subscriber_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_newsletter_subscriber(subscriber_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM newsletter_subscribers WHERE id = ?", (subscriber_id,))
@@ -1589,8 +1921,8 @@ async def delete_newsletter_subscriber(subscriber_id: int, current_user: str = D
     return {"message": "Suscriptor desactivado exitosamente"}
 
 @app.delete("/admin/job-applications/{application_id}", summary="[ADMIN] Eliminar aplicación de trabajo")
-async def delete_job_application(application_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_job_application(application_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM job_applications WHERE id = ?", (application_id,))
@@ -1609,11 +1941,13 @@ async def delete_job_application(application_id: int, current_user: str = Depend
 # ================================
 
 @app.post("/reservations", response_model=ReservationResponse, summary="Crear nueva reserva")
-async def create_reservation(reservation_data: ReservationCreate):
+def create_reservation(reservation_data: ReservationCreate):
     try:
         # Validar fecha (no puede ser en el pasado)
         from datetime import datetime as dt
         try:
+            # Una sola forma de escribir cada día: la ocupación se agrupa por este texto
+            reservation_data.reservation_date = reservation_capacity.canonical_date(reservation_data.reservation_date)
             reservation_datetime = dt.strptime(f"{reservation_data.reservation_date} {reservation_data.reservation_time}", "%Y-%m-%d %H:%M")
             if reservation_datetime < dt.now():
                 raise HTTPException(status_code=400, detail="No se puede reservar en el pasado")
@@ -1624,108 +1958,119 @@ async def create_reservation(reservation_data: ReservationCreate):
         if reservation_data.party_size < 1 or reservation_data.party_size > 20:
             raise HTTPException(status_code=400, detail="El tamaño del grupo debe estar entre 1 y 20 personas")
         
-        # Verificar disponibilidad (simulación simple - en producción sería más complejo)
-        conn = sqlite3.connect('cafe.db')
-        cursor = conn.cursor()
-        
-        # Contar reservas existentes para la misma fecha y hora (dentro de 2 horas)
-        cursor.execute("""
-            SELECT COUNT(*) FROM reservations 
-            WHERE reservation_date = ? 
-            AND ABS(CAST(strftime('%s', reservation_time || ':00') AS INTEGER) - 
-                   CAST(strftime('%s', ? || ':00') AS INTEGER)) < 7200
-            AND status IN ('pending', 'confirmed')
-        """, (reservation_data.reservation_date, reservation_data.reservation_time))
-        
-        conflicting_reservations = cursor.fetchone()[0]
+        # Franjas de 30 minutos que ocupará la reserva
+        try:
+            slots = reservation_capacity.slot_range(reservation_data.reservation_time)
+        except reservation_capacity.CapacityError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Límite simple: máximo 5 reservas por franja de 2 horas
-        if conflicting_reservations >= 5:
-            conn.close()
-            raise HTTPException(status_code=409, detail="No hay disponibilidad para esa fecha y hora. Por favor elige otro horario.")
+        # Fecha y hora como enteros ordenables (reservation_day, reservation_minute)
+        try:
+            date_keys = reservation_dates.keys(reservation_data.reservation_date, reservation_data.reservation_time)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        
+        def book(cursor):
+            # Con el bloqueo de escritura ya tomado, la ocupación leída no puede
+            # cambiar hasta el commit: dos reservas simultáneas no sobrepasan el aforo
+            occupancy = reservation_capacity.day_occupancy(cursor, reservation_data.reservation_date)
+            if not reservation_capacity.fits(occupancy, slots, reservation_data.party_size):
+                raise HTTPException(status_code=409, detail="No hay disponibilidad para esa fecha y hora. Por favor elige otro horario.")
+        
+            # Crear la reserva
+            cursor.execute("""
+                INSERT INTO reservations (customer_name, customer_email, customer_phone, party_size, 
+                                        reservation_date, reservation_time, notes,
+                                        reservation_day, reservation_minute)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (reservation_data.customer_name, reservation_data.customer_email, reservation_data.customer_phone,
+                  reservation_data.party_size, reservation_data.reservation_date, reservation_data.reservation_time,
+                  reservation_data.notes,
+                  *date_keys))
+        
+            reservation_id = cursor.lastrowid
+            reservation_capacity.apply_reservation(cursor, reservation_id, 1)
+            daily_rollups.apply_reservation(cursor, reservation_id, 1)
         
-        # Crear la reserva
-        cursor.execute("""
-            INSERT INTO reservations (customer_name, customer_email, customer_phone, party_size, 
-                                    reservation_date, reservation_time, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (reservation_data.customer_name, reservation_data.customer_email, reservation_data.customer_phone,
-              reservation_data.party_size, reservation_data.reservation_date, reservation_data.reservation_time,
-              reservation_data.notes))
+            # Crear notificación para el admin
+            create_notification(
+                "reservation",
+                "Nueva reserva recibida",
+                f"{reservation_data.customer_name} para {reservation_data.party_size} personas el {reservation_data.reservation_date}",
+                reservation_id,
+                cursor=cursor
+            )
         
-        reservation_id = cursor.lastrowid
+            # Obtener la reserva creada
+            cursor.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
+            created_reservation = cursor.fetchone()
         
-        # Crear notificación para el admin
-        create_notification(
-            "reservation",
-            "Nueva reserva recibida",
-            f"{reservation_data.customer_name} para {reservation_data.party_size} personas el {reservation_data.reservation_date}",
-            reservation_id
-        )
+            # Preparar email de confirmación para el cliente
+            confirmation_subject = f"¡Reserva confirmada #{reservation_id}! - Café Demo"
+            confirmation_body = f"""
+            Hola {reservation_data.customer_name},
         
-        # Obtener la reserva creada
-        cursor.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
-        created_reservation = cursor.fetchone()
+            ¡Tu reserva en Café Demo ha sido confirmada! ☕
         
-        conn.commit()
-        conn.close()
+            DETALLES DE TU RESERVA:
+            ═══════════════════════════════════════
+            Número de reserva: #{reservation_id}
+            Fecha: {reservation_data.reservation_date}
+            Hora: {reservation_data.reservation_time}
+            Número de personas: {reservation_data.party_size}
         
-        # Preparar email de confirmación para el cliente
-        confirmation_subject = f"¡Reserva confirmada #{reservation_id}! - Café Demo"
-        confirmation_body = f"""
-        Hola {reservation_data.customer_name},
-        
-        ¡Tu reserva en Café Demo ha sido confirmada! ☕
-        
-        DETALLES DE TU RESERVA:
-        ═══════════════════════════════════════
-        Número de reserva: #{reservation_id}
-        Fecha: {reservation_data.reservation_date}
-        Hora: {reservation_data.reservation_time}
-        Número de personas: {reservation_data.party_size}
+            {f"NOTAS: {reservation_data.notes}" if reservation_data.notes else ""}
+            ═══════════════════════════════════════
         
-        {f"NOTAS: {reservation_data.notes}" if reservation_data.notes else ""}
-        ═══════════════════════════════════════
+            Te esperamos en la fecha y hora indicada.
+            Si necesitas hacer cambios o cancelar, por favor contáctanos con al menos 2 horas de anticipación.
         
-        Te esperamos en la fecha y hora indicada.
-        Si necesitas hacer cambios o cancelar, por favor contáctanos con al menos 2 horas de anticipación.
+            Teléfono de contacto: +34 123 456 789
         
-        Teléfono de contacto: +34 123 456 789
+            ¡Nos vemos pronto!
         
-        ¡Nos vemos pronto!
+            Con cariño,
+            El equipo de Café Demo
         
-        Con cariño,
-        El equipo de Café Demo
+            ---
+            Para cualquier consulta sobre tu reserva, responde a este email 
+            mencionando el número #{reservation_id}.
+            """
         
-        ---
-        Para cualquier consulta sobre tu reserva, responde a este email 
-        mencionando el número #{reservation_id}.
-        """
+            # Encolar confirmación al cliente
+            queue_email(cursor, confirmation_subject, confirmation_body, reservation_data.customer_email)
         
-        # Enviar confirmación al cliente
-        confirmation_sent = send_email(confirmation_subject, confirmation_body, reservation_data.customer_email)
+            # Notificar al admin
+            admin_subject = f"Nueva Reserva #{reservation_id} - {reservation_data.customer_name}"
+            admin_body = f"""
+            NUEVA RESERVA RECIBIDA:
+            ═══════════════════════════════════════
+            Número: #{reservation_id}
+            Cliente: {reservation_data.customer_name}
+            Email: {reservation_data.customer_email}
+            Teléfono: {reservation_data.customer_phone}
         
-        # Notificar al admin
-        admin_subject = f"Nueva Reserva #{reservation_id} - {reservation_data.customer_name}"
-        admin_body = f"""
-        NUEVA RESERVA RECIBIDA:
-        ═══════════════════════════════════════
-        Número: #{reservation_id}
-        Cliente: {reservation_data.customer_name}
-        Email: {reservation_data.customer_email}
-        Teléfono: {reservation_data.customer_phone}
+            Fecha: {reservation_data.reservation_date}
+            Hora: {reservation_data.reservation_time}
+            Personas: {reservation_data.party_size}
         
-        Fecha: {reservation_data.reservation_date}
-        Hora: {reservation_data.reservation_time}
-        Personas: {reservation_data.party_size}
+            {f"NOTAS DEL CLIENTE: {reservation_data.notes}" if reservation_data.notes else "Sin notas especiales"}
+            ═══════════════════════════════════════
         
-        {f"NOTAS DEL CLIENTE: {reservation_data.notes}" if reservation_data.notes else "Sin notas especiales"}
-        ═══════════════════════════════════════
+            Accede al panel de administración para gestionar esta reserva.
+            """
         
-        Accede al panel de administración para gestionar esta reserva.
-        """
+            queue_email(cursor, admin_subject, admin_body)
+            return created_reservation
         
-        admin_notification_sent = send_email(admin_subject, admin_body)
+        # Comprobación, reserva, notificación y emails en una sola transacción BEGIN IMMEDIATE
+        try:
+            created_reservation = db_pool.write_transaction(book)
+        except db_pool.WriteBusy:
+            raise HTTPException(status_code=503, detail="Hay muchas reservas en curso. Inténtalo de nuevo en unos segundos.")
+        reservation_capacity.store.invalidate()
+        email_outbox.wake_worker()
+        notification_stream.notify()
         
         return ReservationResponse(
             id=created_reservation[0],
@@ -1747,20 +2092,27 @@ async def create_reservation(reservation_data: ReservationCreate):
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @app.get("/admin/reservations", response_model=List[ReservationResponse], summary="[ADMIN] Obtener todas las reservas")
-async def get_admin_reservations(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, customer_name, customer_email, customer_phone, party_size, 
-               reservation_date, reservation_time, notes, status, created_at
-        FROM reservations 
-        ORDER BY reservation_date DESC, reservation_time DESC
-        LIMIT 200
-    """)
-    
-    reservations = cursor.fetchall()
-    conn.close()
+def get_admin_reservations(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(200, ge=1, le=500),
+    order: str = "desc",
+    sort: str = "date",
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    # sort=date: por fecha y hora de la reserva; sort=created: por fecha de alta
+    sort_columns = hot_queries.RESERVATION_SORT.get(sort)
+    if sort_columns is None:
+        raise HTTPException(status_code=400, detail="sort debe ser 'date' o 'created'")
+    
+    reservations = admin_page(
+        response, "reservations", hot_queries.ADMIN_RESERVATION_COLUMNS, sort_columns, after, limit, order,
+        filters=[("status = ?", (status,))] if status else [],
+        date_column="reservation_day", date_from=date_from, date_to=date_to
+    )
     
     return [
         ReservationResponse(
@@ -1777,18 +2129,35 @@ async def get_admin_reservations(current_user: str = Depends(verify_token)):
         ) for res in reservations
     ]
 
-@app.put("/admin/reservations/{reservation_id}/status", summary="[ADMIN] Actualizar estado de la reserva")
-async def update_reservation_status(reservation_id: int, status_data: dict, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    # Verificar si la reserva existe
-    cursor.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
-    existing_reservation = cursor.fetchone()
-    if not existing_reservation:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+def write_reservation_change(reservation_id: int, change):
+    """
+    Aplicar change(cursor) a una reserva existente en una transacción BEGIN
+    IMMEDIATE, restando su ocupación anterior y sumando la nueva. Si con el
+    cambio alguna franja supera el aforo (mover la reserva, ampliar el grupo o
+    reactivar una cancelada) no se guarda nada y se devuelve 409.
+    """
+    def work(cursor):
+        cursor.execute("SELECT 1 FROM reservations WHERE id = ?", (reservation_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Reserva no encontrada")
+        reservation_capacity.apply_reservation(cursor, reservation_id, -1)
+        daily_rollups.apply_reservation(cursor, reservation_id, -1)
+        change(cursor)
+        if not reservation_capacity.fits_reservation(cursor, reservation_id):
+            raise HTTPException(status_code=409, detail="No hay disponibilidad para esa fecha y hora")
+        reservation_capacity.apply_reservation(cursor, reservation_id, 1)
+        daily_rollups.apply_reservation(cursor, reservation_id, 1)
     
+    try:
+        db_pool.write_transaction(work)
+    except db_pool.WriteBusy:
+        raise HTTPException(status_code=503, detail="Hay muchas reservas en curso. Inténtalo de nuevo en unos segundos.")
+    reservation_capacity.store.invalidate()
+    # Los cambios de reserva quedan en el registro de actividad
+    query_cache.cache.invalidate("activity")
+
+@app.put("/admin/reservations/{reservation_id}/status", summary="[ADMIN] Actualizar estado de la reserva")
+def update_reservation_status(reservation_id: int, status_data: dict, current_user: str = Depends(verify_token)):
     new_status = status_data.get("status", "pending")
     
     # Validar estados permitidos
@@ -1796,10 +2165,12 @@ async def update_reservation_status(reservation_id: int, status_data: dict, curr
     if new_status not in allowed_statuses:
         raise HTTPException(status_code=400, detail=f"Estado no válido. Use uno de: {', '.join(allowed_statuses)}")
     
-    # Actualizar estado
-    cursor.execute("UPDATE reservations SET status = ? WHERE id = ?", (new_status, reservation_id))
-    conn.commit()
-    conn.close()
+    # Actualizar estado (reactivar una cancelada también pasa por el aforo)
+    def change(cursor):
+        cursor.execute("UPDATE reservations SET status = ? WHERE id = ?", (new_status, reservation_id))
+        activity_log.record(cursor, f"Estado de la reserva: {new_status}", "reservation", reservation_id, current_user)
+    
+    write_reservation_change(reservation_id, change)
     
     return {
         "message": f"Estado de la reserva #{reservation_id} actualizado a '{new_status}'",
@@ -1808,17 +2179,7 @@ async def update_reservation_status(reservation_id: int, status_data: dict, curr
     }
 
 @app.put("/admin/reservations/{reservation_id}", response_model=ReservationResponse, summary="[ADMIN] Actualizar reserva")
-async def update_reservation(reservation_id: int, reservation_update: ReservationUpdate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    # Verificar si la reserva existe
-    cursor.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
-    existing_reservation = cursor.fetchone()
-    if not existing_reservation:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Reserva no encontrada")
-    
+def update_reservation(reservation_id: int, reservation_update: ReservationUpdate, current_user: str = Depends(verify_token)):
     # Actualizar solo los campos que se proporcionan
     update_fields = []
     update_values = []
@@ -1838,9 +2199,17 @@ async def update_reservation(reservation_id: int, reservation_update: Reservatio
         update_fields.append("party_size = ?")
         update_values.append(reservation_update.party_size)
     if reservation_update.reservation_date is not None:
+        try:
+            reservation_date = reservation_capacity.canonical_date(reservation_update.reservation_date)
+        except reservation_capacity.CapacityError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         update_fields.append("reservation_date = ?")
-        update_values.append(reservation_update.reservation_date)
+        update_values.append(reservation_date)
     if reservation_update.reservation_time is not None:
+        try:
+            datetime.strptime(reservation_update.reservation_time, "%H:%M")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de hora inválido. Use HH:MM")
         update_fields.append("reservation_time = ?")
         update_values.append(reservation_update.reservation_time)
     if reservation_update.notes is not None:
@@ -1855,16 +2224,31 @@ async def update_reservation(reservation_id: int, reservation_update: Reservatio
     
     if update_fields:
         update_values.append(reservation_id)
-        cursor.execute(
-            f"UPDATE reservations SET {', '.join(update_fields)} WHERE id = ?",
-            update_values
-        )
-        conn.commit()
+        
+        # La fecha, la hora, el grupo o el estado pueden cambiar: se comprueba el aforo de nuevo
+        def change(cursor):
+            cursor.execute(
+                f"UPDATE reservations SET {', '.join(update_fields)} WHERE id = ?",
+                update_values
+            )
+            if reservation_update.reservation_date is not None or reservation_update.reservation_time is not None:
+                reservation_dates.set_keys(cursor, reservation_id)
+            activity_log.record(cursor, "Reserva editada", "reservation", reservation_id, current_user)
+        
+        try:
+            write_reservation_change(reservation_id, change)
+        except ValueError as e:
+            # reservation_dates.keys(): fecha u hora que no se pueden guardar como enteros
+            raise HTTPException(status_code=422, detail=str(e))
     
     # Obtener la reserva actualizada
+    conn = db_pool.connect()
+    cursor = conn.cursor()
     cursor.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
     updated_reservation = cursor.fetchone()
     conn.close()
+    if not updated_reservation:
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
     
     return ReservationResponse(
         id=updated_reservation[0],
@@ -1880,8 +2264,8 @@ async def update_reservation(reservation_id: int, reservation_update: Reservatio
     )
 
 @app.delete("/admin/reservations/{reservation_id}", summary="[ADMIN] Eliminar reserva")
-async def delete_reservation(reservation_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_reservation(reservation_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM reservations WHERE id = ?", (reservation_id,))
@@ -1889,40 +2273,29 @@ async def delete_reservation(reservation_id: int, current_user: str = Depends(ve
         conn.close()
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     
+    reservation_capacity.apply_reservation(cursor, reservation_id, -1)
+    daily_rollups.apply_reservation(cursor, reservation_id, -1)
     cursor.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
     conn.commit()
     conn.close()
+    reservation_capacity.store.invalidate()
     
     return {"message": f"Reserva #{reservation_id} eliminada exitosamente"}
 
 @app.get("/admin/reservations/stats", summary="[ADMIN] Estadísticas de reservas")
-async def get_reservations_stats(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_reservations_stats(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
-    # Total reservas
-    cursor.execute("SELECT COUNT(*) FROM reservations")
-    total_reservations = cursor.fetchone()[0]
-    
-    # Reservas pendientes
-    cursor.execute("SELECT COUNT(*) FROM reservations WHERE status = 'pending'")
-    pending_reservations = cursor.fetchone()[0]
-    
-    # Reservas confirmadas
-    cursor.execute("SELECT COUNT(*) FROM reservations WHERE status = 'confirmed'")
-    confirmed_reservations = cursor.fetchone()[0]
-    
-    # Reservas para hoy
-    cursor.execute("SELECT COUNT(*) FROM reservations WHERE reservation_date = date('now')")
-    today_reservations = cursor.fetchone()[0]
+    # Totales por estado y reservas de hoy, desde los resúmenes diarios
+    by_status = daily_rollups.reservation_totals(cursor)
+    total_reservations = sum(by_status.values())
+    pending_reservations = by_status.get("pending", 0)
+    confirmed_reservations = by_status.get("confirmed", 0)
+    today_reservations = sum(daily_rollups.reservation_totals(cursor, specials_date()).values())
     
     # Reservas recientes (últimas 5)
-    cursor.execute("""
-        SELECT id, customer_name, party_size, reservation_date, reservation_time, status
-        FROM reservations 
-        ORDER BY created_at DESC
-        LIMIT 5
-    """)
+    cursor.execute(hot_queries.RECENT_RESERVATIONS)
     recent_reservations = cursor.fetchall()
     
     conn.close()
@@ -1944,50 +2317,54 @@ async def get_reservations_stats(current_user: str = Depends(verify_token)):
         ]
     }
 
-@app.get("/reservations/availability/{date}", summary="Consultar disponibilidad para una fecha")
-async def get_availability(date: str):
-    """Consultar disponibilidad de reservas para una fecha específica"""
+def load_availability_range(date_from: str, date_to: str):
+    conn = db_pool.connect()
     try:
-        # Validar formato de fecha
-        from datetime import datetime as dt
-        dt.strptime(date, "%Y-%m-%d")
+        return reservation_capacity.availability_matrix(conn.cursor(), date_from, date_to)
+    finally:
+        conn.close()
+
+@app.get("/reservations/availability", summary="Consultar disponibilidad de un rango de fechas")
+def get_availability_range(
+    request: Request,
+    response: Response,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+):
+    """
+    Asientos libres por día y hora de inicio, hasta 62 días por consulta.
+    Una hora está disponible para un grupo si days[día][i] >= party_size.
+    """
+    try:
+        start = date.fromisoformat(date_from) if date_from else date.today()
+        end = date.fromisoformat(date_to) if date_to else start + timedelta(days=30)
     except ValueError:
-        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+        raise HTTPException(status_code=422, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=422, detail="'to' no puede ser anterior a 'from'")
+    if (end - start).days + 1 > reservation_capacity.MAX_RANGE_DAYS:
+        raise HTTPException(status_code=422, detail=f"El rango no puede superar {reservation_capacity.MAX_RANGE_DAYS} días")
     
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    # Obtener reservas para esa fecha
-    cursor.execute("""
-        SELECT reservation_time, COUNT(*) as count
-        FROM reservations 
-        WHERE reservation_date = ? AND status IN ('pending', 'confirmed')
-        GROUP BY reservation_time
-        ORDER BY reservation_time
-    """, (date,))
-    
-    reservations_by_time = cursor.fetchall()
-    conn.close()
-    
-    # Generar horarios disponibles (9:00 - 22:00 cada 30 min)
-    available_times = []
-    busy_times = {time: count for time, count in reservations_by_time}
-    
-    for hour in range(9, 22):
-        for minute in ['00', '30']:
-            time_slot = f"{hour:02d}:{minute}"
-            current_reservations = busy_times.get(time_slot, 0)
-            # Máximo 5 reservas por franja (simulación)
-            available = current_reservations < 5
-            available_times.append({
-                "time": time_slot,
-                "available": available,
-                "current_reservations": current_reservations
-            })
+    params = (start.isoformat(), end.isoformat())
+    return http_cache.cached_json(request, response, "occupancy", params, lambda: load_availability_range(*params))
+
+@app.get("/reservations/availability/{date}", summary="Consultar disponibilidad para una fecha")
+def get_availability(date: str, party_size: int = 1):
+    """Consultar disponibilidad de reservas para una fecha específica y un tamaño de grupo"""
+    try:
+        # Validar formato de fecha
+        date = reservation_capacity.canonical_date(date)
+    except reservation_capacity.CapacityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if party_size < 1 or party_size > 20:
+        raise HTTPException(status_code=400, detail="El tamaño del grupo debe estar entre 1 y 20 personas")
     
+    # Asientos libres en todas las franjas que ocuparía una reserva a cada hora
     return {
         "date": date,
-        "available_times": available_times
+        "party_size": party_size,
+        "seat_capacity": reservation_capacity.SEAT_CAPACITY,
+        "available_times": reservation_capacity.store.availability(date, party_size)
     }
 
 # ================================
@@ -1995,16 +2372,22 @@ async def get_availability(date: str):
 # ================================
 
 @app.post("/orders", response_model=OrderResponse, summary="Crear nuevo pedido")
-async def create_order(order_data: OrderCreate):
+def create_order(order_data: OrderCreate):
+    conn = None
     try:
-        # Calcular total
-        total_amount = sum(item.price * item.quantity for item in order_data.items)
+        # Valorar el pedido con los precios del servidor (índice en memoria)
+        try:
+            lines, total_amount = order_pricing.resolve_items([item.dict() for item in order_data.items])
+        except order_pricing.PricingError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not lines:
+            raise HTTPException(status_code=400, detail="El pedido no tiene productos")
         
         # Convertir items a JSON para almacenar
-        items_json = json.dumps([item.dict() for item in order_data.items])
+        items_json = json.dumps(lines)
         
         # Guardar pedido en base de datos
-        conn = sqlite3.connect('cafe.db')
+        conn = db_pool.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -2014,26 +2397,26 @@ async def create_order(order_data: OrderCreate):
               items_json, total_amount, order_data.notes))
         
         order_id = cursor.lastrowid
+        order_items.insert_items(cursor, order_id, lines)
+        daily_rollups.apply_order(cursor, order_id, 1)
         
         # Crear notificación para el admin
         create_notification(
             "order",
             "Nuevo pedido recibido",
             f"Pedido de {order_data.customer_name} por €{total_amount:.2f}",
-            order_id
+            order_id,
+            cursor=cursor
         )
         
         # Obtener el pedido creado con fecha
         cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
         created_order = cursor.fetchone()
         
-        conn.commit()
-        conn.close()
-        
         # Preparar email de confirmación para el cliente
         items_text = "\n".join([
-            f"  • {item.product_name} x{item.quantity} - €{item.price * item.quantity:.2f}"
-            for item in order_data.items
+            f"  • {line['product_name']} x{line['quantity']} - €{line['price'] * line['quantity']:.2f}"
+            for line in lines
         ])
         
         confirmation_subject = f"¡Pedido confirmado #{order_id}! - Café Demo"
@@ -2069,8 +2452,8 @@ async def create_order(order_data: OrderCreate):
         mencionando el número #{order_id}.
         """
         
-        # Enviar confirmación al cliente
-        confirmation_sent = send_email(confirmation_subject, confirmation_body, order_data.customer_email)
+        # Encolar confirmación al cliente
+        queue_email(cursor, confirmation_subject, confirmation_body, order_data.customer_email)
         
         # Notificar al admin
         admin_subject = f"Nuevo Pedido #{order_id} - {order_data.customer_name}"
@@ -2094,10 +2477,13 @@ async def create_order(order_data: OrderCreate):
         Accede al panel de administración para gestionar este pedido.
         """
         
-        admin_notification_sent = send_email(admin_subject, admin_body)
+        queue_email(cursor, admin_subject, admin_body)
+        conn.commit()
+        conn.close()
+        email_outbox.wake_worker()
+        notification_stream.notify()
         
-        # Convertir items JSON de vuelta a lista para respuesta
-        items_list = [OrderItem(**item) for item in json.loads(items_json)]
+        items_list = [OrderItem(**line) for line in lines]
         
         return OrderResponse(
             id=created_order[0],
@@ -2111,29 +2497,41 @@ async def create_order(order_data: OrderCreate):
             created_at=created_order[8]
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error creando pedido: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
+    finally:
+        # Sin commit, cerrar la conexión deshace el pedido a medias
+        if conn is not None:
+            conn.close()
 
 @app.get("/admin/orders", response_model=List[OrderResponse], summary="[ADMIN] Obtener todos los pedidos")
-async def get_admin_orders(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, customer_name, customer_email, customer_phone, items, total_amount, notes, status, created_at
-        FROM orders 
-        ORDER BY created_at DESC
-        LIMIT 100
-    ''')
+def get_admin_orders(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    order: str = "desc",
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    orders = admin_page(
+        response, "orders", hot_queries.ADMIN_ORDER_COLUMNS, ("created_at",), after, limit, order,
+        filters=[("status = ?", (status,))] if status else [],
+        date_column="created_at", date_from=date_from, date_to=date_to
+    )
     
-    orders = cursor.fetchall()
+    # Líneas de todos los pedidos de la página en una sola consulta
+    conn = db_pool.connect()
+    items_by_order = order_items.load_items(conn.cursor(), [order[0] for order in orders])
     conn.close()
     
     result = []
     for order in orders:
-        # Convertir items JSON de vuelta a lista
-        items_list = [OrderItem(**item) for item in json.loads(order[4])]
+        items_list = [OrderItem(**item) for item in items_by_order[order[0]]]
         
         result.append(OrderResponse(
             id=order[0],
@@ -2150,8 +2548,8 @@ async def get_admin_orders(current_user: str = Depends(verify_token)):
     return result
 
 @app.put("/admin/orders/{order_id}/status", summary="[ADMIN] Actualizar estado del pedido")
-async def update_order_status(order_id: int, status_data: dict, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def update_order_status(order_id: int, status_data: dict, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si el pedido existe
@@ -2163,10 +2561,14 @@ async def update_order_status(order_id: int, status_data: dict, current_user: st
     
     new_status = status_data.get("status", "pending")
     
-    # Actualizar estado
+    # Actualizar estado (y moverlo de estado en los resúmenes diarios)
+    daily_rollups.apply_order(cursor, order_id, -1)
     cursor.execute("UPDATE orders SET status = ? WHERE id = ?", (new_status, order_id))
+    daily_rollups.apply_order(cursor, order_id, 1)
+    activity_log.record(cursor, f"Estado del pedido: {new_status}", "order", order_id, current_user)
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("activity")
     
     return {
         "message": f"Estado del pedido #{order_id} actualizado a '{new_status}'",
@@ -2175,8 +2577,8 @@ async def update_order_status(order_id: int, status_data: dict, current_user: st
     }
 
 @app.delete("/admin/orders/{order_id}", summary="[ADMIN] Eliminar pedido")
-async def delete_order(order_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_order(order_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
@@ -2184,49 +2586,41 @@ async def delete_order(order_id: int, current_user: str = Depends(verify_token))
         conn.close()
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
     
+    daily_rollups.apply_order(cursor, order_id, -1)
     cursor.execute("DELETE FROM orders WHERE id = ?", (order_id,))
+    order_items.delete_items(cursor, order_id)
     conn.commit()
     conn.close()
     
     return {"message": f"Pedido #{order_id} eliminado exitosamente"}
 
 @app.get("/admin/orders/stats", summary="[ADMIN] Estadísticas de pedidos")
-async def get_orders_stats(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_orders_stats(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
-    # Total pedidos
-    cursor.execute("SELECT COUNT(*) FROM orders")
-    total_orders = cursor.fetchone()[0]
-    
-    # Pedidos pendientes
-    cursor.execute("SELECT COUNT(*) FROM orders WHERE status = 'pending'")
-    pending_orders = cursor.fetchone()[0]
-    
-    # Pedidos completados
-    cursor.execute("SELECT COUNT(*) FROM orders WHERE status = 'completed'")
-    completed_orders = cursor.fetchone()[0]
-    
-    # Ingresos totales
-    cursor.execute("SELECT SUM(total_amount) FROM orders WHERE status IN ('completed', 'pending')")
-    total_revenue = cursor.fetchone()[0] or 0
+    # Totales por estado desde los resúmenes diarios
+    by_status = daily_rollups.order_totals(cursor)
+    total_orders = sum(orders for orders, _ in by_status.values())
+    pending_orders = by_status.get("pending", (0, 0))[0]
+    completed_orders = by_status.get("completed", (0, 0))[0]
+    total_revenue = sum(by_status.get(status, (0, 0))[1] for status in daily_rollups.REVENUE_STATUSES)
     
     # Pedidos recientes (últimos 5)
-    cursor.execute('''
-        SELECT id, customer_name, total_amount, status, created_at
-        FROM orders 
-        ORDER BY created_at DESC
-        LIMIT 5
-    ''')
+    cursor.execute(hot_queries.RECENT_ORDERS)
     recent_orders = cursor.fetchall()
     
+    # Productos más vendidos
+    top_products = daily_rollups.product_sales(cursor, limit=5)
+    
     conn.close()
     
     return {
         "total_orders": total_orders,
         "pending_orders": pending_orders,
         "completed_orders": completed_orders,
-        "total_revenue": float(total_revenue),
+        "total_revenue": round(float(total_revenue), 2),
+        "top_products": top_products,
         "recent_orders": [
             {
                 "id": order[0],
@@ -2238,6 +2632,67 @@ async def get_orders_stats(current_user: str = Depends(verify_token)):
         ]
     }
 
+@app.get("/admin/orders/stats/products", summary="[ADMIN] Ventas por producto")
+def get_product_sales_stats(
+    limit: int = 20,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    if limit < 1 or limit > 200:
+        raise HTTPException(status_code=400, detail="limit debe estar entre 1 y 200")
+    try:
+        date_from = pagination.parse_date(date_from, "from") if date_from else None
+        date_to = pagination.parse_date(date_to, "to") if date_to else None
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    conn = db_pool.connect()
+    cursor = conn.cursor()
+    products = daily_rollups.product_sales(cursor, limit=limit, date_from=date_from, date_to=date_to)
+    conn.close()
+    
+    return {"products": products}
+
+@app.post("/admin/stats/rebuild", summary="[ADMIN] Reconstruir los resúmenes diarios de estadísticas")
+def rebuild_daily_rollups(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        counts = daily_rollups.rebuild(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+    return {"rows": counts}
+
+@app.get("/admin/export/{dataset}", summary="[ADMIN] Exportar pedidos, reservas, suscriptores o contactos")
+def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    """Descargar un conjunto de datos completo en CSV o NDJSON, generado en streaming"""
+    if dataset not in exports.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Exportación no disponible: {dataset}")
+    if format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail="format debe ser 'csv' o 'ndjson'")
+    
+    # Validar las fechas antes de empezar a enviar la respuesta
+    try:
+        filters = exports.build_filters(dataset, date_from, date_to)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    period = "-".join(part for part in (date_from, date_to) if part) or datetime.now().strftime("%Y%m%d")
+    return StreamingResponse(
+        exports.stream_rows(dataset, format, filters),
+        media_type=exports.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}-{period}.{format}"'}
+    )
+
 # ================================
 # ENDPOINTS DE NOTIFICACIONES ADMIN
 # ================================
@@ -2253,20 +2708,23 @@ class NotificationResponse(BaseModel):
     created_at: str
 
 @app.get("/admin/notifications", response_model=List[NotificationResponse], summary="[ADMIN] Obtener notificaciones")
-async def get_admin_notifications(current_user: str = Depends(verify_token), limit: int = 50):
-    """Obtener todas las notificaciones del admin, ordenadas por fecha (más recientes primero)"""
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, type, title, message, related_id, is_read, created_at
-        FROM admin_notifications 
-        ORDER BY created_at DESC
-        LIMIT ?
-    """, (limit,))
-    
-    notifications = cursor.fetchall()
-    conn.close()
+def get_admin_notifications(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    order: str = "desc",
+    unread: bool = False,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token)
+):
+    """Obtener las notificaciones del admin, ordenadas por fecha (más recientes primero)"""
+    notifications = admin_page(
+        response, "admin_notifications", "id, type, title, message, related_id, is_read, created_at",
+        ("created_at",), after, limit, order,
+        filters=[("is_read = 0", ())] if unread else [],
+        date_column="created_at", date_from=date_from, date_to=date_to
+    )
     
     return [
         NotificationResponse(
@@ -2281,81 +2739,127 @@ async def get_admin_notifications(current_user: str = Depends(verify_token), lim
     ]
 
 @app.get("/admin/notifications/unread", summary="[ADMIN] Obtener notificaciones no leídas")
-async def get_unread_admin_notifications(current_user: str = Depends(verify_token)):
+def get_unread_admin_notifications(current_user: str = Depends(verify_token)):
     """Obtener el conteo de notificaciones no leídas por tipo"""
     unread_counts = get_unread_notifications_count()
     
-    # También obtener el total
-    conn = sqlite3.connect('cafe.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM admin_notifications WHERE is_read = 0")
-    total_unread = cursor.fetchone()[0]
-    conn.close()
-    
     return {
-        "total_unread": total_unread,
+        "total_unread": sum(unread_counts.values()),
         "by_type": unread_counts
     }
 
+@app.post("/admin/notifications/reconcile", summary="[ADMIN] Recalcular contadores de notificaciones no leídas")
+def reconcile_notification_counters(current_user: str = Depends(verify_token)):
+    changes = notification_counters.reconcile()
+    return {
+        "corrected": {type_: {"before": old, "after": new} for type_, (old, new) in changes.items()}
+    }
+
+@app.post("/admin/notifications/retention", summary="[ADMIN] Archivar notificaciones antiguas ahora")
+def run_notification_retention(current_user: str = Depends(verify_token)):
+    result = notification_retention.run_retention()
+    result["read_ttl_days"] = notification_retention.READ_TTL_DAYS
+    result["unread_cap"] = notification_retention.UNREAD_CAP
+    return result
+
+@app.post("/admin/notifications/stream-ticket", summary="[ADMIN] Ticket de corta duración para el stream SSE")
+def create_notifications_stream_ticket(current_user: str = Depends(verify_token)):
+    return {"ticket": create_stream_ticket(current_user), "expires_in": STREAM_TICKET_SECONDS}
+
+@app.get("/admin/notifications/stream", summary="[ADMIN] Notificaciones en tiempo real (SSE)")
+async def stream_admin_notifications(request: Request, ticket: Optional[str] = None,
+                                     credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """
+    Stream text/event-stream con un evento "notification" por cada
+    notificación nueva. EventSource no admite cabeceras, así que se
+    autentica con ?ticket= (de POST /admin/notifications/stream-ticket),
+    nunca con el token del admin. Al reconectar, el navegador envía
+    Last-Event-ID (o ?last_event_id=) y se reenvían las notificaciones perdidas.
+    """
+    if credentials is not None:
+        verify_token(credentials)
+    elif ticket:
+        verify_stream_ticket(ticket)
+    else:
+        raise HTTPException(status_code=401, detail="Ticket requerido")
+    
+    # Al reabrir el stream con un ticket nuevo el cliente lo pasa en la query
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    
+    return StreamingResponse(
+        notification_stream.event_stream(request, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.put("/admin/notifications/{notification_id}/read", summary="[ADMIN] Marcar notificación como leída")
-async def mark_notification_as_read(notification_id: int, current_user: str = Depends(verify_token)):
+def mark_notification_as_read(notification_id: int, current_user: str = Depends(verify_token)):
     """Marcar una notificación específica como leída"""
-    conn = sqlite3.connect('cafe.db')
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar que la notificación existe
-    cursor.execute("SELECT id FROM admin_notifications WHERE id = ?", (notification_id,))
-    if not cursor.fetchone():
+    cursor.execute("SELECT type FROM admin_notifications WHERE id = ?", (notification_id,))
+    notification = cursor.fetchone()
+    if not notification:
         conn.close()
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
     
-    # Marcar como leída
-    cursor.execute("UPDATE admin_notifications SET is_read = 1 WHERE id = ?", (notification_id,))
+    # Marcar como leída (el contador solo baja si no lo estaba ya)
+    cursor.execute("UPDATE admin_notifications SET is_read = 1 WHERE id = ? AND is_read = 0", (notification_id,))
+    if cursor.rowcount:
+        notification_counters.adjust(cursor, notification[0], -1)
     conn.commit()
     conn.close()
     
     return {"message": "Notificación marcada como leída", "id": notification_id}
 
 @app.put("/admin/notifications/mark-all-read", summary="[ADMIN] Marcar todas las notificaciones como leídas")
-async def mark_all_notifications_as_read(current_user: str = Depends(verify_token)):
+def mark_all_notifications_as_read(current_user: str = Depends(verify_token)):
     """Marcar todas las notificaciones como leídas"""
-    conn = sqlite3.connect('cafe.db')
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("UPDATE admin_notifications SET is_read = 1 WHERE is_read = 0")
     updated_count = cursor.rowcount
+    notification_counters.reset(cursor)
     conn.commit()
     conn.close()
     
     return {"message": f"{updated_count} notificaciones marcadas como leídas"}
 
 @app.delete("/admin/notifications/{notification_id}", summary="[ADMIN] Eliminar notificación")
-async def delete_admin_notification(notification_id: int, current_user: str = Depends(verify_token)):
+def delete_admin_notification(notification_id: int, current_user: str = Depends(verify_token)):
     """Eliminar una notificación específica"""
-    conn = sqlite3.connect('cafe.db')
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar que la notificación existe
-    cursor.execute("SELECT id FROM admin_notifications WHERE id = ?", (notification_id,))
-    if not cursor.fetchone():
+    cursor.execute("SELECT type, is_read FROM admin_notifications WHERE id = ?", (notification_id,))
+    notification = cursor.fetchone()
+    if not notification:
         conn.close()
         raise HTTPException(status_code=404, detail="Notificación no encontrada")
     
     # Eliminar notificación
     cursor.execute("DELETE FROM admin_notifications WHERE id = ?", (notification_id,))
+    if cursor.rowcount and not notification[1]:
+        notification_counters.adjust(cursor, notification[0], -1)
     conn.commit()
     conn.close()
     
     return {"message": "Notificación eliminada exitosamente"}
 
 @app.delete("/admin/notifications/clear-all", summary="[ADMIN] Limpiar todas las notificaciones")
-async def clear_all_notifications(current_user: str = Depends(verify_token)):
+def clear_all_notifications(current_user: str = Depends(verify_token)):
     """Eliminar todas las notificaciones (usar con precaución)"""
-    conn = sqlite3.connect('cafe.db')
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("DELETE FROM admin_notifications")
     deleted_count = cursor.rowcount
+    notification_counters.reset(cursor)
     conn.commit()
     conn.close()
     
@@ -2397,7 +2901,7 @@ async def get_chatbot_status():
     }
 
 @app.post("/chatbot/test", summary="Probar chatbot directamente")
-async def test_chatbot(test_data: dict):
+def test_chatbot(test_data: dict):
     """
     Endpoint para probar el chatbot directamente sin usar WhatsApp.
     Útil para testing y debugging durante desarrollo.
@@ -2420,7 +2924,7 @@ async def test_chatbot(test_data: dict):
         raise HTTPException(status_code=500, detail=f"Error procesando mensaje: {str(e)}")
 
 @app.post("/chat", summary="Chat directo con el bot (para web)")
-async def web_chat(chat_data: dict):
+def web_chat(chat_data: dict):
     """
     Endpoint simplificado para chat web directo sin WhatsApp/Twilio.
     Perfecto para integrar chatbot directamente en la página web.
@@ -2452,31 +2956,18 @@ async def web_chat(chat_data: dict):
 # ENDPOINTS DE NOTICIAS
 # ================================
 
-@app.get("/news", response_model=List[NewsArticleResponse], summary="Obtener noticias públicas")
-async def get_public_news(featured_only: bool = False, limit: int = 50):
-    conn = sqlite3.connect('cafe.db')
+def load_public_news(featured_only: bool = False, limit: int = 50):
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    
+
     if featured_only:
-        cursor.execute("""
-            SELECT id, title, excerpt, content, author, category, featured, image, tags, published, created_at, updated_at
-            FROM news_articles 
-            WHERE published = 1 AND featured = 1
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (limit,))
+        cursor.execute(hot_queries.FEATURED_NEWS, (limit,))
     else:
-        cursor.execute("""
-            SELECT id, title, excerpt, content, author, category, featured, image, tags, published, created_at, updated_at
-            FROM news_articles 
-            WHERE published = 1
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (limit,))
-    
+        cursor.execute(hot_queries.NEWS, (limit,))
+
     articles = cursor.fetchall()
     conn.close()
-    
+
     return [
         NewsArticleResponse(
             id=art[0], title=art[1], excerpt=art[2], content=art[3],
@@ -2486,21 +2977,21 @@ async def get_public_news(featured_only: bool = False, limit: int = 50):
         ) for art in articles
     ]
 
-@app.get("/news/{article_id}", response_model=NewsArticleResponse, summary="Obtener noticia por ID")
-async def get_news_article(article_id: int):
-    conn = sqlite3.connect('cafe.db')
+@app.get("/news", response_model=List[NewsArticleResponse], summary="Obtener noticias públicas")
+def get_public_news(request: Request, response: Response, featured_only: bool = False, limit: int = 50):
+    return http_cache.cached_json(request, response, "news", (featured_only, limit), lambda: load_public_news(featured_only, limit))
+
+
+def load_news_article(article_id: int):
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, title, excerpt, content, author, category, featured, image, tags, published, created_at, updated_at
-        FROM news_articles 
-        WHERE id = ? AND published = 1
-    """, (article_id,))
+    cursor.execute(hot_queries.NEWS_ARTICLE, (article_id,))
     article = cursor.fetchone()
     conn.close()
-    
+
     if not article:
         raise HTTPException(status_code=404, detail="Noticia no encontrada")
-    
+
     return NewsArticleResponse(
         id=article[0], title=article[1], excerpt=article[2], content=article[3],
         author=article[4], category=article[5], featured=bool(article[6]),
@@ -2508,9 +2999,14 @@ async def get_news_article(article_id: int):
         published=bool(article[9]), created_at=article[10], updated_at=article[11]
     )
 
+@app.get("/news/{article_id}", response_model=NewsArticleResponse, summary="Obtener noticia por ID")
+def get_news_article(request: Request, response: Response, article_id: int):
+    return http_cache.cached_json(request, response, "news_article", (article_id,), lambda: load_news_article(article_id))
+
+
 @app.get("/admin/news", response_model=List[NewsArticleResponse], summary="[ADMIN] Obtener todas las noticias")
-async def get_admin_news(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_admin_news(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT id, title, excerpt, content, author, category, featured, image, tags, published, created_at, updated_at
@@ -2530,8 +3026,8 @@ async def get_admin_news(current_user: str = Depends(verify_token)):
     ]
 
 @app.post("/admin/news", response_model=NewsArticleResponse, summary="[ADMIN] Crear noticia")
-async def create_news_article(article: NewsArticleCreate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def create_news_article(article: NewsArticleCreate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     tags_json = json.dumps(article.tags)
@@ -2551,8 +3047,13 @@ async def create_news_article(article: NewsArticleCreate, current_user: str = De
     
     created_article = cursor.fetchone()
     
+    activity_log.record(cursor, "Noticia creada", "news", article_id, current_user)
+    query_cache.bump_versions(cursor, "news", "news_article")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("news")
+    query_cache.cache.invalidate("news_article", (article_id,))
+    query_cache.cache.invalidate("activity")
     
     return NewsArticleResponse(
         id=created_article[0], title=created_article[1], excerpt=created_article[2],
@@ -2564,8 +3065,8 @@ async def create_news_article(article: NewsArticleCreate, current_user: str = De
     )
 
 @app.put("/admin/news/{article_id}", response_model=NewsArticleResponse, summary="[ADMIN] Actualizar noticia")
-async def update_news_article(article_id: int, article_update: NewsArticleUpdate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def update_news_article(article_id: int, article_update: NewsArticleUpdate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si la noticia existe
@@ -2615,6 +3116,8 @@ async def update_news_article(article_id: int, article_update: NewsArticleUpdate
             f"UPDATE news_articles SET {', '.join(update_fields)} WHERE id = ?",
             update_values
         )
+        activity_log.record(cursor, "Noticia editada", "news", article_id, current_user)
+        query_cache.bump_versions(cursor, "news", "news_article")
         conn.commit()
     
     # Obtener la noticia actualizada
@@ -2625,6 +3128,9 @@ async def update_news_article(article_id: int, article_update: NewsArticleUpdate
     
     updated_article = cursor.fetchone()
     conn.close()
+    query_cache.cache.invalidate("news")
+    query_cache.cache.invalidate("news_article", (article_id,))
+    query_cache.cache.invalidate("activity")
     
     return NewsArticleResponse(
         id=updated_article[0], title=updated_article[1], excerpt=updated_article[2],
@@ -2636,8 +3142,8 @@ async def update_news_article(article_id: int, article_update: NewsArticleUpdate
     )
 
 @app.delete("/admin/news/{article_id}", summary="[ADMIN] Eliminar noticia")
-async def delete_news_article(article_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_news_article(article_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT id FROM news_articles WHERE id = ?", (article_id,))
@@ -2645,9 +3151,14 @@ async def delete_news_article(article_id: int, current_user: str = Depends(verif
         conn.close()
         raise HTTPException(status_code=404, detail="Noticia no encontrada")
     
+    activity_log.record(cursor, "Noticia eliminada", "news", article_id, current_user)
     cursor.execute("DELETE FROM news_articles WHERE id = ?", (article_id,))
+    query_cache.bump_versions(cursor, "news", "news_article")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("news")
+    query_cache.cache.invalidate("news_article", (article_id,))
+    query_cache.cache.invalidate("activity")
     
     return {"message": "Noticia eliminada exitosamente"}
 
@@ -2655,19 +3166,13 @@ async def delete_news_article(article_id: int, current_user: str = Depends(verif
 # ENDPOINTS DE CARRUSEL DE IMÁGENES
 # ================================
 
-@app.get("/carousel", response_model=List[CarouselImageResponse], summary="Obtener imágenes del carrusel")
-async def get_carousel_images():
-    conn = sqlite3.connect('cafe.db')
+def load_carousel_images():
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, title, subtitle, description, image, link, active, order_position, created_at
-        FROM carousel_images 
-        WHERE active = 1
-        ORDER BY order_position ASC, created_at DESC
-    """)
+    cursor.execute(hot_queries.CAROUSEL)
     images = cursor.fetchall()
     conn.close()
-    
+
     return [
         CarouselImageResponse(
             id=img[0], title=img[1], subtitle=img[2], description=img[3],
@@ -2676,9 +3181,14 @@ async def get_carousel_images():
         ) for img in images
     ]
 
+@app.get("/carousel", response_model=List[CarouselImageResponse], summary="Obtener imágenes del carrusel")
+def get_carousel_images(request: Request, response: Response):
+    return http_cache.cached_json(request, response, "carousel", (), load_carousel_images)
+
+
 @app.get("/admin/carousel", response_model=List[CarouselImageResponse], summary="[ADMIN] Obtener todas las imágenes del carrusel")
-async def get_admin_carousel_images(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_admin_carousel_images(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT id, title, subtitle, description, image, link, active, order_position, created_at
@@ -2697,8 +3207,8 @@ async def get_admin_carousel_images(current_user: str = Depends(verify_token)):
     ]
 
 @app.post("/admin/carousel", response_model=CarouselImageResponse, summary="[ADMIN] Crear imagen del carrusel")
-async def create_carousel_image(image_data: CarouselImageCreate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def create_carousel_image(image_data: CarouselImageCreate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -2715,8 +3225,12 @@ async def create_carousel_image(image_data: CarouselImageCreate, current_user: s
     """, (image_id,))
     
     created_image = cursor.fetchone()
+    activity_log.record(cursor, "Imagen del carrusel creada", "carousel", image_id, current_user)
+    query_cache.bump_versions(cursor, "carousel")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("carousel")
+    query_cache.cache.invalidate("activity")
     
     return CarouselImageResponse(
         id=created_image[0], title=created_image[1], subtitle=created_image[2],
@@ -2726,8 +3240,8 @@ async def create_carousel_image(image_data: CarouselImageCreate, current_user: s
     )
 
 @app.put("/admin/carousel/{image_id}", response_model=CarouselImageResponse, summary="[ADMIN] Actualizar imagen del carrusel")
-async def update_carousel_image(image_id: int, image_update: CarouselImageUpdate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def update_carousel_image(image_id: int, image_update: CarouselImageUpdate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si la imagen existe
@@ -2768,6 +3282,8 @@ async def update_carousel_image(image_id: int, image_update: CarouselImageUpdate
             f"UPDATE carousel_images SET {', '.join(update_fields)} WHERE id = ?",
             update_values
         )
+        activity_log.record(cursor, "Imagen del carrusel editada", "carousel", image_id, current_user)
+        query_cache.bump_versions(cursor, "carousel")
         conn.commit()
     
     # Obtener la imagen actualizada
@@ -2778,6 +3294,8 @@ async def update_carousel_image(image_id: int, image_update: CarouselImageUpdate
     
     updated_image = cursor.fetchone()
     conn.close()
+    query_cache.cache.invalidate("carousel")
+    query_cache.cache.invalidate("activity")
     
     return CarouselImageResponse(
         id=updated_image[0], title=updated_image[1], subtitle=updated_image[2],
@@ -2787,8 +3305,8 @@ async def update_carousel_image(image_id: int, image_update: CarouselImageUpdate
     )
 
 @app.delete("/admin/carousel/{image_id}", summary="[ADMIN] Eliminar imagen del carrusel")
-async def delete_carousel_image(image_id: int, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_carousel_image(image_id: int, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT id FROM carousel_images WHERE id = ?", (image_id,))
@@ -2796,9 +3314,13 @@ async def delete_carousel_image(image_id: int, current_user: str = Depends(verif
         conn.close()
         raise HTTPException(status_code=404, detail="Imagen no encontrada")
     
+    activity_log.record(cursor, "Imagen del carrusel eliminada", "carousel", image_id, current_user)
     cursor.execute("DELETE FROM carousel_images WHERE id = ?", (image_id,))
+    query_cache.bump_versions(cursor, "carousel")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("carousel")
+    query_cache.cache.invalidate("activity")
     
     return {"message": "Imagen del carrusel eliminada exitosamente"}
 
@@ -2806,33 +3328,20 @@ async def delete_carousel_image(image_id: int, current_user: str = Depends(verif
 # ENDPOINTS DE CONTENIDO DE PÁGINA
 # ================================
 
-@app.get("/content", response_model=List[PageContentResponse], summary="Obtener contenido de página")
-async def get_page_content(page: Optional[str] = None, section: Optional[str] = None):
-    conn = sqlite3.connect('cafe.db')
+def load_page_content(page: Optional[str] = None, section: Optional[str] = None):
+    conn = db_pool.connect()
     cursor = conn.cursor()
-    
+
     if page and section:
-        cursor.execute("""
-            SELECT id, title, content, section, page, updated_at
-            FROM page_content 
-            WHERE page = ? AND section = ?
-        """, (page, section))
+        cursor.execute(hot_queries.PAGE_SECTION, (page, section))
     elif page:
-        cursor.execute("""
-            SELECT id, title, content, section, page, updated_at
-            FROM page_content 
-            WHERE page = ?
-        """, (page,))
+        cursor.execute(hot_queries.PAGE, (page,))
     else:
-        cursor.execute("""
-            SELECT id, title, content, section, page, updated_at
-            FROM page_content 
-            ORDER BY page, section
-        """)
-    
+        cursor.execute(hot_queries.ALL_CONTENT)
+
     contents = cursor.fetchall()
     conn.close()
-    
+
     return [
         PageContentResponse(
             id=content[0], title=content[1], content=content[2],
@@ -2840,9 +3349,48 @@ async def get_page_content(page: Optional[str] = None, section: Optional[str] =
         ) for content in contents
     ]
 
+@app.get("/content", response_model=List[PageContentResponse], summary="Obtener contenido de página")
+def get_page_content(request: Request, response: Response, page: Optional[str] = None, section: Optional[str] = None):
+    return http_cache.cached_json(request, response, "content", (page, section), lambda: load_page_content(page, section))
+
+# Secciones de /bootstrap y las que se envían por defecto para cada página
+BOOTSTRAP_SECTIONS = ("products", "specials", "categories", "carousel", "content", "news")
+BOOTSTRAP_PAGES = {
+    "home": ["carousel", "specials", "content", "news"],
+    "menu": ["categories", "products", "specials"],
+}
+
+@app.get("/bootstrap", summary="Datos iniciales de una página pública en una sola petición")
+def get_bootstrap(request: Request, page: str = "home", sections: Optional[str] = None):
+    """
+    Devuelve en una sola respuesta las secciones que necesita una página
+    (productos, especiales, categorías, carrusel, contenido y noticias
+    destacadas), a partir de los mismos fragmentos cacheados que sus
+    endpoints. `sections` permite elegir las secciones separadas por comas.
+    """
+    if sections:
+        requested = [name.strip() for name in sections.split(",") if name.strip()]
+    else:
+        requested = BOOTSTRAP_PAGES.get(page, ["content"])
+    unknown = [name for name in requested if name not in BOOTSTRAP_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Secciones no válidas: {', '.join(unknown)}")
+    
+    today = specials_date()
+    available = {
+        "products": ("products", (None,), load_products),
+        "specials": ("specials", (today,), lambda: load_specials(today)),
+        "categories": ("categories", (), load_categories),
+        "carousel": ("carousel", (), load_carousel_images),
+        "content": ("content", (page, None), lambda: load_page_content(page)),
+        "news": ("news", (True, 50), lambda: load_public_news(True, 50)),
+    }
+    return http_cache.cached_bundle(request, {name: available[name] for name in dict.fromkeys(requested)})
+
+
 @app.get("/admin/content", response_model=List[PageContentResponse], summary="[ADMIN] Obtener todo el contenido de página")
-async def get_admin_page_content(current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def get_admin_page_content(current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT id, title, content, section, page, updated_at
@@ -2860,8 +3408,8 @@ async def get_admin_page_content(current_user: str = Depends(verify_token)):
     ]
 
 @app.post("/admin/content", response_model=PageContentResponse, summary="[ADMIN] Crear contenido de página")
-async def create_page_content(content_data: PageContentCreate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def create_page_content(content_data: PageContentCreate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si ya existe contenido con el mismo ID
@@ -2882,8 +3430,12 @@ async def create_page_content(content_data: PageContentCreate, current_user: str
     """, (content_data.id,))
     
     created_content = cursor.fetchone()
+    activity_log.record(cursor, "Contenido creado", "content", content_data.id, current_user)
+    query_cache.bump_versions(cursor, "content")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("content")
+    query_cache.cache.invalidate("activity")
     
     return PageContentResponse(
         id=created_content[0], title=created_content[1], content=created_content[2],
@@ -2891,8 +3443,8 @@ async def create_page_content(content_data: PageContentCreate, current_user: str
     )
 
 @app.put("/admin/content/{content_id}", response_model=PageContentResponse, summary="[ADMIN] Actualizar contenido de página")
-async def update_page_content(content_id: str, content_update: PageContentUpdate, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def update_page_content(content_id: str, content_update: PageContentUpdate, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     # Verificar si el contenido existe
@@ -2927,6 +3479,8 @@ async def update_page_content(content_id: str, content_update: PageContentUpdate
             f"UPDATE page_content SET {', '.join(update_fields)} WHERE id = ?",
             update_values
         )
+        activity_log.record(cursor, "Contenido editado", "content", content_id, current_user)
+        query_cache.bump_versions(cursor, "content")
         conn.commit()
     
     # Obtener el contenido actualizado
@@ -2937,6 +3491,8 @@ async def update_page_content(content_id: str, content_update: PageContentUpdate
     
     updated_content = cursor.fetchone()
     conn.close()
+    query_cache.cache.invalidate("content")
+    query_cache.cache.invalidate("activity")
     
     return PageContentResponse(
         id=updated_content[0], title=updated_content[1], content=updated_content[2],
@@ -2944,8 +3500,8 @@ async def update_page_content(content_id: str, content_update: PageContentUpdate
     )
 
 @app.delete("/admin/content/{content_id}", summary="[ADMIN] Eliminar contenido de página")
-async def delete_page_content(content_id: str, current_user: str = Depends(verify_token)):
-    conn = sqlite3.connect('cafe.db')
+def delete_page_content(content_id: str, current_user: str = Depends(verify_token)):
+    conn = db_pool.connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT id FROM page_content WHERE id = ?", (content_id,))
@@ -2953,9 +3509,13 @@ async def delete_page_content(content_id: str, current_user: str = Depends(verif
         conn.close()
         raise HTTPException(status_code=404, detail="Contenido no encontrado")
     
+    activity_log.record(cursor, "Contenido eliminado", "content", content_id, current_user)
     cursor.execute("DELETE FROM page_content WHERE id = ?", (content_id,))
+    query_cache.bump_versions(cursor, "content")
     conn.commit()
     conn.close()
+    query_cache.cache.invalidate("content")
+    query_cache.cache.invalidate("activity")
     
     return {"message": "Contenido eliminado exitosamente"}
 
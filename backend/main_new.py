@@ -1,7 +1,7 @@
 """
 Café Demo API - Versión con SQLAlchemy y soporte PostgreSQL/SQLite
 """
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request, Response
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
@@ -18,12 +18,16 @@ import shutil
 # Importar módulos locales
 import chatbot
 from database import (
-    get_db, create_tables, get_database_info,
+    get_db, create_tables, get_database_info, SessionLocal,
     Product, Special, ProductCategory, NewsArticle, CarouselImage,
     PageContent, ContactMessage, NewsletterSubscriber, JobApplication,
     Order, Reservation, AdminNotification
 )
-from utils import create_admin_notification, get_unread_notifications_count, send_email, serialize_json, deserialize_json
+from utils import (
+    create_admin_notification, get_unread_notifications_count, reconcile_notification_counters,
+    send_email, serialize_json, deserialize_json, paginate_query
+)
+import pagination
 from init_data import init_sample_data
 
 # ================================
@@ -330,6 +334,28 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
+def admin_page(response: Response, query, sort_columns: tuple, id_column, after: Optional[str], limit: int,
+               order: str = "desc", date_column=None, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """
+    Página de un listado del admin paginado por cursor. El cursor de la
+    página siguiente se devuelve en la cabecera X-Next-Cursor.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order debe ser 'asc' o 'desc'")
+    try:
+        if date_column is not None and date_from:
+            query = query.filter(date_column >= date.fromisoformat(pagination.parse_date(date_from, "from")))
+        if date_column is not None and date_to:
+            day_after = date.fromisoformat(pagination.parse_date(date_to, "to")) + timedelta(days=1)
+            query = query.filter(date_column < day_after)
+        rows, next_cursor = paginate_query(query, sort_columns, id_column, after, limit, descending=(order == "desc"))
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
 # Inicializar carpeta de uploads
 def init_uploads():
     os.makedirs("uploads/products", exist_ok=True)
@@ -352,6 +378,14 @@ try:
 except Exception as e:
     print(f"⚠️ Error inicializando datos de muestra: {e}")
 
+# Cuadrar los contadores de no leídas (p. ej. tras migrar notificaciones)
+try:
+    db = SessionLocal()
+    reconcile_notification_counters(db)
+    db.close()
+except Exception as e:
+    print(f"⚠️ Error reconciliando contadores de notificaciones: {e}")
+
 print("✅ Base de datos inicializada con SQLAlchemy")
 print("🗄️ Información de BD:", get_database_info())
 print("🚀 API corriendo en http://localhost:8000")
@@ -375,6 +409,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El cursor de la página siguiente de los listados del admin
+    expose_headers=[pagination.NEXT_CURSOR_HEADER],
 )
 
 # Servir archivos estáticos
@@ -733,9 +769,21 @@ async def chat_with_bot(message_data: dict):
 # ================================
 
 @app.get("/admin/contacts", summary="[ADMIN] Obtener mensajes de contacto")
-async def get_admin_contacts(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    """Obtener todos los mensajes de contacto para el admin"""
-    contacts = db.query(ContactMessage).order_by(ContactMessage.created_at.desc()).all()
+async def get_admin_contacts(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    order: str = "desc",
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """Obtener los mensajes de contacto para el admin, paginados por cursor"""
+    contacts = admin_page(
+        response, db.query(ContactMessage), (ContactMessage.created_at,), ContactMessage.id,
+        after, limit, order, ContactMessage.created_at, date_from, date_to
+    )
     
     return [
         {
@@ -750,11 +798,23 @@ async def get_admin_contacts(current_user: str = Depends(verify_token), db: Sess
     ]
 
 @app.get("/admin/newsletter/subscribers", summary="[ADMIN] Obtener suscriptores del newsletter")
-async def get_admin_newsletter_subscribers(current_user: str = Depends(verify_token), db: Session = Depends(get_db)):
-    """Obtener todos los suscriptores del newsletter para el admin"""
-    subscribers = db.query(NewsletterSubscriber).filter(
-        NewsletterSubscriber.active == True
-    ).order_by(NewsletterSubscriber.subscribed_at.desc()).all()
+async def get_admin_newsletter_subscribers(
+    response: Response,
+    after: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(500, ge=1, le=500),
+    order: str = "desc",
+    active: bool = True,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    current_user: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """Obtener los suscriptores del newsletter para el admin, paginados por cursor"""
+    subscribers = admin_page(
+        response, db.query(NewsletterSubscriber).filter(NewsletterSubscriber.active == active),
+        (NewsletterSubscriber.subscribed_at,), NewsletterSubscriber.id,
+        after, limit, order, NewsletterSubscriber.subscribed_at, date_from, date_to
+    )
     
     return [
         {
@@ -1123,75 +1183,3 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"""
     except Exception as e:
         print(f"Error enviando respuesta del admin: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
-
-# ================================
-# FUNCIÓN AUXILIAR NEWSLETTER
-# ================================
-
-async def send_newsletter_to_subscribers(subject: str, content: str, db: Session):
-    """
-    Función para enviar newsletter a todos los suscriptores activos
-    """
-    try:
-        # Obtener todos los suscriptores activos
-        subscribers = db.query(NewsletterSubscriber).filter(
-            NewsletterSubscriber.active == True
-        ).all()
-        
-        if not subscribers:
-            return {"sent": 0, "message": "No hay suscriptores activos"}
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for subscriber in subscribers:
-            try:
-                # Plantilla personalizada para cada suscriptor
-                newsletter_body = f"""¡Hola {subscriber.name or 'amigo cafetero'}!
-
-¡Tenemos noticias emocionantes desde Café Demo! ☕
-
-{content}
-
-¡No te lo pierdas! Ven a visitarnos y disfruta de la experiencia completa.
-
-📍 **¿Dónde encontrarnos?**
-Calle Principal 123, Madrid
-📞 Teléfono: +34 123 456 789
-⏰ Horarios: Lunes a Domingo, 7:00 - 22:00
-
-¡Gracias por ser parte de nuestra comunidad cafetera!
-
-Con cariño,
-El equipo de Café Demo
-
----
-Email: {subscriber.email}
-Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
-
-Si no deseas recibir más newsletters, puedes darte de baja respondiendo a este email."""
-                
-                success = send_email(
-                    to_email=subscriber.email,
-                    subject=subject,
-                    body=newsletter_body
-                )
-                
-                if success:
-                    sent_count += 1
-                else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                print(f"Error enviando newsletter a {subscriber.email}: {e}")
-                failed_count += 1
-        
-        return {
-            "sent": sent_count,
-            "failed": failed_count,
-            "total_subscribers": len(subscribers)
-        }
-        
-    except Exception as e:
-        print(f"Error en envío masivo de newsletter: {e}")
-        return {"sent": 0, "failed": 0, "error": str(e)}
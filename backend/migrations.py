@@ -0,0 +1,81 @@
+"""
+Migraciones de esquema versionadas
+
+init_db/init_contact_db crean las tablas (CREATE TABLE IF NOT EXISTS); los
+índices secundarios y los cambios sobre tablas existentes van aquí, en
+orden y numerados. PRAGMA user_version guarda la última migración
+aplicada, así que cada una se ejecuta una sola vez por base de datos y el
+arranque normal solo lee ese número.
+
+Cada migración corre en su propia transacción BEGIN IMMEDIATE y vuelve a
+leer user_version dentro de ella: si varios workers arrancan a la vez,
+solo uno la aplica. Para añadir una, agregarla al final de MIGRATIONS con
+el siguiente número; nunca modificar una ya publicada.
+"""
+import db_pool
+import order_items
+import reservation_dates
+
+# (versión, descripción, sentencias SQL o función que recibe el cursor)
+MIGRATIONS = (
+    (1, "Índices de los listados paginados del admin", (
+        # Filtro + columna de orden; el id va implícito como desempate
+        "CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_reservations_created ON reservations (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_contact_messages_created ON contact_messages (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_newsletter_subscribers_active_subscribed ON newsletter_subscribers (active, subscribed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_job_applications_created ON job_applications (created_at)",
+    )),
+    (2, "Fecha y hora de las reservas como enteros indexados", reservation_dates.migrate),
+    (3, "Índices de las consultas públicas más frecuentes", (
+        # /products (con y sin categoría) y contadores del dashboard
+        "CREATE INDEX IF NOT EXISTS idx_products_available_category_name ON products (available, category, name)",
+        # /specials del día ordenadas por descuento
+        "CREATE INDEX IF NOT EXISTS idx_specials_date_discount ON specials (date, discount)",
+        # Índice de precios (LEFT JOIN por producto y fecha) y borrado de productos
+        "CREATE INDEX IF NOT EXISTS idx_specials_product_date ON specials (product_id, date, discount)",
+        # /news y /news?featured_only=true
+        "CREATE INDEX IF NOT EXISTS idx_news_articles_published_created ON news_articles (published, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_news_articles_published_featured_created ON news_articles (published, featured, created_at)",
+        # /carousel: activas por posición y las más nuevas primero
+        "CREATE INDEX IF NOT EXISTS idx_carousel_images_active_position ON carousel_images (active, order_position, created_at DESC)",
+        # /content por página y sección
+        "CREATE INDEX IF NOT EXISTS idx_page_content_page_section ON page_content (page, section)",
+        # /categories por nombre
+        "CREATE INDEX IF NOT EXISTS idx_product_categories_name ON product_categories (name)",
+    )),
+    (4, "Líneas de los pedidos antiguos en order_items", order_items.migrate),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(cursor) -> int:
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+def migrate() -> int:
+    """Aplicar las migraciones pendientes; devuelve cuántas se aplicaron"""
+    conn = db_pool.connect()
+    applied = 0
+    try:
+        cursor = conn.cursor()
+        if current_version(cursor) >= LATEST_VERSION:
+            return 0
+        for version, description, steps in MIGRATIONS:
+            cursor.execute("BEGIN IMMEDIATE")
+            if current_version(cursor) >= version:
+                conn.rollback()
+                continue
+            if callable(steps):
+                steps(cursor)
+            else:
+                for sql in steps:
+                    cursor.execute(sql)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            applied += 1
+            print(f"🗂️ Migración {version} aplicada: {description}")
+    finally:
+        conn.close()
+    return applied
@@ -0,0 +1,386 @@
+"""
+Campañas de newsletter en segundo plano
+
+Cada envío se guarda como una campaña en newsletter_campaigns y sus
+destinatarios en newsletter_deliveries, con un estado por destinatario
+(pending/sending/sent/failed). Un hilo procesa la campaña por bloques de N
+destinatarios pendientes usando el pool de sesiones SMTP, limitado por un
+token bucket para respetar la cuota del proveedor.
+
+Antes de enviar un bloque sus destinatarios pasan a 'sending' y, tras
+enviarlo, se guarda el resultado de cada uno. Mientras la campaña está en
+marcha un hilo renueva heartbeat_at cada HEARTBEAT_INTERVAL segundos, así
+que un bloque lento no hace que otro worker la dé por huérfana. Si el
+proceso se cae, quien la retome continúa con los pendientes y marca como
+fallidos los que quedaron en 'sending' (pudieron llegar a enviarse): nadie
+recibe la newsletter dos veces.
+"""
+import os
+import threading
+import time
+
+import db_pool
+import mailer
+
+CHUNK_SIZE = int(os.getenv("NEWSLETTER_CHUNK_SIZE", "200"))
+# Límite de envío (mensajes/segundo) y ráfaga máxima del token bucket
+RATE_PER_SECOND = float(os.getenv("NEWSLETTER_RATE_PER_SECOND", "10"))
+RATE_BURST = float(os.getenv("NEWSLETTER_RATE_BURST", "20"))
+POLL_INTERVAL = float(os.getenv("NEWSLETTER_POLL_INTERVAL", "30"))
+# Una campaña "running" sin latido durante este tiempo se considera huérfana;
+# el latido se renueva cuatro veces por periodo, también a mitad de bloque
+HEARTBEAT_TIMEOUT = float(os.getenv("NEWSLETTER_HEARTBEAT_TIMEOUT", "120"))
+HEARTBEAT_INTERVAL = HEARTBEAT_TIMEOUT / 4
+
+def personalize(content: str, name: str = None) -> str:
+    return f"Hola {name or 'amigo cafetero'},\n\n{content}\n\n¡Gracias por ser parte de Café Demo!"
+
+def create_campaign(subject: str, content: str):
+    """
+    Crear una campaña en cola junto con sus destinatarios.
+    Devuelve (id, total) o None si no hay suscriptores activos.
+    """
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO newsletter_campaigns (subject, content)
+            VALUES (?, ?)
+        ''', (subject, content))
+        campaign_id = cursor.lastrowid
+
+        # La lista de destinatarios se copia dentro de SQLite, sin pasar por Python
+        cursor.execute('''
+            INSERT INTO newsletter_deliveries (campaign_id, subscriber_id, email)
+            SELECT ?, id, email FROM newsletter_subscribers WHERE active = 1
+        ''', (campaign_id,))
+        total = cursor.rowcount
+        if total == 0:
+            conn.rollback()
+            return None
+
+        cursor.execute("UPDATE newsletter_campaigns SET total = ? WHERE id = ?", (total, campaign_id))
+        conn.commit()
+        return campaign_id, total
+    finally:
+        conn.close()
+
+CAMPAIGN_COLUMNS = '''
+    id, subject, status, total, sent, failed, last_subscriber_id,
+    send_seconds, created_at, started_at, finished_at
+'''
+
+def _campaign_dict(row) -> dict:
+    total, sent, failed, send_seconds = row[3], row[4], row[5], row[7] or 0
+    processed = sent + failed
+    return {
+        "id": row[0],
+        "subject": row[1],
+        "status": row[2],
+        "total": total,
+        "sent": sent,
+        "failed": failed,
+        "pending": total - processed,
+        "progress": round(processed * 100 / total, 1) if total else 100.0,
+        "messages_per_second": round(processed / send_seconds, 2) if send_seconds else 0.0,
+        "last_subscriber_id": row[6],
+        "created_at": row[8],
+        "started_at": row[9],
+        "finished_at": row[10],
+    }
+
+def get_campaign(campaign_id: int):
+    """Progreso de una campaña, o None si no existe"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {CAMPAIGN_COLUMNS} FROM newsletter_campaigns WHERE id = ?", (campaign_id,))
+        row = cursor.fetchone()
+        return _campaign_dict(row) if row else None
+    finally:
+        conn.close()
+
+def get_deliveries(campaign_id: int, status: str = None, limit: int = 100) -> list:
+    """Estado por destinatario de una campaña (opcionalmente filtrado por estado)"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        if status:
+            cursor.execute('''
+                SELECT subscriber_id, email, status, error, attempted_at
+                FROM newsletter_deliveries
+                WHERE campaign_id = ? AND status = ?
+                ORDER BY subscriber_id
+                LIMIT ?
+            ''', (campaign_id, status, limit))
+        else:
+            cursor.execute('''
+                SELECT subscriber_id, email, status, error, attempted_at
+                FROM newsletter_deliveries
+                WHERE campaign_id = ?
+                ORDER BY subscriber_id
+                LIMIT ?
+            ''', (campaign_id, limit))
+        return [
+            {
+                "subscriber_id": row[0],
+                "email": row[1],
+                "status": row[2],
+                "error": row[3],
+                "attempted_at": row[4]
+            } for row in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+def list_campaigns(limit: int = 20) -> list:
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {CAMPAIGN_COLUMNS} FROM newsletter_campaigns ORDER BY id DESC LIMIT ?", (limit,))
+        return [_campaign_dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+class CampaignRunner(threading.Thread):
+    """Hilo que procesa campañas en cola y reanuda las que quedaron a medias"""
+
+    def __init__(self):
+        super().__init__(name="newsletter-campaigns", daemon=True)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self.smtp_pool = mailer.SMTPSessionPool(rate_limiter=mailer.TokenBucket(RATE_PER_SECOND, RATE_BURST))
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        print("📰 Worker de campañas de newsletter iniciado")
+        while not self._stopping.is_set():
+            try:
+                campaign_id = self.claim_next()
+                if campaign_id is not None:
+                    self.run_campaign(campaign_id)
+                    continue
+            except Exception as e:
+                print(f"❌ Error en el worker de campañas: {e}")
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def claim_next(self):
+        """Tomar una campaña en cola o huérfana (seguro entre procesos)"""
+        stale_before = time.time() - HEARTBEAT_TIMEOUT
+        conn = db_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id FROM newsletter_campaigns
+                WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?)
+                ORDER BY id
+                LIMIT 1
+            ''', (stale_before,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute('''
+                UPDATE newsletter_campaigns
+                SET status = 'running', heartbeat_at = ?,
+                    started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                WHERE id = ? AND (status = 'queued' OR (status = 'running' AND heartbeat_at < ?))
+            ''', (time.time(), row[0], stale_before))
+            conn.commit()
+            return row[0] if cursor.rowcount == 1 else None
+        finally:
+            conn.close()
+
+    def fetch_chunk(self, campaign_id: int, after_id: int) -> list:
+        """
+        Siguiente bloque de destinatarios pendientes. Cada bloque es una
+        consulta corta por rango de clave primaria (campaign_id, subscriber_id):
+        no se materializa la lista completa ni se mantiene abierta una
+        transacción de lectura durante toda la campaña.
+        """
+        conn = db_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT d.subscriber_id, d.email, s.name
+                FROM newsletter_deliveries d
+                LEFT JOIN newsletter_subscribers s ON s.id = d.subscriber_id
+                WHERE d.campaign_id = ? AND d.subscriber_id > ? AND d.status = 'pending'
+                ORDER BY d.subscriber_id
+                LIMIT ?
+            ''', (campaign_id, after_id, CHUNK_SIZE))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def run_campaign(self, campaign_id: int):
+        conn = db_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT subject, content, last_subscriber_id FROM newsletter_campaigns WHERE id = ?",
+                           (campaign_id,))
+            subject, content, last_id = cursor.fetchone()
+        finally:
+            conn.close()
+
+        if last_id:
+            print(f"🔁 Reanudando campaña #{campaign_id} desde el suscriptor {last_id}")
+        interrupted = self.recover(campaign_id)
+        if interrupted:
+            print(f"⚠️ Campaña #{campaign_id}: {interrupted} envíos interrumpidos marcados como fallidos")
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_alive, args=(campaign_id, done),
+                                     name=f"newsletter-heartbeat-{campaign_id}", daemon=True)
+        heartbeat.start()
+        try:
+            self.send_chunks(campaign_id, subject, content, last_id)
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def send_chunks(self, campaign_id: int, subject: str, content: str, last_id: int):
+        while not self._stopping.is_set():
+            recipients = self.fetch_chunk(campaign_id, last_id or 0)
+            if not recipients:
+                self.finish(campaign_id)
+                return
+
+            # Dejar constancia antes de enviar: si el proceso cae a mitad del
+            # bloque, estos destinatarios no vuelven a quedar pendientes
+            self.mark_sending(campaign_id, [row[0] for row in recipients])
+            messages = [
+                (email, subject, personalize(content, name), subscriber_id)
+                for subscriber_id, email, name in recipients
+            ]
+            outcomes = []
+            result = self.smtp_pool.send_many(
+                messages,
+                on_result=lambda message, ok, error: outcomes.append(
+                    ("sent" if ok else "failed", str(error)[:500] if error else None, campaign_id, message[3])
+                )
+            )
+            last_id = recipients[-1][0]
+            self.checkpoint(campaign_id, result, outcomes, last_id)
+            print(f"📰 Campaña #{campaign_id}: +{result['sent']} enviados, +{result['failed']} fallidos "
+                  f"({result['per_second']} msg/s)")
+
+        # Parada ordenada: liberar la campaña para que se reanude al arrancar
+        self.release(campaign_id)
+
+    def keep_alive(self, campaign_id: int, done: threading.Event):
+        """Renovar heartbeat_at hasta que termine la campaña (hilo aparte del envío)"""
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.heartbeat(campaign_id)
+            except Exception as e:
+                print(f"⚠️ No se pudo renovar el latido de la campaña #{campaign_id}: {e}")
+
+    def heartbeat(self, campaign_id: int):
+        conn = db_pool.connect()
+        try:
+            conn.execute("UPDATE newsletter_campaigns SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                         (time.time(), campaign_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def mark_sending(self, campaign_id: int, subscriber_ids: list):
+        conn = db_pool.connect()
+        try:
+            conn.executemany('''
+                UPDATE newsletter_deliveries
+                SET status = 'sending', attempted_at = CURRENT_TIMESTAMP
+                WHERE campaign_id = ? AND subscriber_id = ? AND status = 'pending'
+            ''', [(campaign_id, subscriber_id) for subscriber_id in subscriber_ids])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def recover(self, campaign_id: int) -> int:
+        """
+        Al retomar una campaña, los destinatarios que quedaron en 'sending'
+        pudieron recibir el mensaje: se marcan como fallidos en lugar de
+        reenviarlos. Devuelve cuántos había.
+        """
+        conn = db_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE newsletter_deliveries
+                SET status = 'failed', error = 'Envío interrumpido; no se reintenta para no duplicarlo'
+                WHERE campaign_id = ? AND status = 'sending'
+            ''', (campaign_id,))
+            interrupted = cursor.rowcount
+            cursor.execute("UPDATE newsletter_campaigns SET failed = failed + ? WHERE id = ?",
+                           (interrupted, campaign_id))
+            conn.commit()
+            return interrupted
+        finally:
+            conn.close()
+
+    def release(self, campaign_id: int):
+        conn = db_pool.connect()
+        try:
+            conn.execute("UPDATE newsletter_campaigns SET heartbeat_at = 0 WHERE id = ? AND status = 'running'",
+                         (campaign_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def checkpoint(self, campaign_id: int, result: dict, outcomes: list, last_id: int):
+        """Guardar el estado de cada destinatario del bloque y los contadores en una transacción"""
+        conn = db_pool.connect()
+        try:
+            conn.executemany('''
+                UPDATE newsletter_deliveries
+                SET status = ?, error = ?, attempted_at = CURRENT_TIMESTAMP
+                WHERE campaign_id = ? AND subscriber_id = ? AND status = 'sending'
+            ''', outcomes)
+            conn.execute('''
+                UPDATE newsletter_campaigns
+                SET sent = sent + ?, failed = failed + ?, last_subscriber_id = ?,
+                    send_seconds = send_seconds + ?, heartbeat_at = ?
+                WHERE id = ?
+            ''', (result["sent"], result["failed"], last_id, result["elapsed"], time.time(), campaign_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def finish(self, campaign_id: int):
+        conn = db_pool.connect()
+        try:
+            conn.execute('''
+                UPDATE newsletter_campaigns
+                SET status = 'completed', finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (campaign_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"✅ Campaña #{campaign_id} completada")
+
+_runner = None
+
+def start_runner():
+    global _runner
+    if _runner is None or not _runner.is_alive():
+        _runner = CampaignRunner()
+        _runner.start()
+
+def stop_runner():
+    global _runner
+    if _runner is not None:
+        _runner.stop()
+        _runner = None
+
+def wake_runner():
+    if _runner is not None:
+        _runner.wake()
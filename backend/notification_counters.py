@@ -0,0 +1,100 @@
+"""
+Contadores de notificaciones no leídas por tipo
+
+La tabla notification_counters guarda cuántas notificaciones sin leer hay de
+cada tipo. Se actualiza con el cursor del llamador, en la misma transacción
+que crea, marca como leída o borra la notificación, así que consultar los
+no leídos es leer unas pocas filas en lugar de recorrer admin_notifications.
+Un hilo recalcula los contadores periódicamente por si alguna escritura los
+hubiera desajustado (por ejemplo, cambios hechos a mano en la base de datos).
+"""
+import os
+import threading
+
+import db_pool
+
+RECONCILE_INTERVAL = float(os.getenv("NOTIFICATION_RECONCILE_INTERVAL", "3600"))
+
+def adjust(cursor, type_: str, delta: int):
+    """Sumar delta a los no leídos de un tipo"""
+    cursor.execute('''
+        INSERT INTO notification_counters (type, unread) VALUES (?, MAX(?, 0))
+        ON CONFLICT(type) DO UPDATE SET unread = MAX(unread + ?, 0)
+    ''', (type_, delta, delta))
+
+def reset(cursor):
+    """Poner a cero todos los contadores (marcar todo como leído / borrar todo)"""
+    cursor.execute("UPDATE notification_counters SET unread = 0")
+
+def unread_counts(cursor) -> dict:
+    """No leídos por tipo, solo los tipos con alguna pendiente"""
+    cursor.execute("SELECT type, unread FROM notification_counters WHERE unread > 0")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+def reconcile() -> dict:
+    """
+    Recalcular los contadores desde admin_notifications en una transacción.
+    Devuelve los tipos corregidos como {tipo: (antes, después)}.
+    """
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        # BEGIN IMMEDIATE: nadie escribe notificaciones mientras se recalcula
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT type, unread FROM notification_counters")
+        before = dict(cursor.fetchall())
+        cursor.execute('''
+            SELECT type, COUNT(*) FROM admin_notifications
+            WHERE is_read = 0
+            GROUP BY type
+        ''')
+        after = dict(cursor.fetchall())
+
+        changes = {}
+        for type_ in set(before) | set(after):
+            old, new = before.get(type_, 0), after.get(type_, 0)
+            if old != new:
+                changes[type_] = (old, new)
+        cursor.executemany('''
+            INSERT INTO notification_counters (type, unread) VALUES (?, ?)
+            ON CONFLICT(type) DO UPDATE SET unread = excluded.unread
+        ''', [(type_, new) for type_, (old, new) in changes.items()])
+        conn.commit()
+        return changes
+    finally:
+        conn.close()
+
+class ReconcileJob(threading.Thread):
+    """Hilo que reconcilia los contadores al arrancar y cada RECONCILE_INTERVAL"""
+
+    def __init__(self):
+        super().__init__(name="notification-counters", daemon=True)
+        self._stopping = threading.Event()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                changes = reconcile()
+                if changes:
+                    print(f"🔧 Contadores de notificaciones corregidos: {changes}")
+            except Exception as e:
+                print(f"❌ Error reconciliando contadores de notificaciones: {e}")
+            self._stopping.wait(RECONCILE_INTERVAL)
+
+_job = None
+
+def start_reconcile_job():
+    global _job
+    if _job is None or not _job.is_alive():
+        _job = ReconcileJob()
+        _job.start()
+
+def stop_reconcile_job():
+    global _job
+    if _job is not None:
+        _job.stop()
+        _job = None
@@ -0,0 +1,158 @@
+"""
+Retención y archivo de notificaciones del admin
+
+Las notificaciones leídas se conservan NOTIFICATION_READ_TTL_DAYS días y
+las no leídas como máximo NOTIFICATION_UNREAD_CAP (se retiran las más
+antiguas). Antes de borrarlas se añaden a un archivo JSON Lines comprimido
+con gzip por mes (archives/notifications-AAAA-MM.jsonl.gz), de modo que el
+historial no se pierde pero admin_notifications se mantiene pequeña.
+"""
+import gzip
+import json
+import os
+import threading
+
+import db_pool
+import notification_counters
+
+READ_TTL_DAYS = int(os.getenv("NOTIFICATION_READ_TTL_DAYS", "30"))
+UNREAD_CAP = int(os.getenv("NOTIFICATION_UNREAD_CAP", "1000"))
+ARCHIVE_DIR = os.getenv("NOTIFICATION_ARCHIVE_DIR", "archives")
+RETENTION_INTERVAL = float(os.getenv("NOTIFICATION_RETENTION_INTERVAL", "3600"))
+BATCH_SIZE = 500
+
+COLUMNS = ("id", "type", "title", "message", "related_id", "is_read", "created_at")
+
+def archive_path(created_at: str) -> str:
+    """Archivo del mes de la notificación (created_at es 'AAAA-MM-DD HH:MM:SS')"""
+    month = (created_at or "0000-00")[:7]
+    return os.path.join(ARCHIVE_DIR, f"notifications-{month}.jsonl.gz")
+
+def archive_rows(rows: list):
+    """Añadir filas a los archivos comprimidos de su mes (un miembro gzip por lote)"""
+    by_file = {}
+    for row in rows:
+        by_file.setdefault(archive_path(row[6]), []).append(row)
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for path, file_rows in by_file.items():
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                for row in file_rows:
+                    record = dict(zip(COLUMNS, row))
+                    record["is_read"] = bool(record["is_read"])
+                    archive.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+def _purge_batch(select_sql: str, params: tuple) -> int:
+    """
+    Archivar y borrar un lote de notificaciones en una transacción. Con
+    BEGIN IMMEDIATE otro worker no puede archivar las mismas filas a la vez;
+    el archivo se escribe antes del commit, así que una caída entre ambos
+    pasos como mucho duplica filas en el archivo, nunca las pierde.
+    """
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(select_sql, params)
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+
+        archive_rows(rows)
+        cursor.executemany("DELETE FROM admin_notifications WHERE id = ?", [(row[0],) for row in rows])
+
+        unread_by_type = {}
+        for row in rows:
+            if not row[5]:
+                unread_by_type[row[1]] = unread_by_type.get(row[1], 0) + 1
+        for type_, count in unread_by_type.items():
+            notification_counters.adjust(cursor, type_, -count)
+
+        conn.commit()
+        return len(rows)
+    finally:
+        conn.close()
+
+def purge_expired_read() -> int:
+    """Archivar las notificaciones leídas más antiguas que el TTL"""
+    total = 0
+    while True:
+        purged = _purge_batch(f'''
+            SELECT {", ".join(COLUMNS)} FROM admin_notifications
+            WHERE is_read = 1 AND created_at < datetime('now', ?)
+            ORDER BY created_at
+            LIMIT ?
+        ''', (f"-{READ_TTL_DAYS} days", BATCH_SIZE))
+        total += purged
+        if purged < BATCH_SIZE:
+            return total
+
+def purge_unread_overflow() -> int:
+    """Archivar las no leídas más antiguas que superen UNREAD_CAP"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        unread = sum(notification_counters.unread_counts(cursor).values())
+    finally:
+        conn.close()
+
+    total = 0
+    excess = unread - UNREAD_CAP
+    while excess > 0:
+        purged = _purge_batch(f'''
+            SELECT {", ".join(COLUMNS)} FROM admin_notifications
+            WHERE is_read = 0
+            ORDER BY created_at
+            LIMIT ?
+        ''', (min(excess, BATCH_SIZE),))
+        if not purged:
+            break
+        total += purged
+        excess -= purged
+    return total
+
+def run_retention() -> dict:
+    result = {
+        "read_archived": purge_expired_read(),
+        "unread_archived": purge_unread_overflow(),
+    }
+    if result["read_archived"] or result["unread_archived"]:
+        print(f"🗄️ Notificaciones archivadas: {result}")
+    return result
+
+class RetentionJob(threading.Thread):
+    """Hilo que aplica la retención al arrancar y cada RETENTION_INTERVAL"""
+
+    def __init__(self):
+        super().__init__(name="notification-retention", daemon=True)
+        self._stopping = threading.Event()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                run_retention()
+            except Exception as e:
+                print(f"❌ Error en la retención de notificaciones: {e}")
+            self._stopping.wait(RETENTION_INTERVAL)
+
+_job = None
+
+def start_retention_job():
+    global _job
+    if _job is None or not _job.is_alive():
+        _job = RetentionJob()
+        _job.start()
+
+def stop_retention_job():
+    global _job
+    if _job is not None:
+        _job.stop()
+        _job = None
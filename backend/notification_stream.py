@@ -0,0 +1,218 @@
+"""
+Canal push (Server-Sent Events) de notificaciones del admin
+
+Un hilo por proceso detecta las notificaciones nuevas en admin_notifications
+(al instante si se crean en este proceso, y cada POLL_INTERVAL segundos si
+las crea otro worker) y las reparte a los clientes conectados. Cada cliente
+tiene un buffer acotado: si no consume a tiempo se vacía y recibe un evento
+"sync" para que recargue desde la API. El id de cada evento es el id de la
+notificación, de modo que el navegador reanuda con Last-Event-ID sin perder
+eventos.
+"""
+import asyncio
+import json
+import os
+import threading
+
+from starlette.concurrency import run_in_threadpool
+
+import db_pool
+
+HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATIONS_HEARTBEAT", "15"))
+CLIENT_BUFFER = int(os.getenv("NOTIFICATIONS_CLIENT_BUFFER", "100"))
+POLL_INTERVAL = float(os.getenv("NOTIFICATIONS_POLL_INTERVAL", "5"))
+# Máximo de notificaciones reenviadas al reanudar con Last-Event-ID
+REPLAY_LIMIT = 200
+
+NOTIFICATION_COLUMNS = "id, type, title, message, related_id, is_read, created_at"
+
+def _notification_dict(row) -> dict:
+    return {
+        "id": row[0],
+        "type": row[1],
+        "title": row[2],
+        "message": row[3],
+        "related_id": row[4],
+        "is_read": bool(row[5]),
+        "created_at": row[6],
+    }
+
+def fetch_since(last_id: int, limit: int = REPLAY_LIMIT) -> list:
+    """Notificaciones con id mayor que last_id, en orden de creación"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {NOTIFICATION_COLUMNS}
+            FROM admin_notifications
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, limit))
+        return [_notification_dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def latest_id() -> int:
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM admin_notifications")
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+def format_event(event: str, data: dict, event_id: int = None) -> str:
+    """Serializar un evento en formato text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+class Subscriber:
+    """Cliente SSE conectado, con su propio buffer acotado en su event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=CLIENT_BUFFER)
+        self.overflows = 0
+
+    def offer(self, notification: dict):
+        """Encolar una notificación (se ejecuta en el event loop del cliente)"""
+        if self.queue.full():
+            # Cliente lento: descartar lo pendiente y pedirle que recargue
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflows += 1
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(notification)
+
+class NotificationBroker(threading.Thread):
+    """Hilo que detecta notificaciones nuevas y las publica a los suscriptores"""
+
+    def __init__(self):
+        super().__init__(name="notification-stream", daemon=True)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self.last_id = None
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> Subscriber:
+        subscriber = Subscriber(loop)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def notify(self):
+        """Avisar de que se ha creado una notificación en este proceso"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        print("🔔 Canal de notificaciones en tiempo real iniciado")
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Error en el canal de notificaciones: {e}")
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def poll(self):
+        # Sin clientes conectados solo se avanza la marca, sin leer filas
+        if self.last_id is None or not self.subscriber_count():
+            self.last_id = latest_id()
+            return
+        while True:
+            notifications = fetch_since(self.last_id)
+            for notification in notifications:
+                self.publish(notification)
+                self.last_id = notification["id"]
+            if len(notifications) < REPLAY_LIMIT:
+                return
+
+    def publish(self, notification: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, notification)
+            except RuntimeError:
+                # El event loop del cliente ya se cerró
+                self.unsubscribe(subscriber)
+
+_broker = None
+
+def start_broker():
+    global _broker
+    if _broker is None or not _broker.is_alive():
+        _broker = NotificationBroker()
+        _broker.start()
+
+def stop_broker():
+    global _broker
+    if _broker is not None:
+        _broker.stop()
+        _broker = None
+
+def notify():
+    if _broker is not None:
+        _broker.notify()
+
+async def event_stream(request, last_event_id: int = None):
+    """
+    Generador de eventos SSE para un cliente: reenvía lo perdido desde
+    last_event_id, después las notificaciones nuevas y un comentario de
+    latido cada HEARTBEAT_SECONDS para mantener viva la conexión.
+    """
+    if _broker is None:
+        start_broker()
+    broker = _broker
+    subscriber = broker.subscribe(asyncio.get_running_loop())
+    try:
+        # Tiempo de reconexión del navegador si se corta la conexión
+        yield "retry: 3000\n\n"
+
+        sent_id = last_event_id or 0
+        if last_event_id is not None:
+            missed = await run_in_threadpool(fetch_since, last_event_id, REPLAY_LIMIT + 1)
+            if len(missed) > REPLAY_LIMIT:
+                # Demasiado tiempo desconectado: mejor recargar desde la API
+                yield format_event("sync", {"reason": "too_many_missed"})
+                missed = []
+            for notification in missed:
+                yield format_event("notification", notification, notification["id"])
+                sent_id = notification["id"]
+
+        while True:
+            if await request.is_disconnected():
+                return
+            try:
+                notification = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if notification is None:
+                yield format_event("sync", {"reason": "buffer_overflow"})
+            elif notification["id"] > sent_id:
+                # Las ya enviadas en la reanudación no se repiten
+                yield format_event("notification", notification, notification["id"])
+                sent_id = notification["id"]
+    finally:
+        broker.unsubscribe(subscriber)
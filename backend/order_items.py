@@ -0,0 +1,100 @@
+"""
+Líneas de pedido normalizadas
+
+Cada producto de un pedido es una fila de order_items (order_id, product_id,
+quantity, unit_price), indexada por pedido y por producto. Los listados del
+admin leen las líneas con una sola consulta y las estadísticas por producto
+(daily_rollups) se calculan desde aquí sin parsear orders.items, que se
+sigue escribiendo como copia JSON para no romper versiones anteriores.
+Los pedidos anteriores a la tabla se copian una sola vez, en la migración 4
+(migrations.py).
+"""
+import json
+
+import daily_rollups
+
+ITEM_COLUMNS = "order_id, product_id, product_name, quantity, unit_price, notes"
+
+def create_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            notes TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items (product_id)")
+
+def insert_items(cursor, order_id: int, items: list):
+    """Guardar las líneas de un pedido en la transacción del llamador"""
+    cursor.executemany(f'''
+        INSERT INTO order_items ({ITEM_COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (order_id, item["product_id"], item["product_name"], item["quantity"],
+         item["price"], item.get("notes"))
+        for item in items
+    ])
+
+def load_items(cursor, order_ids: list) -> dict:
+    """Líneas de varios pedidos en una consulta, como {order_id: [item, ...]}"""
+    items = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items
+    placeholders = ", ".join("?" for _ in order_ids)
+    cursor.execute(f'''
+        SELECT {ITEM_COLUMNS}
+        FROM order_items
+        WHERE order_id IN ({placeholders})
+        ORDER BY order_id, id
+    ''', list(order_ids))
+    for row in cursor.fetchall():
+        items[row[0]].append({
+            "product_id": row[1],
+            "product_name": row[2],
+            "quantity": row[3],
+            "price": row[4],
+            "notes": row[5],
+        })
+    return items
+
+def delete_items(cursor, order_id: int):
+    cursor.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,))
+
+def backfill(cursor) -> int:
+    """
+    Migrar a order_items los pedidos que solo tienen el JSON de orders.items.
+    Es idempotente: los pedidos que ya tienen líneas no se tocan. Devuelve el
+    número de pedidos migrados.
+    """
+    cursor.execute('''
+        SELECT o.id, o.items FROM orders o
+        WHERE NOT EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.id)
+    ''')
+    migrated = 0
+    for order_id, items_json in cursor.fetchall():
+        try:
+            items = json.loads(items_json or "[]")
+        except ValueError:
+            print(f"⚠️ Pedido #{order_id} con items no válidos, no se migra")
+            continue
+        if items:
+            insert_items(cursor, order_id, items)
+            migrated += 1
+    return migrated
+
+def migrate(cursor) -> int:
+    """
+    Migración de los pedidos antiguos: copiar sus líneas y recalcular los
+    resúmenes diarios, que al arrancar se generaron sin ellas.
+    """
+    migrated = backfill(cursor)
+    if migrated:
+        print(f"📦 {migrated} pedidos migrados a order_items")
+        daily_rollups.rebuild(cursor)
+    return migrated
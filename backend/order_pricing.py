@@ -0,0 +1,78 @@
+"""
+Precios de los pedidos resueltos en el servidor
+
+El índice de precios ({product_id: (nombre, precio de lista, precio de hoy)})
+se carga con una consulta y se guarda en la caché de consultas bajo el
+espacio de nombres "prices", que se invalida al editar productos u ofertas.
+Así un pedido de muchas líneas se valora sin ir a la base de datos por
+cada producto y sin fiarse del precio ni del nombre que envía el cliente.
+"""
+from datetime import datetime
+
+import db_pool
+import hot_queries
+import query_cache
+
+# Diferencia máxima aceptada entre el precio del cliente y el del servidor
+PRICE_TOLERANCE = 0.01
+MAX_QUANTITY = 100
+
+class PricingError(ValueError):
+    """Línea de pedido con un producto, cantidad o precio no válidos"""
+
+def load_price_index(today: str) -> dict:
+    """Productos disponibles con el mayor descuento del día aplicado"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(hot_queries.PRICE_INDEX, (today,))
+        index = {}
+        for product_id, name, price, discount in cursor.fetchall():
+            unit_price = round(price * (1 - (discount or 0) / 100), 2)
+            index[product_id] = (name, price, unit_price)
+        return index
+    finally:
+        conn.close()
+
+def price_index() -> dict:
+    # Misma fecha que las ofertas del día (UTC, como date('now') en SQLite)
+    today = datetime.utcnow().date().isoformat()
+    return query_cache.cache.get_or_load("prices", (today,), lambda: load_price_index(today))
+
+def resolve_items(items: list) -> tuple:
+    """
+    Valorar las líneas de un pedido con los precios del servidor.
+
+    Cada línea es un dict con product_id, quantity, price y notes. El precio
+    del cliente solo se acepta si coincide con el de lista o con el de hoy
+    (la carta puede mostrar cualquiera de los dos); se cobra siempre el de
+    hoy. Devuelve (líneas resueltas, total).
+    """
+    index = price_index()
+    resolved = []
+    total = 0.0
+    for item in items:
+        product = index.get(item["product_id"])
+        if product is None:
+            raise PricingError(f"Producto {item['product_id']} no disponible")
+        name, list_price, unit_price = product
+
+        quantity = item["quantity"]
+        if quantity < 1 or quantity > MAX_QUANTITY:
+            raise PricingError(f"Cantidad no válida para {name}")
+
+        client_price = item.get("price")
+        if client_price is not None and min(
+            abs(client_price - list_price), abs(client_price - unit_price)
+        ) > PRICE_TOLERANCE:
+            raise PricingError(f"El precio de {name} ha cambiado, actualiza el carrito")
+
+        resolved.append({
+            "product_id": item["product_id"],
+            "product_name": name,
+            "quantity": quantity,
+            "price": unit_price,
+            "notes": item.get("notes"),
+        })
+        total += unit_price * quantity
+    return resolved, round(total, 2)
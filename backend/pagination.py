@@ -0,0 +1,108 @@
+"""
+Paginación por cursor (keyset) de los listados del admin
+
+En lugar de OFFSET, cada página continúa desde la última fila de la anterior:
+WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC. Con un
+índice que empiece por los filtros y siga con la columna de orden, cada
+página cuesta lo mismo sea la primera o la número mil. El cursor es opaco
+para el cliente (base64 de los valores de la última fila) y viaja en la
+cabecera X-Next-Cursor, de modo que el cuerpo sigue siendo la misma lista.
+"""
+import base64
+import json
+from datetime import date
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Columnas de fecha guardadas como días enteros desde 1970-01-01
+EPOCH_DAY_COLUMNS = ("reservation_day",)
+EPOCH = date(1970, 1, 1)
+
+class InvalidCursor(ValueError):
+    """Cursor o filtro de paginación no válido"""
+
+def encode_cursor(values: tuple) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    """Valores de la última fila vista; size es el número de columnas de orden + id"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor("Cursor no válido")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Cursor no válido")
+    # Solo valores que SQLite pueda comparar (nada de listas u objetos anidados)
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise InvalidCursor("Cursor no válido")
+    return tuple(values)
+
+def parse_date(value: str, name: str) -> str:
+    """Fecha AAAA-MM-DD de un filtro from/to"""
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise InvalidCursor(f"{name} debe tener formato AAAA-MM-DD")
+
+def epoch_day(value: str) -> int:
+    """Días desde 1970-01-01 de una fecha AAAA-MM-DD"""
+    return (date.fromisoformat(value) - EPOCH).days
+
+def date_filters(column: str, date_from: str = None, date_to: str = None) -> list:
+    """Filtros de rango de fechas (ambos inclusive) sobre una columna de fecha u hora"""
+    filters = []
+    if column in EPOCH_DAY_COLUMNS:
+        if date_from:
+            filters.append((f"{column} >= ?", (epoch_day(parse_date(date_from, "from")),)))
+        if date_to:
+            filters.append((f"{column} <= ?", (epoch_day(parse_date(date_to, "to")),)))
+        return filters
+    if date_from:
+        filters.append((f"{column} >= ?", (parse_date(date_from, "from"),)))
+    if date_to:
+        # Incluye todo el día final también en columnas con hora
+        filters.append((f"{column} < date(?, '+1 day')", (parse_date(date_to, "to"),)))
+    return filters
+
+def keyset_query(table: str, columns: str, sort_columns: tuple, filters: list = (),
+                 after: str = None, limit: int = 50, descending: bool = True) -> tuple:
+    """
+    (SQL, parámetros) de una página de `table` ordenada por sort_columns + id.
+    Pide limit + 1 filas para saber si hay página siguiente.
+    """
+    key = tuple(sort_columns) + ("id",)
+    conditions = [condition for condition, _ in filters]
+    params = [param for _, values in filters for param in values]
+
+    if after:
+        comparison = "<" if descending else ">"
+        conditions.append(f"({', '.join(key)}) {comparison} ({', '.join('?' for _ in key)})")
+        params.extend(decode_cursor(after, len(key)))
+
+    direction = "DESC" if descending else "ASC"
+    sql = f"SELECT {columns}, {', '.join(key)} FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {', '.join(f'{column} {direction}' for column in key)} LIMIT ?"
+    params.append(limit + 1)
+    return sql, tuple(params)
+
+def keyset_page(cursor, table: str, columns: str, sort_columns: tuple, filters: list = (),
+                after: str = None, limit: int = 50, descending: bool = True) -> tuple:
+    """
+    Leer una página de `table` ordenada por sort_columns + id.
+
+    filters es una lista de (condición SQL, parámetros). Devuelve (filas,
+    cursor de la página siguiente o None). Las filas solo contienen
+    `columns`; los valores de orden se leen aparte para construir el cursor.
+    """
+    key = tuple(sort_columns) + ("id",)
+    cursor.execute(*keyset_query(table, columns, sort_columns, filters, after, limit, descending))
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-len(key):])
+    return [row[:-len(key)] for row in rows], next_cursor
@@ -0,0 +1,218 @@
+"""
+Caché en memoria para las consultas públicas del menú
+
+Las respuestas de /products, /specials, /categories, /carousel, /content y /news
+se guardan por espacio de nombres y parámetros de consulta, con TTL y
+expulsión LRU. Cada espacio de nombres tiene un número de versión que los
+endpoints de administración incrementan al invalidar; una carga que empezó
+antes de una invalidación no llega a guardarse.
+
+Con varios workers de uvicorn cada proceso tiene su propia caché. Los
+endpoints de escritura incrementan la fila del espacio de nombres en la tabla
+cache_versions dentro de su transacción; cada proceso consulta como mucho
+una vez cada CACHE_SYNC_INTERVAL segundos PRAGMA data_version (que solo cambia
+si otra conexión ha hecho commit) y, si cambió, lee cache_versions y descarta
+los espacios de nombres cuya versión ha subido.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import db_pool
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+# Retraso máximo con el que un worker ve los cambios hechos en otro
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "1"))
+
+def bump_versions(cursor, *namespaces: str):
+    """
+    Marcar espacios de nombres como modificados usando el cursor del
+    llamador, para que el cambio sea visible a otros procesos justo con el
+    commit de los datos.
+    """
+    cursor.executemany('''
+        INSERT INTO cache_versions (namespace, version, updated_at)
+        VALUES (?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(namespace) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    ''', [(namespace,) for namespace in namespaces])
+
+class VersionWatcher:
+    """Detectar en cache_versions los cambios hechos por otros procesos"""
+
+    def __init__(self, path: str = db_pool.SQLITE_PATH, interval: float = CACHE_SYNC_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._conn = None
+        self._data_version = None
+        self._known = {}
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Conexión propia en autocommit: data_version solo cambia por commits
+        # de otras conexiones y no debe quedar una transacción abierta
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute(f"PRAGMA busy_timeout = {db_pool.BUSY_TIMEOUT_MS}")
+        return self._conn
+
+    def changed_namespaces(self) -> list:
+        """Espacios de nombres cuya versión ha cambiado desde la última comprobación"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return []
+        # Si otro hilo ya está comprobando no hace falta esperarle
+        if not self._lock.acquire(blocking=False):
+            return []
+        try:
+            self._next_check = now + self.interval
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return []
+            rows = dict(conn.execute("SELECT namespace, version FROM cache_versions").fetchall())
+            self._data_version = data_version
+            changed = [namespace for namespace, version in rows.items() if self._known.get(namespace) != version]
+            self._known = rows
+            return changed
+        except sqlite3.Error as e:
+            # Tabla aún no creada o base de datos ocupada: reintentar en el siguiente intervalo
+            print(f"⚠️ No se pudo comprobar cache_versions: {e}")
+            self.close()
+            return []
+        finally:
+            self._lock.release()
+
+    def version(self, namespace: str) -> int:
+        """Última versión conocida de un espacio de nombres en cache_versions"""
+        return self._known.get(namespace, 0)
+
+    def expire(self):
+        """Forzar la comprobación en la siguiente consulta (tras una escritura local)"""
+        self._next_check = 0.0
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+            self._data_version = None
+
+class QueryCache:
+    """Caché LRU con TTL y versión por espacio de nombres"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL, watcher: VersionWatcher = None,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.watcher = watcher
+        # Reloj de los TTL (inyectable en los tests)
+        self._clock = clock
+        self._entries = OrderedDict()   # (namespace, params) -> (expires_at, value)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+                       "remote_invalidations": 0}
+
+    def version(self, namespace: str) -> int:
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def get_or_load(self, namespace: str, params: tuple, loader):
+        """Devolver el valor cacheado o cargarlo con loader() y guardarlo"""
+        if self.watcher is not None:
+            self.sync()
+        key = (namespace, params)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            version = self._versions.get(namespace, 0)
+
+        value = loader()
+
+        with self._lock:
+            # Si hubo una invalidación durante la carga el valor ya está obsoleto
+            if self._versions.get(namespace, 0) == version:
+                self._entries[key] = (self._clock() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, namespace: str, *keys: tuple):
+        """
+        Invalidar claves concretas de un espacio de nombres o, si no se
+        indican claves, todas las del espacio de nombres.
+        """
+        self._drop(namespace, keys)
+        if self.watcher is not None:
+            # La escritura ya subió cache_versions: actualizar las versiones
+            # conocidas (y los ETag) en la siguiente petición
+            self.watcher.expire()
+
+    def _drop(self, namespace: str, keys: tuple = ()):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            if keys:
+                targets = [(namespace, params) for params in keys]
+            else:
+                targets = [key for key in self._entries if key[0] == namespace]
+            for key in targets:
+                if self._entries.pop(key, None) is not None:
+                    self._stats["invalidations"] += 1
+
+    def sync(self):
+        """Descartar los espacios de nombres modificados por otros procesos"""
+        for namespace in self.watcher.changed_namespaces():
+            self._drop(namespace)
+            with self._lock:
+                self._stats["remote_invalidations"] += 1
+
+    def etag(self, namespace: str, params: tuple = ()) -> str:
+        """
+        ETag fuerte de una respuesta, derivado de la versión del espacio de
+        nombres (compartida entre workers vía cache_versions) y de los
+        parámetros; no requiere cargar los datos.
+        """
+        if self.watcher is not None:
+            self.sync()
+            version = self.watcher.version(namespace)
+        else:
+            version = self.version(namespace)
+        digest = hashlib.sha1(f"{namespace}:{version}:{params!r}".encode()).hexdigest()[:20]
+        return f'"{digest}"'
+
+    def clear(self):
+        with self._lock:
+            for namespace in {key[0] for key in self._entries}:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["versions"] = dict(self._versions)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl"] = self.ttl
+        return stats
+
+# Caché global de la aplicación
+cache = QueryCache(watcher=VersionWatcher())
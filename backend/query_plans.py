@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Planes de consulta (EXPLAIN QUERY PLAN) de las consultas más frecuentes
+
+Dos comprobaciones, cada una termina con código 1 si alguna consulta
+recorre una tabla entera (SCAN sin índice) u ordena con un B-tree temporal.
+
+Reservas antes y después de reservation_day/minute: crea dos bases de
+datos con las mismas reservas al azar, una con el esquema anterior (fecha y
+hora solo como texto, sin índices) y otra migrada, e imprime el plan y el
+tiempo de cada consulta en su forma antigua y en la nueva:
+
+    python query_plans.py reservations --rows 200000
+
+Endpoints calientes con el esquema real: importa main con SQLITE_PATH en
+un directorio temporal (crea las tablas y aplica migrations.py), llena cada
+tabla consultada hasta --rows filas y comprueba el plan de las consultas de
+hot_queries.py (las mismas constantes que ejecuta main.py):
+
+    python query_plans.py hot --rows 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import hot_queries
+import pagination
+import reservation_dates
+
+RESERVATIONS_TABLE = '''
+    CREATE TABLE reservations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_name TEXT NOT NULL,
+        customer_email TEXT NOT NULL,
+        customer_phone TEXT NOT NULL,
+        party_size INTEGER NOT NULL,
+        reservation_date TEXT NOT NULL,
+        reservation_time TEXT NOT NULL,
+        notes TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+STATUSES = ("pending", "confirmed", "cancelled", "completed", "no_show")
+COLUMNS = ("id, customer_name, customer_email, customer_phone, party_size, "
+           "reservation_date, reservation_time, notes, status, created_at")
+
+def fill(cursor, rows: int, first_day: date, days: int):
+    random.seed(42)
+    times = [f"{hour:02d}:{minute:02d}" for hour in range(9, 22) for minute in (0, 30)]
+    cursor.executemany(
+        "INSERT INTO reservations (customer_name, customer_email, customer_phone, party_size, "
+        "reservation_date, reservation_time, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"Cliente {i}", f"c{i}@example.com", "600000000", random.randint(1, 8),
+          (first_day + timedelta(days=random.randrange(days))).isoformat(),
+          random.choice(times), random.choice(STATUSES)) for i in range(rows))
+    )
+
+def queries(day: str, date_from: str, date_to: str) -> list:
+    """(nombre, SQL antigua, parámetros, SQL nueva, parámetros, paso esperado en el plan nuevo)"""
+    epoch_day = pagination.epoch_day(day)
+    epoch_from, epoch_to = pagination.epoch_day(date_from), pagination.epoch_day(date_to)
+    return [
+        (
+            "Reservas activas de un día",
+            "SELECT reservation_time, party_size FROM reservations "
+            "WHERE reservation_date = ? AND status IN ('pending', 'confirmed')",
+            (day,),
+            "SELECT reservation_time, party_size FROM reservations "
+            "WHERE reservation_day = ? AND status IN ('pending', 'confirmed')",
+            (epoch_day,),
+            "SEARCH reservations USING INDEX idx_reservations_status_day_minute",
+        ),
+        (
+            "Conflictos en 2 horas (comprobación de aforo anterior)",
+            "SELECT COUNT(*) FROM reservations WHERE reservation_date = ? "
+            "AND ABS(CAST(strftime('%s', reservation_time || ':00') AS INTEGER) - "
+            "CAST(strftime('%s', ? || ':00') AS INTEGER)) < 7200 "
+            "AND status IN ('pending', 'confirmed')",
+            (day, "13:00"),
+            "SELECT COUNT(*) FROM reservations WHERE reservation_day = ? "
+            "AND status IN ('pending', 'confirmed') "
+            "AND reservation_minute > ? AND reservation_minute < ?",
+            (epoch_day, 13 * 60 - 120, 13 * 60 + 120),
+            "SEARCH reservations USING COVERING INDEX idx_reservations_status_day_minute",
+        ),
+        (
+            "Listado del admin por fecha y hora",
+            f"SELECT {COLUMNS} FROM reservations "
+            "ORDER BY reservation_date DESC, reservation_time DESC, id DESC LIMIT 200",
+            (),
+            f"SELECT {COLUMNS} FROM reservations "
+            "ORDER BY reservation_day DESC, reservation_minute DESC, id DESC LIMIT 200",
+            (),
+            "SCAN reservations USING INDEX idx_reservations_day_minute",
+        ),
+        (
+            "Listado del admin por estado y rango de fechas",
+            f"SELECT {COLUMNS} FROM reservations WHERE status = ? "
+            "AND reservation_date >= ? AND reservation_date < date(?, '+1 day') "
+            "ORDER BY reservation_date DESC, reservation_time DESC, id DESC LIMIT 200",
+            ("confirmed", date_from, date_to),
+            f"SELECT {COLUMNS} FROM reservations WHERE status = ? "
+            "AND reservation_day >= ? AND reservation_day <= ? "
+            "ORDER BY reservation_day DESC, reservation_minute DESC, id DESC LIMIT 200",
+            ("confirmed", epoch_from, epoch_to),
+            "SEARCH reservations USING INDEX idx_reservations_status_day_minute",
+        ),
+        (
+            "Exportación de un rango de fechas",
+            f"SELECT {COLUMNS} FROM reservations "
+            "WHERE reservation_date >= ? AND reservation_date < date(?, '+1 day') "
+            "ORDER BY reservation_date, id",
+            (date_from, date_to),
+            f"SELECT {COLUMNS} FROM reservations "
+            "WHERE reservation_day >= ? AND reservation_day <= ? "
+            "ORDER BY reservation_day, reservation_minute, id",
+            (epoch_from, epoch_to),
+            "SEARCH reservations USING INDEX idx_reservations_day_minute",
+        ),
+    ]
+
+def plan(conn, sql: str, params: tuple) -> list:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def timed(conn, sql: str, params: tuple, repeat: int = 5) -> float:
+    """Mejor tiempo de `repeat` ejecuciones, en milisegundos"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+def uses_index(steps: list, expected: str = None) -> bool:
+    """
+    Ningún paso recorre la tabla entera ni ordena con un B-tree temporal y,
+    si se indica, algún paso empieza por `expected` (por ejemplo "SEARCH
+    orders USING INDEX idx_orders_status_created"). Sin él, un SCAN ...
+    USING INDEX que recorre todo el índice también pasaría.
+    """
+    for step in steps:
+        if step.startswith("SCAN") and "USING" not in step:
+            return False
+        if "TEMP B-TREE" in step:
+            return False
+    return expected is None or any(step.startswith(expected) for step in steps)
+
+def compare_reservations(args):
+    first_day = date(2025, 1, 1)
+    workdir = tempfile.mkdtemp(prefix="query_plans_")
+    before = sqlite3.connect(os.path.join(workdir, "before.db"))
+    after = sqlite3.connect(os.path.join(workdir, "after.db"))
+
+    print(f"🧪 {args.rows} reservas en {args.days} días ({workdir})")
+    for conn in (before, after):
+        conn.execute(RESERVATIONS_TABLE)
+        fill(conn.cursor(), args.rows, first_day, args.days)
+    reservation_dates.migrate(after.cursor())
+    for conn in (before, after):
+        conn.commit()
+        conn.execute("ANALYZE")
+
+    day = (first_day + timedelta(days=args.days // 2)).isoformat()
+    date_from = (first_day + timedelta(days=args.days // 2 - 15)).isoformat()
+    date_to = (first_day + timedelta(days=args.days // 2 + 15)).isoformat()
+
+    failures = 0
+    for name, old_sql, old_params, new_sql, new_params, expected in queries(day, date_from, date_to):
+        old_plan, new_plan = plan(before, old_sql, old_params), plan(after, new_sql, new_params)
+        ok = uses_index(new_plan, expected)
+        failures += not ok
+        print(f"\n{'✅' if ok else '❌'} {name}")
+        print(f"   antes   ({timed(before, old_sql, old_params):8.2f} ms): {' | '.join(old_plan)}")
+        print(f"   después ({timed(after, new_sql, new_params):8.2f} ms): {' | '.join(new_plan)}")
+
+    before.close()
+    after.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return failures
+
+# Filas de prueba de cada tabla caliente, generadas en SQLite (x = 1..rows)
+HOT_FILL = {
+    "products": '''
+        INSERT INTO products (name, description, price, category, image, available)
+        SELECT 'Producto ' || x, 'Descripción', 1 + x % 50, 'cat' || (x % 20), NULL, x % 10 != 0 FROM seq
+    ''',
+    "specials": '''
+        INSERT INTO specials (product_id, date, discount)
+        SELECT 1 + (x * 7919) % {rows}, date('2025-01-01', '+' || (x % 730) || ' days'), 5 + x % 40 FROM seq
+    ''',
+    "product_categories": '''
+        INSERT INTO product_categories (id, name, description)
+        SELECT 'cat' || x, 'Categoría ' || x, '' FROM seq
+    ''',
+    "news_articles": '''
+        INSERT INTO news_articles (title, excerpt, content, author, category, featured, tags, published,
+                                   created_at, updated_at)
+        SELECT 'Noticia ' || x, 'Resumen', 'Contenido', 'Autor', 'general', x % 50 = 0, '[]', x % 10 != 0,
+               datetime('2020-01-01', '+' || x || ' minutes'), datetime('2020-01-01', '+' || x || ' minutes')
+        FROM seq
+    ''',
+    "carousel_images": '''
+        INSERT INTO carousel_images (title, image, active, order_position, created_at)
+        SELECT 'Imagen ' || x, 'imagen.jpg', x % 2, x % 100, datetime('2020-01-01', '+' || x || ' minutes') FROM seq
+    ''',
+    "page_content": '''
+        INSERT INTO page_content (id, title, content, section, page)
+        SELECT 'contenido' || x, 'Título', 'Texto', 'seccion' || x, 'page' || (x % 100) FROM seq
+    ''',
+    "orders": '''
+        INSERT INTO orders (customer_name, customer_email, items, total_amount, status, created_at)
+        SELECT 'Cliente', 'cliente@example.com', '[]', 10,
+               CASE x % 3 WHEN 0 THEN 'pending' WHEN 1 THEN 'completed' ELSE 'cancelled' END,
+               datetime('2020-01-01', '+' || x || ' minutes')
+        FROM seq
+    ''',
+    "reservations": '''
+        INSERT INTO reservations (customer_name, customer_email, customer_phone, party_size,
+                                  reservation_date, reservation_time, status, created_at,
+                                  reservation_day, reservation_minute)
+        SELECT 'Cliente', 'cliente@example.com', '600000000', 1 + x % 8,
+               date('2025-01-01', '+' || (x % 730) || ' days'), printf('%02d:%02d', 9 + x % 13, (x % 2) * 30),
+               CASE x % 4 WHEN 0 THEN 'pending' WHEN 1 THEN 'confirmed' WHEN 2 THEN 'completed' ELSE 'cancelled' END,
+               datetime('2020-01-01', '+' || x || ' minutes'),
+               CAST(julianday('2025-01-01') - 2440587.5 AS INTEGER) + x % 730, (9 + x % 13) * 60 + (x % 2) * 30
+        FROM seq
+    ''',
+}
+
+def fill_hot(conn, rows: int, verbose: bool = False):
+    """Llenar cada tabla caliente hasta `rows` filas de prueba y actualizar las estadísticas"""
+    for table, sql in HOT_FILL.items():
+        started = time.perf_counter()
+        conn.execute(
+            "WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < ?) "
+            + sql.format(rows=rows),
+            (rows,)
+        )
+        conn.commit()
+        if verbose:
+            print(f"   {table}: {rows} filas en {time.perf_counter() - started:.1f}s")
+    conn.execute("ANALYZE")
+
+def check_hot(args):
+    workdir = tempfile.mkdtemp(prefix="query_plans_")
+    path = os.path.join(workdir, "hot.db")
+    print(f"🧪 Esquema real en {path}")
+    # main lee SQLITE_PATH al importar db_pool y crea uploads/ en el directorio actual
+    os.environ["SQLITE_PATH"] = path
+    os.chdir(workdir)
+    import main  # noqa: F401  (crea las tablas y aplica las migraciones)
+
+    conn = sqlite3.connect(path)
+    fill_hot(conn, args.rows, verbose=True)
+
+    failures = 0
+    for name, sql, params, expected in hot_queries.plans():
+        steps = plan(conn, sql, params)
+        ok = uses_index(steps, expected)
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}: {' | '.join(steps)}")
+        if not ok:
+            print(f"   esperado: {expected}")
+
+    conn.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN de las consultas más frecuentes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    reservations = commands.add_parser("reservations", help="Consultas de reservas antes y después de la migración")
+    reservations.add_argument("--rows", type=int, default=200000, help="Reservas de prueba")
+    reservations.add_argument("--days", type=int, default=730, help="Días entre los que se reparten")
+    hot = commands.add_parser("hot", help="Consultas de los endpoints calientes con el esquema real")
+    hot.add_argument("--rows", type=int, default=1000000, help="Filas de prueba por tabla")
+    args = parser.parse_args()
+
+    failures = compare_reservations(args) if args.command == "reservations" else check_hot(args)
+    if failures:
+        print(f"\n❌ {failures} consultas sin índice")
+        sys.exit(1)
+    print("\n✅ Todas las consultas usan un índice")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Capacidad de reservas por franjas de 30 minutos
+
+El día de reservas (RESERVATION_OPENING a RESERVATION_CLOSING) se divide en
+franjas de SLOT_MINUTES. Cada reserva activa ocupa party_size asientos en
+todas las franjas que dura (RESERVATION_DURATION_MINUTES) y una reserva nueva
+solo cabe si en ninguna de ellas se supera RESERVATION_SEAT_CAPACITY.
+
+La ocupación de cada día se guarda en slot_occupancy (una fila por día y
+franja) y se actualiza en la misma transacción que crea, edita o cancela la
+reserva, restando la aportación anterior y sumando la nueva; las ediciones
+vuelven a comprobar el aforo con fits_reservation() antes de sumarla. La
+fecha se normaliza con canonical_date() para que cada día tenga una sola
+clave. Las consultas de disponibilidad leen un array por día en memoria,
+invalidado a través de cache_versions cuando cualquier worker cambia la
+ocupación; la vista de varios días (availability_matrix) lee todo el rango
+en una sola consulta.
+"""
+import os
+import threading
+from datetime import date, timedelta
+
+import db_pool
+import hot_queries
+import query_cache
+
+SEAT_CAPACITY = int(os.getenv("RESERVATION_SEAT_CAPACITY", "40"))
+DURATION_MINUTES = int(os.getenv("RESERVATION_DURATION_MINUTES", "120"))
+OPENING = os.getenv("RESERVATION_OPENING", "09:00")
+CLOSING = os.getenv("RESERVATION_CLOSING", "22:00")
+SLOT_MINUTES = 30
+# Días máximos de una consulta de disponibilidad por rango
+MAX_RANGE_DAYS = 62
+
+# Estados que ocupan mesa
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+class CapacityError(ValueError):
+    """Hora de reserva fuera del horario o con formato no válido"""
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+OPENING_MINUTE = _minutes(OPENING)
+SLOT_COUNT = (_minutes(CLOSING) - OPENING_MINUTE) // SLOT_MINUTES
+DURATION_SLOTS = max(1, -(-DURATION_MINUTES // SLOT_MINUTES))
+
+def slot_times() -> list:
+    """Hora de inicio de cada franja ('09:00', '09:30', ...)"""
+    return [
+        f"{(OPENING_MINUTE + i * SLOT_MINUTES) // 60:02d}:{(OPENING_MINUTE + i * SLOT_MINUTES) % 60:02d}"
+        for i in range(SLOT_COUNT)
+    ]
+
+def canonical_date(reservation_date: str) -> str:
+    """
+    Fecha en formato AAAA-MM-DD. La ocupación se guarda por el texto del día,
+    así que '2027-1-5' y '2027-01-05' deben acabar siendo la misma clave.
+    """
+    try:
+        return date.fromisoformat(reservation_date).isoformat()
+    except (TypeError, ValueError):
+        raise CapacityError("Formato de fecha inválido. Use YYYY-MM-DD")
+
+def slot_range(reservation_time: str) -> range:
+    """Franjas que ocupa una reserva que empieza a reservation_time"""
+    try:
+        minute = _minutes(reservation_time)
+    except (AttributeError, ValueError):
+        raise CapacityError("Formato de hora inválido")
+    first = (minute - OPENING_MINUTE) // SLOT_MINUTES
+    if minute < OPENING_MINUTE or first >= SLOT_COUNT:
+        raise CapacityError(f"Solo se admiten reservas entre las {OPENING} y las {CLOSING}")
+    return range(first, min(first + DURATION_SLOTS, SLOT_COUNT))
+
+def fits(occupancy: list, slots: range, party_size: int) -> bool:
+    return all(occupancy[slot] + party_size <= SEAT_CAPACITY for slot in slots)
+
+def seats_free(occupancy: list, slots: range) -> int:
+    return SEAT_CAPACITY - max(occupancy[slot] for slot in slots)
+
+def create_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS slot_occupancy (
+            day TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            seats INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, slot)
+        ) WITHOUT ROWID
+    ''')
+
+def day_occupancy(cursor, day: str) -> list:
+    """Asientos ocupados por franja de un día, leídos con el cursor del llamador"""
+    occupancy = [0] * SLOT_COUNT
+    cursor.execute(hot_queries.DAY_OCCUPANCY, (day,))
+    for slot, seats in cursor.fetchall():
+        if 0 <= slot < SLOT_COUNT:
+            occupancy[slot] = seats
+    return occupancy
+
+def range_occupancy(cursor, date_from: str, date_to: str) -> dict:
+    """Ocupación de varios días en una consulta, como {día: [asientos por franja]}"""
+    result = {}
+    cursor.execute('''
+        SELECT day, slot, seats FROM slot_occupancy
+        WHERE day BETWEEN ? AND ? AND seats > 0
+    ''', (date_from, date_to))
+    for day, slot, seats in cursor.fetchall():
+        if 0 <= slot < SLOT_COUNT:
+            result.setdefault(day, [0] * SLOT_COUNT)[slot] = seats
+    return result
+
+def apply(cursor, day: str, reservation_time: str, party_size: int, sign: int):
+    """Sumar (sign=1) o restar (sign=-1) los asientos de una reserva en sus franjas"""
+    try:
+        slots = slot_range(reservation_time)
+    except CapacityError:
+        # Reservas antiguas fuera del horario actual no ocupan franjas
+        return
+    cursor.executemany('''
+        INSERT INTO slot_occupancy (day, slot, seats) VALUES (?, ?, MAX(?, 0))
+        ON CONFLICT(day, slot) DO UPDATE SET seats = MAX(seats + ?, 0)
+    ''', [(day, slot, sign * party_size, sign * party_size) for slot in slots])
+    query_cache.bump_versions(cursor, "occupancy")
+
+def apply_reservation(cursor, reservation_id: int, sign: int):
+    """Aportación de una reserva a la ocupación, solo si está activa"""
+    cursor.execute(
+        "SELECT reservation_date, reservation_time, party_size, COALESCE(status, 'pending') FROM reservations WHERE id = ?",
+        (reservation_id,)
+    )
+    reservation = cursor.fetchone()
+    if reservation is None or reservation[3] not in ACTIVE_STATUSES:
+        return
+    apply(cursor, reservation[0], reservation[1], reservation[2] or 0, sign)
+
+def fits_reservation(cursor, reservation_id: int) -> bool:
+    """
+    ¿Cabe una reserva ya guardada, sin su aportación en slot_occupancy? Para
+    ediciones: restar la aportación anterior, actualizar la fila, comprobar
+    con esto y, si cabe, sumar la nueva. Las reservas no activas o fuera del
+    horario no ocupan franjas y siempre caben.
+    """
+    cursor.execute(
+        "SELECT reservation_date, reservation_time, party_size, COALESCE(status, 'pending') FROM reservations WHERE id = ?",
+        (reservation_id,)
+    )
+    reservation = cursor.fetchone()
+    if reservation is None or reservation[3] not in ACTIVE_STATUSES:
+        return True
+    try:
+        slots = slot_range(reservation[1])
+    except CapacityError:
+        return True
+    return fits(day_occupancy(cursor, reservation[0]), slots, reservation[2] or 0)
+
+def rebuild(cursor) -> int:
+    """Recalcular slot_occupancy desde las reservas activas; devuelve las reservas contadas"""
+    cursor.execute("DELETE FROM slot_occupancy")
+    cursor.execute(f'''
+        SELECT reservation_date, reservation_time, party_size FROM reservations
+        WHERE status IN ({", ".join("?" for _ in ACTIVE_STATUSES)})
+    ''', ACTIVE_STATUSES)
+    seats = {}
+    rows = cursor.fetchall()
+    for day, reservation_time, party_size in rows:
+        try:
+            slots = slot_range(reservation_time)
+        except CapacityError:
+            continue
+        for slot in slots:
+            seats[(day, slot)] = seats.get((day, slot), 0) + (party_size or 0)
+    cursor.executemany(
+        "INSERT INTO slot_occupancy (day, slot, seats) VALUES (?, ?, ?)",
+        [(day, slot, count) for (day, slot), count in seats.items()]
+    )
+    query_cache.bump_versions(cursor, "occupancy")
+    return len(rows)
+
+def needs_backfill(cursor) -> bool:
+    cursor.execute(f'''
+        SELECT NOT EXISTS (SELECT 1 FROM slot_occupancy)
+           AND EXISTS (SELECT 1 FROM reservations WHERE status IN ({", ".join("?" for _ in ACTIVE_STATUSES)}))
+    ''', ACTIVE_STATUSES)
+    return bool(cursor.fetchone()[0])
+
+def availability_matrix(cursor, date_from: str, date_to: str) -> dict:
+    """
+    Asientos libres por día y hora de inicio entre date_from y date_to (ambos
+    inclusive), con una sola consulta. days[día][i] corresponde a times[i].
+    """
+    occupied = range_occupancy(cursor, date_from, date_to)
+    starts = [slot_range(time) for time in slot_times()]
+    empty = [0] * SLOT_COUNT
+    days = {}
+    day = date.fromisoformat(date_from)
+    last = date.fromisoformat(date_to)
+    while day <= last:
+        occupancy = occupied.get(day.isoformat(), empty)
+        days[day.isoformat()] = [max(seats_free(occupancy, slots), 0) for slots in starts]
+        day += timedelta(days=1)
+    return {
+        "from": date_from,
+        "to": date_to,
+        "seat_capacity": SEAT_CAPACITY,
+        "times": slot_times(),
+        "days": days,
+    }
+
+class OccupancyStore:
+    """Arrays de ocupación por día en memoria para las consultas de disponibilidad"""
+
+    def __init__(self, max_days: int = 400):
+        self._days = {}
+        self._lock = threading.Lock()
+        self._version = None
+        # Se incrementa al vaciar: una carga iniciada antes no se guarda
+        self._generation = 0
+        self.max_days = max_days
+
+    def _check_version(self):
+        cache = query_cache.cache
+        if cache.watcher is not None:
+            cache.sync()
+            version = cache.watcher.version("occupancy")
+        else:
+            version = cache.version("occupancy")
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._days.clear()
+                self._generation += 1
+
+    def invalidate(self):
+        """Descartar lo cargado (y las respuestas de disponibilidad cacheadas) tras una escritura en este proceso"""
+        with self._lock:
+            self._version = None
+            self._days.clear()
+            self._generation += 1
+        query_cache.cache.invalidate("occupancy")
+
+    def get(self, day: str) -> list:
+        self._check_version()
+        with self._lock:
+            occupancy = self._days.get(day)
+            generation = self._generation
+        if occupancy is not None:
+            return occupancy
+
+        conn = db_pool.connect()
+        try:
+            occupancy = day_occupancy(conn.cursor(), day)
+        finally:
+            conn.close()
+        with self._lock:
+            if generation == self._generation:
+                if len(self._days) >= self.max_days:
+                    self._days.clear()
+                self._days[day] = occupancy
+        return occupancy
+
+    def availability(self, day: str, party_size: int = 1) -> list:
+        """Disponibilidad de cada franja de inicio para un grupo de party_size personas"""
+        occupancy = self.get(day)
+        result = []
+        for time in slot_times():
+            slots = slot_range(time)
+            free = seats_free(occupancy, slots)
+            result.append({
+                "time": time,
+                "available": free >= party_size,
+                "seats_available": max(free, 0),
+            })
+        return result
+
+store = OccupancyStore()
@@ -0,0 +1,86 @@
+"""
+Fecha y hora de las reservas como columnas enteras ordenables
+
+reservation_date ('AAAA-MM-DD') y reservation_time ('HH:MM') siguen siendo
+lo que envía y recibe la API, pero como texto no ordenan bien ('9:00' va
+después de '13:00') y obligan a convertir con strftime en cada consulta.
+Cada reserva guarda además:
+
+    reservation_day     días desde 1970-01-01
+    reservation_minute  minuto del día (0-1439)
+
+Los listados, filtros por rango y búsquedas por día y estado usan estas
+columnas y sus índices. Se recalculan con set_keys() en la misma
+transacción que crea o edita la reserva (una fecha u hora no válida lanza
+ValueError, que la API devuelve como 422); migrate() añade las columnas a
+bases de datos existentes y rellena las filas antiguas.
+"""
+import pagination
+
+# Índices sobre las columnas enteras (el id va implícito como desempate)
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_reservations_day_status ON reservations (reservation_day, status)",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_day_minute ON reservations (reservation_day, reservation_minute)",
+    "CREATE INDEX IF NOT EXISTS idx_reservations_status_day_minute ON reservations (status, reservation_day, reservation_minute)",
+)
+# Índices sobre las columnas de texto a los que sustituyen
+OLD_INDEXES = ("idx_reservations_date_time", "idx_reservations_status_date_time")
+
+def keys(reservation_date: str, reservation_time: str) -> tuple:
+    """(reservation_day, reservation_minute); ValueError si la fecha o la hora no son válidas"""
+    try:
+        day = pagination.epoch_day(reservation_date)
+    except (TypeError, ValueError):
+        raise ValueError(f"Fecha de reserva no válida: {reservation_date!r}")
+    try:
+        hours, minutes = (int(part) for part in reservation_time.split(":")[:2])
+    except (AttributeError, ValueError):
+        raise ValueError(f"Hora de reserva no válida: {reservation_time!r}")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Hora de reserva no válida: {reservation_time!r}")
+    return day, hours * 60 + minutes
+
+def set_keys(cursor, reservation_id: int):
+    """Recalcular las columnas enteras de una reserva tras crearla o editarla"""
+    cursor.execute("SELECT reservation_date, reservation_time FROM reservations WHERE id = ?", (reservation_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        cursor.execute(
+            "UPDATE reservations SET reservation_day = ?, reservation_minute = ? WHERE id = ?",
+            (*keys(row[0], row[1]), reservation_id)
+        )
+
+def migrate(cursor) -> int:
+    """
+    Añadir las columnas y sus índices si faltan y rellenar las reservas sin
+    ellas; devuelve cuántas se rellenaron. Las filas antiguas con una fecha
+    u hora ilegible se quedan con NULL (y fuera de los listados por fecha).
+    """
+    cursor.execute("PRAGMA table_info(reservations)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column in ("reservation_day", "reservation_minute"):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE reservations ADD COLUMN {column} INTEGER")
+
+    cursor.execute('''
+        SELECT id, reservation_date, reservation_time FROM reservations
+        WHERE reservation_day IS NULL OR reservation_minute IS NULL
+    ''')
+    updates, invalid = [], []
+    for reservation_id, reservation_date, reservation_time in cursor.fetchall():
+        try:
+            updates.append((*keys(reservation_date, reservation_time), reservation_id))
+        except ValueError:
+            invalid.append(reservation_id)
+    cursor.executemany(
+        "UPDATE reservations SET reservation_day = ?, reservation_minute = ? WHERE id = ?",
+        updates
+    )
+    if invalid:
+        print(f"⚠️ {len(invalid)} reservas con fecha u hora no válidas se quedan sin reservation_day: {invalid[:20]}")
+
+    for index_sql in INDEXES:
+        cursor.execute(index_sql)
+    for name in OLD_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    return len(updates)
@@ -0,0 +1,136 @@
+"""
+Configuración común de los tests del backend
+
+main.py exige las credenciales del admin y abre la base de datos al
+importarse, así que el entorno se fija aquí antes de que ningún test lo
+importe: una base de datos SQLite temporal para toda la sesión, sin SMTP
+(los emails se simulan) y con el directorio de trabajo en una carpeta
+temporal para que uploads/ no se cree dentro del repositorio. El fixture
+smtp_server sustituye smtplib.SMTP por un servidor en memoria.
+"""
+import os
+import smtplib
+import sys
+import tempfile
+import threading
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="cafe-tests-")
+os.environ["SQLITE_PATH"] = os.path.join(TEST_DIR, "cafe.db")
+os.environ["SECRET_KEY"] = "test-secret-key-with-enough-bytes-for-hs256"
+os.environ["ADMIN_USERNAME"] = "admin"
+os.environ["ADMIN_PASSWORD"] = "admin123"
+os.environ.pop("SMTP_USER", None)
+os.environ.pop("SMTP_PASSWORD", None)
+os.chdir(TEST_DIR)
+
+import db_pool  # noqa: E402
+import email_outbox  # noqa: E402
+import mailer  # noqa: E402
+
+@pytest.fixture(scope="session")
+def app():
+    pytest.importorskip("fastapi")
+    import main
+    return main.app
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/admin/login", json={"username": "admin", "password": "admin123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def fresh_pool(tmp_path, monkeypatch):
+    """Pool sobre una base de datos vacía, solo para este test"""
+    pool = db_pool.SQLitePool(str(tmp_path / "fresh.db"))
+    monkeypatch.setattr(db_pool, "pool", pool)
+    return pool
+
+class FakeSMTPServer:
+    """
+    Servidor SMTP de mentira: registra sesiones, logins y mensajes. Con
+    drop_after=N cierra la conexión tras N mensajes en la misma sesión y
+    reject() hace que rechace a un destinatario.
+    """
+
+    def __init__(self, drop_after: int = None):
+        self.drop_after = drop_after
+        self.sessions = []
+        self.rejected = {}
+        self.attempts = []
+        self.lock = threading.Lock()
+
+    def reject(self, recipient: str, times: int = None):
+        """Rechazar los próximos `times` envíos a recipient (None: siempre)"""
+        self.rejected[recipient] = times
+
+    def check(self, recipient: str):
+        with self.lock:
+            self.attempts.append(recipient)
+            if recipient not in self.rejected or self.rejected[recipient] == 0:
+                return
+            if self.rejected[recipient] is not None:
+                self.rejected[recipient] -= 1
+        raise smtplib.SMTPDataError(451, b"Buzon temporalmente no disponible")
+
+    def __call__(self, host, port, timeout=None):
+        session = FakeSMTP(self)
+        with self.lock:
+            self.sessions.append(session)
+        return session
+
+    @property
+    def delivered(self) -> list:
+        return [recipient for session in self.sessions for recipient in session.recipients]
+
+class FakeSMTP:
+    def __init__(self, server: FakeSMTPServer):
+        self.server = server
+        self.recipients = []
+        self.logged_in = False
+        self.closed = False
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        self.logged_in = True
+
+    def sendmail(self, sender, recipient, message):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        assert self.logged_in
+        self.server.check(recipient)
+        self.recipients.append(recipient)
+        if self.server.drop_after and len(self.recipients) >= self.server.drop_after:
+            self.closed = True
+
+    def quit(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+        self.closed = True
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    # Que la bandeja de salida no envíe por el servidor falso durante el test
+    outbox_running = email_outbox._worker is not None
+    email_outbox.stop_worker()
+    monkeypatch.setenv("SMTP_USER", "cafe@example.com")
+    monkeypatch.setenv("SMTP_PASSWORD", "secret")
+    server = FakeSMTPServer()
+    monkeypatch.setattr(mailer.smtplib, "SMTP", server)
+    yield server
+    monkeypatch.undo()
+    if outbox_running:
+        email_outbox.start_worker()
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+import activity_log
+import db_pool
+import query_cache
+
+@pytest.fixture
+def slow_watcher(client, admin_headers, monkeypatch):
+    """cache_versions solo se revisaría dentro de una hora: el dashboard depende de invalidate()"""
+    watcher = query_cache.cache.watcher
+    monkeypatch.setattr(watcher, "interval", 3600)
+    dashboard(client, admin_headers)
+    watcher.expire()
+    dashboard(client, admin_headers)
+    return watcher
+
+def dashboard(client, admin_headers) -> list:
+    response = client.get("/admin/dashboard", headers=admin_headers)
+    assert response.status_code == 200
+    return [entry["action"] for entry in response.json()["recent_activity"]]
+
+def test_dashboard_shows_admin_changes_immediately(client, admin_headers, slow_watcher):
+    response = client.post("/admin/products", headers=admin_headers, json={
+        "name": "Café de actividad", "description": "Test", "price": 2.0, "category": "bebidas", "image": "x.jpg"
+    })
+    assert response.status_code == 200
+    assert dashboard(client, admin_headers)[0] == "Producto creado"
+
+    order = client.post("/orders", json={
+        "customer_name": "Actividad", "customer_email": "actividad@example.com",
+        "items": [{"product_id": response.json()["id"], "product_name": "Café de actividad", "quantity": 1, "price": 2.0}]
+    })
+    assert order.status_code == 200
+    response = client.put(f"/admin/orders/{order.json()['id']}/status", headers=admin_headers, json={"status": "completed"})
+    assert response.status_code == 200
+    assert dashboard(client, admin_headers)[0] == "Estado del pedido: completed"
+
+    reservation = client.post("/reservations", json={
+        "customer_name": "Actividad", "customer_email": "actividad@example.com", "customer_phone": "600000000",
+        "party_size": 2, "reservation_date": (date.today() + timedelta(days=300)).isoformat(),
+        "reservation_time": "13:00"
+    })
+    assert reservation.status_code == 200
+    response = client.put(f"/admin/reservations/{reservation.json()['id']}/status", headers=admin_headers,
+                          json={"status": "confirmed"})
+    assert response.status_code == 200
+    assert dashboard(client, admin_headers)[0] == "Estado de la reserva: confirmed"
+
+def test_feed_retries_after_a_failed_load(app, monkeypatch):
+    conn = db_pool.connect()
+    try:
+        activity_log.record(conn.cursor(), "Entrada de prueba", "product", 999_999, "admin")
+        conn.commit()
+    finally:
+        conn.close()
+
+    def unavailable():
+        raise RuntimeError("base de datos no disponible")
+
+    feed = activity_log.ActivityFeed()
+    monkeypatch.setattr(db_pool, "connect", unavailable)
+    with pytest.raises(RuntimeError):
+        feed.recent()
+
+    # Misma versión de "activity", pero la carga anterior no llegó a hacerse
+    monkeypatch.undo()
+    assert feed.recent(1)[0]["action"] == "Entrada de prueba"
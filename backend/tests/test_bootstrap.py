@@ -0,0 +1,72 @@
+import pytest
+
+import db_pool
+import query_cache
+
+# Endpoint individual que sirve cada sección de /bootstrap (con page=home)
+ENDPOINTS = {
+    "products": "/products",
+    "specials": "/specials",
+    "categories": "/categories",
+    "carousel": "/carousel",
+    "content": "/content?page=home",
+    "news": "/news?featured_only=true&limit=50",
+}
+ALL_SECTIONS = "/bootstrap?page=home&sections=" + ",".join(ENDPOINTS)
+
+def bump(namespace: str):
+    """Lo que hace cualquier escritura del admin sobre ese espacio de nombres"""
+    conn = db_pool.connect()
+    try:
+        query_cache.bump_versions(conn.cursor(), namespace)
+        conn.commit()
+    finally:
+        conn.close()
+    query_cache.cache.invalidate(namespace)
+
+@pytest.mark.parametrize("url, sections", [
+    ("/bootstrap", ["carousel", "specials", "content", "news"]),
+    ("/bootstrap?page=menu", ["categories", "products", "specials"]),
+    (ALL_SECTIONS, list(ENDPOINTS)),
+])
+def test_bundle_matches_the_individual_endpoints(client, url, sections):
+    response = client.get(url)
+    assert response.status_code == 200
+    bundle = response.json()
+    assert list(bundle) == sections
+    for name in sections:
+        # page=menu solo cambia el contenido, que no está en su bundle
+        assert bundle[name] == client.get(ENDPOINTS[name]).json(), name
+
+def test_bundle_etag_changes_with_each_namespace(client):
+    seen = {client.get(ALL_SECTIONS).headers["etag"]}
+    for namespace in ENDPOINTS:
+        before = client.get(ALL_SECTIONS).headers["etag"]
+        assert client.get(ALL_SECTIONS, headers={"If-None-Match": before}).status_code == 304
+        bump(namespace)
+        after = client.get(ALL_SECTIONS)
+        assert after.status_code == 200
+        assert after.headers["etag"] not in seen, namespace
+        seen.add(after.headers["etag"])
+        # El ETag anterior ya no vale para revalidar
+        assert client.get(ALL_SECTIONS, headers={"If-None-Match": before}).status_code == 200
+
+    # Un espacio de nombres que no forma parte del bundle no lo invalida
+    etag = client.get(ALL_SECTIONS).headers["etag"]
+    bump("news_article")
+    assert client.get(ALL_SECTIONS, headers={"If-None-Match": etag}).status_code == 304
+
+def test_admin_write_refreshes_the_bundle(client, admin_headers):
+    etag = client.get("/bootstrap?page=menu").headers["etag"]
+    response = client.post("/admin/products", headers=admin_headers, json={
+        "name": "Café del bundle", "description": "Test", "price": 3.0, "category": "bebidas", "image": "x.jpg"
+    })
+    assert response.status_code == 200
+    product_id = response.json()["id"]
+    try:
+        refreshed = client.get("/bootstrap?page=menu", headers={"If-None-Match": etag})
+        assert refreshed.status_code == 200
+        assert product_id in [product["id"] for product in refreshed.json()["products"]]
+        assert refreshed.json()["products"] == client.get("/products").json()
+    finally:
+        client.delete(f"/admin/products/{product_id}", headers=admin_headers)
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+import pytest
+
+import daily_rollups
+import db_pool
+
+TABLES = {
+    "daily_order_stats": ("SELECT day, status, orders, ROUND(revenue, 2) FROM daily_order_stats "
+                          "WHERE orders != 0 ORDER BY 1, 2"),
+    "daily_product_sales": ("SELECT day, status, product_id, orders, units, ROUND(revenue, 2) FROM daily_product_sales "
+                            "WHERE orders != 0 ORDER BY 1, 2, 3"),
+    "daily_reservation_stats": ("SELECT day, status, reservations, guests FROM daily_reservation_stats "
+                                "WHERE reservations != 0 ORDER BY 1, 2"),
+}
+
+def snapshot(cursor) -> dict:
+    # Las filas que quedan a cero tras restar no las crea rebuild(): se ignoran
+    return {table: cursor.execute(sql).fetchall() for table, sql in TABLES.items()}
+
+def rollups_and_recount() -> tuple:
+    """Resúmenes incrementales y los mismos recalculados desde cero (sin guardar)"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        incremental = snapshot(cursor)
+        daily_rollups.rebuild(cursor)
+        recount = snapshot(cursor)
+        conn.rollback()
+        return incremental, recount
+    finally:
+        conn.close()
+
+@pytest.fixture
+def products(client):
+    return client.get("/products").json()[:3]
+
+def create_order(client, lines: list) -> int:
+    response = client.post("/orders", json={
+        "customer_name": "Resumen", "customer_email": "resumen@example.com",
+        "items": [{"product_id": p["id"], "product_name": p["name"], "quantity": q, "price": p["price"]}
+                  for p, q in lines]
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def create_reservation(client, day: date, party_size: int) -> int:
+    response = client.post("/reservations", json={
+        "customer_name": "Resumen", "customer_email": "resumen@example.com", "customer_phone": "600000000",
+        "party_size": party_size, "reservation_date": day.isoformat(), "reservation_time": "13:00"
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_rollups_match_a_full_recount_after_mixed_writes(client, admin_headers, products):
+    first, second, third = products
+    orders = [
+        create_order(client, [(first, 2), (second, 1)]),
+        create_order(client, [(first, 1)]),
+        create_order(client, [(second, 3), (third, 1), (first, 1)]),
+        create_order(client, [(third, 2)]),
+    ]
+    day = date.today() + timedelta(days=40)
+    reservations = [
+        create_reservation(client, day, 2),
+        create_reservation(client, day, 4),
+        create_reservation(client, day + timedelta(days=1), 3),
+    ]
+
+    def put(path: str, body: dict):
+        assert client.put(path, headers=admin_headers, json=body).status_code == 200
+
+    # Cambios de estado (ida y vuelta incluida), ediciones y borrados
+    put(f"/admin/orders/{orders[0]}/status", {"status": "completed"})
+    put(f"/admin/orders/{orders[1]}/status", {"status": "cancelled"})
+    put(f"/admin/orders/{orders[1]}/status", {"status": "pending"})
+    put(f"/admin/orders/{orders[2]}/status", {"status": "cancelled"})
+    assert client.delete(f"/admin/orders/{orders[3]}", headers=admin_headers).status_code == 200
+    assert client.delete(f"/admin/orders/{orders[0]}", headers=admin_headers).status_code == 200
+
+    put(f"/admin/reservations/{reservations[0]}/status", {"status": "confirmed"})
+    put(f"/admin/reservations/{reservations[1]}/status", {"status": "cancelled"})
+    put(f"/admin/reservations/{reservations[1]}/status", {"status": "pending"})
+    put(f"/admin/reservations/{reservations[2]}", {"party_size": 5, "reservation_date": day.isoformat()})
+    put(f"/admin/reservations/{reservations[2]}", {"reservation_date": (day + timedelta(days=2)).isoformat(),
+                                                     "status": "completed"})
+    assert client.delete(f"/admin/reservations/{reservations[0]}", headers=admin_headers).status_code == 200
+
+    incremental, recount = rollups_and_recount()
+    assert incremental == recount
+    # Las escrituras del test están reflejadas (no son dos tablas vacías)
+    reservation_days = {row[0] for row in recount["daily_reservation_stats"]}
+    assert {day.isoformat(), (day + timedelta(days=2)).isoformat()} <= reservation_days
+    assert any(row[1] == "cancelled" for row in recount["daily_order_stats"])
@@ -0,0 +1,118 @@
+import types
+
+import pytest
+
+import db_pool
+import email_outbox
+
+class Clock:
+    """Sustituto de time.time() para avanzar leases y esperas sin dormir"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(email_outbox, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+@pytest.fixture
+def outbox(app, fresh_pool, smtp_server, clock):
+    """Bandeja de salida vacía en su propia base de datos"""
+    import main
+    main.init_contact_db()
+    return email_outbox.OutboxWorker()
+
+def enqueue(recipient: str) -> int:
+    conn = db_pool.connect()
+    try:
+        email_id = email_outbox.enqueue_email(conn.cursor(), "Asunto", "Cuerpo", recipient)
+        conn.commit()
+        return email_id
+    finally:
+        conn.close()
+
+def row(email_id: int) -> tuple:
+    conn = db_pool.connect()
+    try:
+        return conn.execute(
+            "SELECT status, attempts, next_attempt_at, last_error FROM email_outbox WHERE id = ?", (email_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+def test_handler_commits_before_sending(client, smtp_server):
+    response = client.post("/contact", json={
+        "name": "Outbox", "email": "outbox@example.com", "subject": "Hola", "message": "Mensaje de prueba"
+    })
+    assert response.status_code == 200
+    # El endpoint ya respondió y el email está guardado, pero no se ha abierto ninguna sesión SMTP
+    assert smtp_server.sessions == []
+    conn = db_pool.connect()
+    try:
+        email_id, status = conn.execute(
+            "SELECT id, status FROM email_outbox WHERE body LIKE ? ORDER BY id DESC", (f"%ID del mensaje: {response.json()['id']}%",)
+        ).fetchone()
+    finally:
+        conn.close()
+    assert status == "pending"
+
+    worker = email_outbox.OutboxWorker()
+    while worker.process_batch():
+        pass
+    assert row(email_id)[0] == "sent"
+    assert smtp_server.delivered
+
+def test_expired_lease_is_claimed_again(outbox, clock):
+    email_id = enqueue("lease@example.com")
+    assert [claimed[0] for claimed in outbox.claim_batch()] == [email_id]
+    # Reservado: otro worker no lo coge mientras dure el lease
+    assert email_outbox.OutboxWorker().claim_batch() == []
+    assert row(email_id)[:2] == ("sending", 1)
+
+    # El worker que lo reservó murió sin enviarlo: al caducar el lease se vuelve a reservar
+    clock.now += email_outbox.LEASE_SECONDS
+    claimed = email_outbox.OutboxWorker().claim_batch()
+    assert [(email[0], email[4]) for email in claimed] == [(email_id, 2)]
+
+def test_failed_send_is_retried_after_backoff(outbox, smtp_server, clock):
+    email_id = enqueue("retry@example.com")
+    smtp_server.reject("retry@example.com", times=1)
+
+    assert outbox.process_batch() == 1
+    status, attempts, next_attempt_at, last_error = row(email_id)
+    assert (status, attempts) == ("pending", 1)
+    assert next_attempt_at == clock.now + email_outbox.backoff_delay(1)
+    assert "451" in last_error
+
+    # Antes de la espera no se reintenta
+    clock.now += email_outbox.backoff_delay(1) - 1
+    assert outbox.process_batch() == 0
+    clock.now += 1
+    assert outbox.process_batch() == 1
+    assert row(email_id)[:2] == ("sent", 2)
+    assert smtp_server.attempts == ["retry@example.com"] * 2
+
+def test_email_fails_after_max_attempts(outbox, smtp_server, clock, monkeypatch):
+    monkeypatch.setattr(email_outbox, "MAX_ATTEMPTS", 3)
+    email_id = enqueue("bounce@example.com")
+    smtp_server.reject("bounce@example.com")
+
+    for attempt in range(1, 4):
+        assert outbox.process_batch() == 1
+        clock.now += email_outbox.backoff_delay(attempt)
+    assert row(email_id)[:2] == ("failed", 3)
+
+    clock.now += email_outbox.BACKOFF_MAX
+    assert outbox.process_batch() == 0
+    assert len(smtp_server.attempts) == 3
+    assert email_outbox.outbox_stats() == {"failed": 1}
+
+def test_backoff_delay_doubles_up_to_the_maximum():
+    assert email_outbox.backoff_delay(1) == email_outbox.BACKOFF_BASE
+    assert email_outbox.backoff_delay(3) == email_outbox.BACKOFF_BASE * 4
+    assert email_outbox.backoff_delay(50) == email_outbox.BACKOFF_MAX
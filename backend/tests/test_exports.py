@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+import pytest
+
+import db_pool
+import exports
+
+ROWS = 1203
+DAY = "2030-02-03"
+
+@pytest.fixture
+def export_orders(app):
+    """Pedidos de un día propio, varios por segundo y con textos que obligan a escapar el CSV"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        ids = []
+        for i in range(ROWS):
+            cursor.execute(
+                "INSERT INTO orders (customer_name, customer_email, customer_phone, items, total_amount, notes, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)",
+                (f'Cliente "{i}", Sr.', f"export{i}@example.com", "600000000",
+                 json.dumps([{"product_id": 1, "quantity": i % 3 + 1}]), 2.5 + i,
+                 f"línea 1\nlínea 2, {i}" if i % 2 else f"=SUMA({i})",
+                 f"{DAY} 10:{(i // 60) % 60:02d}:00")
+            )
+            ids.append(cursor.lastrowid)
+        conn.commit()
+    finally:
+        conn.close()
+    yield ids
+    conn = db_pool.connect()
+    try:
+        conn.execute("DELETE FROM orders WHERE created_at LIKE ?", (f"{DAY}%",))
+        conn.commit()
+    finally:
+        conn.close()
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+    connect = db_pool.connect
+    monkeypatch.setattr(db_pool, "connect", lambda: opened.append(1) or connect())
+    return opened
+
+def test_csv_export_streams_every_row_across_pages(client, admin_headers, export_orders, connections):
+    response = client.get(f"/admin/export/orders?from={DAY}&to={DAY}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8"))))
+    assert rows[0] == list(exports.DATASETS["orders"][1])
+    body = rows[1:]
+    # Cada fila una vez, en orden de fecha e id, también en los cortes entre páginas
+    assert [int(row[0]) for row in body] == export_orders
+    assert all(len(row) == len(rows[0]) for row in body)
+    assert body[500][1] == 'Cliente "500", Sr.'
+    assert body[501][6] == "línea 1\nlínea 2, 501"
+    assert body[1000][6] == "'=SUMA(1000)"
+    # Una conexión corta por página
+    assert len(connections) == -(-ROWS // exports.BATCH_SIZE)
+
+def test_ndjson_export_with_small_pages(client, admin_headers, export_orders, monkeypatch):
+    monkeypatch.setattr(exports, "BATCH_SIZE", 7)
+    response = client.get(f"/admin/export/orders?format=ndjson&from={DAY}&to={DAY}", headers=admin_headers)
+    assert response.status_code == 200
+    lines = response.content.decode("utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == export_orders
+    assert json.loads(lines[3])["notes"] == "línea 1\nlínea 2, 3"
+
+def test_export_without_dates_includes_rows_without_date(client, admin_headers, export_orders):
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO orders (customer_name, customer_email, items, total_amount, created_at) "
+                       "VALUES ('Sin fecha', 'nodate@example.com', '[]', 1, NULL)")
+        undated = cursor.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    try:
+        response = client.get("/admin/export/orders", headers=admin_headers)
+        assert response.status_code == 200
+        ids = [int(row[0]) for row in list(csv.reader(io.StringIO(response.content.decode("utf-8"))))[1:]]
+        assert len(ids) == len(set(ids))
+        assert ids[0] == undated
+        assert set(export_orders) <= set(ids)
+    finally:
+        conn = db_pool.connect()
+        conn.execute("DELETE FROM orders WHERE id = ?", (undated,))
+        conn.commit()
+        conn.close()
+
+def test_export_rejects_invalid_dates(client, admin_headers):
+    response = client.get("/admin/export/orders?from=03/02/2030", headers=admin_headers)
+    assert response.status_code == 422
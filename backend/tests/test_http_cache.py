@@ -0,0 +1,55 @@
+import pytest
+
+import db_pool
+import http_cache
+import query_cache
+
+def test_etag_matches():
+    assert http_cache.etag_matches('"abc"', '"abc"')
+    assert http_cache.etag_matches('W/"abc", "def"', '"abc"')
+    assert not http_cache.etag_matches('"def"', '"abc"')
+    assert not http_cache.etag_matches(None, '"abc"')
+    # * solo cuando se sabe que el recurso existe
+    assert not http_cache.etag_matches("*", '"abc"')
+    assert http_cache.etag_matches("*", '"abc"', exists=True)
+
+@pytest.fixture
+def db_connects(monkeypatch):
+    """Contar las conexiones que piden los endpoints a la base de datos"""
+    calls = []
+    connect = db_pool.connect
+
+    def counting_connect():
+        calls.append(1)
+        return connect()
+
+    monkeypatch.setattr(db_pool, "connect", counting_connect)
+    return calls
+
+@pytest.fixture
+def product_id(client):
+    return client.get("/products").json()[0]["id"]
+
+def test_matching_etag_returns_304_without_touching_the_database(client, product_id, db_connects):
+    query_cache.cache.invalidate("product")
+    first = client.get(f"/products/{product_id}")
+    assert first.status_code == 200
+    assert len(db_connects) == 1
+    etag = first.headers["etag"]
+
+    db_connects.clear()
+    revalidated = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+    assert db_connects == []
+
+    # Un ETag distinto se sirve desde la caché en memoria, también sin consultar
+    stale = client.get(f"/products/{product_id}", headers={"If-None-Match": '"otro"'})
+    assert stale.status_code == 200
+    assert stale.json() == first.json()
+    assert db_connects == []
+
+def test_wildcard_only_matches_existing_resources(client, product_id):
+    assert client.get("/products/999999", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get(f"/products/{product_id}", headers={"If-None-Match": "*"}).status_code == 304
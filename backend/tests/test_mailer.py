@@ -0,0 +1,50 @@
+import time
+
+import mailer
+
+def messages(count: int) -> list:
+    return [(f"lector{i}@example.com", "Novedades", "Texto", i) for i in range(count)]
+
+def test_send_many_reuses_one_session(smtp_server):
+    pool = mailer.SMTPSessionPool(connections=1, messages_per_session=100)
+    result = pool.send_many(messages(10))
+    assert (result["sent"], result["failed"]) == (10, 0)
+    assert len(smtp_server.sessions) == 1
+    assert len(smtp_server.sessions[0].recipients) == 10
+    assert smtp_server.sessions[0].closed
+
+def test_sessions_are_renewed_after_messages_per_session(smtp_server):
+    pool = mailer.SMTPSessionPool(connections=2, messages_per_session=3)
+    outcomes = []
+    result = pool.send_many(messages(10), on_result=lambda message, ok, error: outcomes.append((message[3], ok)))
+    assert result["sent"] == 10
+    assert sorted(outcomes) == [(i, True) for i in range(10)]
+    assert sorted(smtp_server.delivered) == sorted(recipient for recipient, *_ in messages(10))
+    assert all(len(session.recipients) <= 3 for session in smtp_server.sessions)
+    assert 4 <= len(smtp_server.sessions) <= 5
+
+def test_reconnects_when_the_server_drops_the_session(smtp_server):
+    smtp_server.drop_after = 2
+    pool = mailer.SMTPSessionPool(connections=1, messages_per_session=100)
+    result = pool.send_many(messages(5))
+    assert (result["sent"], result["failed"]) == (5, 0)
+    assert smtp_server.delivered == [f"lector{i}@example.com" for i in range(5)]
+    assert [len(session.recipients) for session in smtp_server.sessions] == [2, 2, 1]
+
+def test_token_bucket_throttles_send_many(smtp_server):
+    pool = mailer.SMTPSessionPool(connections=4, rate_limiter=mailer.TokenBucket(rate=20, capacity=1))
+    started = time.monotonic()
+    result = pool.send_many(messages(6))
+    elapsed = time.monotonic() - started
+    assert result["sent"] == 6
+    # Un token de ráfaga y el resto a 20 por segundo: al menos 5/20 s
+    assert elapsed >= 0.24
+
+def test_token_bucket_allows_a_burst_then_waits():
+    bucket = mailer.TokenBucket(rate=10, capacity=3)
+    started = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.09
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+import db_pool
+import newsletter_campaigns
+
+class RecordingPool:
+    """Sustituto de SMTPSessionPool: anota los destinatarios y tarda `delay` por bloque"""
+
+    def __init__(self, delay: float = 0, during_send=None):
+        self.delay = delay
+        self.during_send = during_send
+        self.recipients = []
+
+    def send_many(self, messages, on_result=None):
+        if self.during_send:
+            self.during_send(messages)
+        time.sleep(self.delay)
+        for message in messages:
+            self.recipients.append(message[0])
+            on_result(message, True, None)
+        return {"sent": len(messages), "failed": 0, "elapsed": self.delay, "per_second": 0.0}
+
+@pytest.fixture
+def campaign(app):
+    """Campaña en marcha con un latido reciente (el worker de fondo no la toma)"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO newsletter_campaigns (subject, content, status, total, heartbeat_at)
+            VALUES ('Novedades', 'Texto', 'running', 5, ?)
+        ''', (time.time() - 60,))
+        campaign_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO newsletter_deliveries (campaign_id, subscriber_id, email) VALUES (?, ?, ?)",
+            [(campaign_id, 900000 + i, f"lector{i}@example.com") for i in range(5)]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return campaign_id
+
+def query(sql, params=()):
+    conn = db_pool.connect()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def test_heartbeat_is_renewed_while_a_chunk_is_sending(campaign, monkeypatch):
+    monkeypatch.setattr(newsletter_campaigns, "HEARTBEAT_INTERVAL", 0.05)
+    seen = {}
+
+    def during_send(messages):
+        seen["statuses"] = {row[0] for row in query(
+            "SELECT status FROM newsletter_deliveries WHERE campaign_id = ?", (campaign,))}
+        seen["heartbeat_before"] = query("SELECT heartbeat_at FROM newsletter_campaigns WHERE id = ?", (campaign,))[0][0]
+
+    runner = newsletter_campaigns.CampaignRunner()
+    runner.smtp_pool = RecordingPool(delay=0.4, during_send=during_send)
+    started = time.time()
+    runner.run_campaign(campaign)
+
+    # Los destinatarios quedan en 'sending' antes de enviar
+    assert seen["statuses"] == {"sending"}
+    # El latido se renovó a mitad de bloque, no solo al terminarlo
+    assert seen["heartbeat_before"] < started
+    heartbeat, status, sent = query("SELECT heartbeat_at, status, sent FROM newsletter_campaigns WHERE id = ?",
+                                    (campaign,))[0]
+    assert heartbeat >= started
+    assert (status, sent) == ("completed", 5)
+    assert len(runner.smtp_pool.recipients) == 5
+
+def test_interrupted_recipients_are_not_sent_twice(campaign):
+    # Simular una caída a mitad de bloque: dos destinatarios quedaron en 'sending'
+    conn = db_pool.connect()
+    try:
+        conn.execute('''
+            UPDATE newsletter_deliveries SET status = 'sending'
+            WHERE campaign_id = ? AND subscriber_id IN (900000, 900001)
+        ''', (campaign,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    runner = newsletter_campaigns.CampaignRunner()
+    runner.smtp_pool = RecordingPool()
+    runner.run_campaign(campaign)
+
+    assert sorted(runner.smtp_pool.recipients) == ["lector2@example.com", "lector3@example.com", "lector4@example.com"]
+    statuses = dict(query("SELECT subscriber_id, status FROM newsletter_deliveries WHERE campaign_id = ?", (campaign,)))
+    assert statuses == {900000: "failed", 900001: "failed", 900002: "sent", 900003: "sent", 900004: "sent"}
+    progress = newsletter_campaigns.get_campaign(campaign)
+    assert (progress["status"], progress["sent"], progress["failed"], progress["pending"]) == ("completed", 3, 2, 0)
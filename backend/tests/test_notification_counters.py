@@ -0,0 +1,61 @@
+import types
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+from sqlalchemy.dialects import postgresql  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import database  # noqa: E402
+import utils  # noqa: E402
+from database import NotificationCounter  # noqa: E402
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'counters.db'}")
+    database.Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def counters(session_factory) -> dict:
+    with session_factory() as db:
+        return {counter.type: counter.unread for counter in db.query(NotificationCounter).all()}
+
+def test_adjust_creates_and_clamps_the_counter(session_factory):
+    with session_factory() as db:
+        utils.adjust_notification_counter(db, "order", 1)
+        utils.adjust_notification_counter(db, "order", 1)
+        # Marcar como leída sin contador previo no deja negativos
+        utils.adjust_notification_counter(db, "reservation", -1)
+        db.commit()
+    assert counters(session_factory) == {"order": 2, "reservation": 0}
+
+    with session_factory() as db:
+        utils.adjust_notification_counter(db, "order", -5)
+        db.commit()
+    assert counters(session_factory)["order"] == 0
+
+def test_create_admin_notification_counts_it(session_factory):
+    with session_factory() as db:
+        assert utils.create_admin_notification(db, "order", "Nuevo pedido", "Pedido #1", 1) is not None
+        assert utils.create_admin_notification(db, "order", "Nuevo pedido", "Pedido #2", 2) is not None
+        assert utils.get_unread_notifications_count(db) == {"order": 2}
+
+class PostgresSession:
+    """Sesión mínima con el dialecto de PostgreSQL que guarda lo que se ejecuta"""
+
+    def __init__(self):
+        self.statements = []
+
+    def get_bind(self):
+        return types.SimpleNamespace(dialect=postgresql.dialect())
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+def test_upsert_on_postgresql():
+    db = PostgresSession()
+    utils.adjust_notification_counter(db, "order", 1)
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO notification_counters")
+    assert "ON CONFLICT (type) DO UPDATE SET unread = greatest(" in sql
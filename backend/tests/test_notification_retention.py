@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+from collections import Counter
+
+import pytest
+
+import db_pool
+import notification_counters
+import notification_retention
+
+@pytest.fixture
+def main_module(app):
+    import main
+    return main
+
+@pytest.fixture
+def archive_dir(main_module, fresh_pool, tmp_path, monkeypatch):
+    """Notificaciones vacías y archivos en un directorio temporal, con lotes pequeños"""
+    main_module.init_contact_db()
+    monkeypatch.setattr(notification_retention, "ARCHIVE_DIR", str(tmp_path / "archives"))
+    monkeypatch.setattr(notification_retention, "BATCH_SIZE", 2)
+    monkeypatch.setattr(notification_retention, "UNREAD_CAP", 2)
+    return tmp_path / "archives"
+
+def notify(main_module, type_: str, created_at: str) -> int:
+    assert main_module.create_notification(type_, "Aviso", f"{type_} {created_at}")
+    conn = db_pool.connect()
+    try:
+        notification_id = conn.execute("SELECT MAX(id) FROM admin_notifications").fetchone()[0]
+        conn.execute("UPDATE admin_notifications SET created_at = ? WHERE id = ?", (created_at, notification_id))
+        conn.commit()
+        return notification_id
+    finally:
+        conn.close()
+
+def read_archive(path) -> list:
+    # Cada ejecución añade un miembro gzip: gzip.open los lee todos seguidos
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return [json.loads(line) for line in archive]
+
+def remaining() -> dict:
+    conn = db_pool.connect()
+    try:
+        return dict(conn.execute("SELECT id, is_read FROM admin_notifications").fetchall())
+    finally:
+        conn.close()
+
+def unread_counters() -> dict:
+    conn = db_pool.connect()
+    try:
+        return notification_counters.unread_counts(conn.cursor())
+    finally:
+        conn.close()
+
+def test_old_notifications_are_archived_by_month(client, admin_headers, main_module, archive_dir):
+    read_old = [notify(main_module, "order", created_at) for created_at in
+                ("2024-01-05 10:00:00", "2024-01-20 18:30:00", "2024-02-01 00:00:00")]
+    unread_old = [notify(main_module, "reservation", "2024-01-10 12:00:00"),
+                  notify(main_module, "order", "2024-02-15 09:00:00")]
+    recent = [notify(main_module, "order", "2999-01-01 00:00:00"), notify(main_module, "contact", "2999-01-01 00:00:00")]
+    for notification_id in read_old + [recent[0]]:
+        assert client.put(f"/admin/notifications/{notification_id}/read", headers=admin_headers).status_code == 200
+    assert unread_counters() == {"reservation": 1, "order": 1, "contact": 1}
+
+    response = client.post("/admin/notifications/retention", headers=admin_headers)
+    assert response.status_code == 200
+    # Las tres leídas caducadas (en dos lotes) y la no leída más antigua que sobra del tope
+    assert response.json()["read_archived"] == 3
+    assert response.json()["unread_archived"] == 1
+
+    assert sorted(os.listdir(archive_dir)) == ["notifications-2024-01.jsonl.gz", "notifications-2024-02.jsonl.gz"]
+    january = read_archive(archive_dir / "notifications-2024-01.jsonl.gz")
+    february = read_archive(archive_dir / "notifications-2024-02.jsonl.gz")
+    assert sorted(record["id"] for record in january) == sorted(read_old[:2] + [unread_old[0]])
+    assert [record["id"] for record in february] == [read_old[2]]
+    assert {record["id"]: record["is_read"] for record in january}[unread_old[0]] is False
+    assert set(january[0]) == set(notification_retention.COLUMNS)
+
+    assert remaining() == {unread_old[1]: 0, recent[0]: 1, recent[1]: 0}
+    # Contadores ya cuadrados: el recálculo completo no tiene nada que corregir
+    assert unread_counters() == {"order": 1, "contact": 1}
+    assert notification_counters.reconcile() == {}
+
+    # Una segunda ejecución añade al archivo del mes sin perder lo anterior
+    later = notify(main_module, "order", "2024-01-31 23:59:59")
+    assert client.put(f"/admin/notifications/{later}/read", headers=admin_headers).status_code == 200
+    assert notification_retention.run_retention() == {"read_archived": 1, "unread_archived": 0}
+    january_ids = [record["id"] for record in read_archive(archive_dir / "notifications-2024-01.jsonl.gz")]
+    assert Counter(january_ids) == Counter(read_old[:2] + [unread_old[0], later])
+    assert notification_counters.reconcile() == {}
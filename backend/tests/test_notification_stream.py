@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+import notification_stream
+
+class FakeRequest:
+    """Lo único que usa event_stream de la petición"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+@pytest.fixture
+def main_module(app):
+    import main
+    return main
+
+@pytest.fixture
+def broker(main_module, fresh_pool, monkeypatch):
+    """Broker sin hilo sobre una base de datos vacía: poll() se llama a mano"""
+    main_module.init_contact_db()
+    broker = notification_stream.NotificationBroker()
+    monkeypatch.setattr(notification_stream, "_broker", broker)
+    broker.poll()
+    return broker
+
+def notify_admin(main_module, count: int = 1) -> list:
+    for i in range(count):
+        assert main_module.create_notification("order", "Nuevo pedido", f"Pedido {i}")
+    return [n["id"] for n in notification_stream.fetch_since(0, 10_000)][-count:]
+
+def parse(event: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in event.strip().split("\n"))
+    return {"id": int(fields["id"]) if "id" in fields else None, "event": fields.get("event")}
+
+async def next_event(stream) -> str:
+    return await asyncio.wait_for(stream.__anext__(), 2)
+
+def test_last_event_id_replays_missed_notifications(main_module, broker):
+    ids = notify_admin(main_module, 5)
+
+    async def scenario():
+        stream = notification_stream.event_stream(FakeRequest(), last_event_id=ids[1])
+        assert await next_event(stream) == "retry: 3000\n\n"
+        replayed = [parse(await next_event(stream)) for _ in range(3)]
+
+        # Lo que llegue después por el broker no repite lo ya reenviado
+        broker.poll()
+        new_id, = notify_admin(main_module)
+        broker.poll()
+        replayed.append(parse(await next_event(stream)))
+        await stream.aclose()
+        return replayed, new_id
+
+    events, new_id = asyncio.run(scenario())
+    assert events == [{"id": notification_id, "event": "notification"} for notification_id in ids[2:] + [new_id]]
+
+def test_too_many_missed_events_ask_for_a_sync(main_module, broker, monkeypatch):
+    monkeypatch.setattr(notification_stream, "REPLAY_LIMIT", 3)
+    ids = notify_admin(main_module, 5)
+
+    async def scenario():
+        stream = notification_stream.event_stream(FakeRequest(), last_event_id=ids[0] - 1)
+        await next_event(stream)
+        event = parse(await next_event(stream))
+        await stream.aclose()
+        return event
+
+    assert asyncio.run(scenario()) == {"id": None, "event": "sync"}
+
+def test_slow_client_overflows_into_a_sync_event(main_module, broker, monkeypatch):
+    monkeypatch.setattr(notification_stream, "CLIENT_BUFFER", 3)
+
+    async def scenario():
+        stream = notification_stream.event_stream(FakeRequest())
+        await next_event(stream)
+        # El cliente no lee mientras llegan más notificaciones de las que caben en su buffer
+        notify_admin(main_module, 4)
+        broker.poll()
+        await asyncio.sleep(0.05)
+        subscriber, = broker._subscribers
+        overflow = parse(await next_event(stream))
+
+        # Después del sync vuelve a recibir con normalidad
+        new_id, = notify_admin(main_module)
+        broker.poll()
+        after = parse(await next_event(stream))
+        await stream.aclose()
+        return subscriber.overflows, overflow, after, new_id
+
+    overflows, overflow, after, new_id = asyncio.run(scenario())
+    assert overflows == 1
+    assert overflow == {"id": None, "event": "sync"}
+    assert after == {"id": new_id, "event": "notification"}
+    assert broker.subscriber_count() == 0
+
+def test_notify_wakes_the_broker(main_module, fresh_pool, monkeypatch):
+    main_module.init_contact_db()
+    monkeypatch.setattr(notification_stream, "POLL_INTERVAL", 3600)
+    monkeypatch.setattr(notification_stream, "_broker", None)
+    notification_stream.start_broker()
+    broker = notification_stream._broker
+    try:
+        async def scenario():
+            subscriber = broker.subscribe(asyncio.get_running_loop())
+            deadline = time.monotonic() + 2
+            while broker.last_id is None and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            # create_notification() llama a notify() tras su commit: sin esperar al sondeo
+            started = time.monotonic()
+            await asyncio.to_thread(notify_admin, main_module)
+            notification = await asyncio.wait_for(subscriber.queue.get(), 2)
+            return notification, time.monotonic() - started
+
+        notification, elapsed = asyncio.run(scenario())
+        assert notification["title"] == "Nuevo pedido"
+        assert elapsed < 2
+    finally:
+        notification_stream.stop_broker()
+
+def test_stream_requires_a_ticket_not_the_admin_token(client, admin_headers, main_module):
+    token = admin_headers["Authorization"].split(" ", 1)[1]
+    assert client.get("/admin/notifications/stream").status_code == 401
+    # El token del admin ya no se acepta en la URL
+    assert client.get(f"/admin/notifications/stream?token={token}").status_code == 401
+    assert client.get(f"/admin/notifications/stream?ticket={token}").status_code == 401
+
+    response = client.post("/admin/notifications/stream-ticket", headers=admin_headers)
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert response.json()["expires_in"] == main_module.STREAM_TICKET_SECONDS
+    # Y el ticket no sirve como token del admin
+    assert client.get("/admin/dashboard", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+    assert main_module.verify_stream_ticket(ticket) == "admin"
+
+    expired = jwt.encode(
+        {"sub": "admin", "scope": main_module.STREAM_TICKET_SCOPE, "exp": datetime.utcnow() - timedelta(seconds=1)},
+        main_module.SECRET_KEY, algorithm=main_module.ALGORITHM
+    )
+    assert client.get(f"/admin/notifications/stream?ticket={expired}").status_code == 401
+
+def test_access_log_hides_the_ticket(main_module):
+    record = logging.LogRecord("uvicorn.access", logging.INFO, __file__, 1, '%s - "%s %s HTTP/%s" %d',
+                               ("127.0.0.1:5000", "GET", "/admin/notifications/stream?ticket=abc.def&last_event_id=7",
+                                "1.1", 200), None)
+    assert main_module.RedactStreamTicket().filter(record)
+    assert record.getMessage() == '127.0.0.1:5000 - "GET /admin/notifications/stream?ticket=***&last_event_id=7 HTTP/1.1" 200'
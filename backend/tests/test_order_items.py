@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+import pytest
+
+import migrations
+
+@pytest.fixture
+def main_module(app):
+    import main
+    return main
+
+def legacy_orders(path: str):
+    """Pedidos de antes de order_items: las líneas solo en el JSON de orders.items"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_name TEXT NOT NULL,
+            customer_email TEXT NOT NULL,
+            customer_phone TEXT,
+            items TEXT NOT NULL,
+            total_amount REAL NOT NULL,
+            notes TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany(
+        "INSERT INTO orders (customer_name, customer_email, items, total_amount, status, created_at) "
+        "VALUES ('Cliente', 'c@example.com', ?, ?, 'completed', '2025-03-01 10:00:00')",
+        [
+            (json.dumps([{"product_id": 1, "product_name": "Café", "quantity": 2, "price": 1.5}]), 3.0),
+            (json.dumps([{"product_id": 1, "product_name": "Café", "quantity": 1, "price": 1.5},
+                         {"product_id": 2, "product_name": "Tostada", "quantity": 1, "price": 2.0}]), 3.5),
+            ("no es json", 1.0),
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+def test_old_orders_are_migrated_once(main_module, fresh_pool):
+    legacy_orders(fresh_pool.path)
+
+    # Arrancar ya no recorre orders buscando pedidos sin líneas
+    main_module.init_db()
+    main_module.init_contact_db()
+    conn = sqlite3.connect(fresh_pool.path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM order_items").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    assert migrations.migrate() == len(migrations.MIGRATIONS)
+    conn = sqlite3.connect(fresh_pool.path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == migrations.LATEST_VERSION
+        assert conn.execute("SELECT order_id, product_id, quantity FROM order_items ORDER BY id").fetchall() == [
+            (1, 1, 2), (2, 1, 1), (2, 2, 1)
+        ]
+        # Los resúmenes del arranque se rehacen con las líneas migradas
+        assert conn.execute(
+            "SELECT product_id, units, revenue FROM daily_product_sales ORDER BY product_id"
+        ).fetchall() == [(1, 3, 4.5), (2, 1, 2.0)]
+    finally:
+        conn.close()
+
+    main_module.init_db()
+    assert migrations.migrate() == 0
+    conn = sqlite3.connect(fresh_pool.path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM order_items").fetchone()[0] == 3
+    finally:
+        conn.close()
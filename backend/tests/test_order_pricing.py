@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+import order_pricing
+import query_cache
+
+@pytest.fixture
+def product(client, admin_headers):
+    response = client.post("/admin/products", headers=admin_headers, json={
+        "name": "Café de precio", "description": "Test", "price": 4.0, "category": "bebidas", "image": "x.jpg"
+    })
+    assert response.status_code == 200
+    product = response.json()
+    yield product
+    client.delete(f"/admin/products/{product['id']}", headers=admin_headers)
+
+def order(client, product_id: int, price: float, quantity: int = 2, name: str = "Café de precio"):
+    return client.post("/orders", json={
+        "customer_name": "Precio", "customer_email": "precio@example.com",
+        "items": [{"product_id": product_id, "product_name": name, "quantity": quantity, "price": price}]
+    })
+
+def test_tampered_price_is_rejected(client, product):
+    response = order(client, product["id"], 0.01)
+    assert response.status_code == 400
+    assert "ha cambiado" in response.json()["detail"]
+
+def test_server_price_and_name_are_charged(client, product):
+    # Dentro de la tolerancia se acepta, pero se cobra el precio del servidor
+    response = order(client, product["id"], 4.0 + order_pricing.PRICE_TOLERANCE / 2, name="Gratis")
+    assert response.status_code == 200
+    created = response.json()
+    assert created["total_amount"] == 8.0
+    assert created["items"][0]["price"] == 4.0
+    assert created["items"][0]["product_name"] == "Café de precio"
+
+@pytest.mark.parametrize("product_id, quantity", [(999_999, 1), (None, 0), (None, order_pricing.MAX_QUANTITY + 1)])
+def test_invalid_lines_are_rejected(client, product, product_id, quantity):
+    response = order(client, product_id or product["id"], 4.0, quantity=quantity)
+    assert response.status_code == 400
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    """Espacios de nombres invalidados en este proceso"""
+    namespaces = []
+    invalidate = query_cache.cache.invalidate
+    monkeypatch.setattr(query_cache.cache, "invalidate",
+                        lambda namespace, *keys: (namespaces.append(namespace), invalidate(namespace, *keys)))
+    return namespaces
+
+def test_menu_edits_invalidate_the_price_index(client, admin_headers, product, invalidated):
+    # Índice de precios cargado en caché con el precio inicial
+    assert order(client, product["id"], 4.0).status_code == 200
+
+    # Oferta del día: se acepta el precio de lista que aún muestre la carta y se cobra el de hoy
+    special = client.post("/admin/specials", headers=admin_headers, json={
+        "product_id": product["id"], "date": datetime.utcnow().date().isoformat(), "discount": 50
+    })
+    assert special.status_code == 200
+    assert invalidated.count("prices") == 1
+    response = order(client, product["id"], 4.0)
+    assert response.status_code == 200
+    assert response.json()["total_amount"] == 4.0
+
+    # Cambio de precio: el antiguo ya no vale
+    response = client.put(f"/admin/products/{product['id']}", headers=admin_headers, json={"price": 5.0})
+    assert response.status_code == 200
+    assert invalidated.count("prices") == 2
+    assert order(client, product["id"], 4.0).status_code == 400
+    assert order(client, product["id"], 2.5).json()["total_amount"] == 5.0
+
+    # Sin la oferta se vuelve a cobrar el precio de lista
+    assert client.delete(f"/admin/specials/{special.json()['id']}", headers=admin_headers).status_code == 200
+    assert invalidated.count("prices") == 3
+    assert order(client, product["id"], 5.0).json()["total_amount"] == 10.0
+    assert order(client, product["id"], 2.5).status_code == 400
+
+    # Producto retirado: ya no se puede pedir
+    assert client.delete(f"/admin/products/{product['id']}", headers=admin_headers).status_code == 200
+    assert invalidated.count("prices") == 4
+    assert order(client, product["id"], 5.0).status_code == 400
@@ -0,0 +1,96 @@
+import threading
+from collections import Counter
+
+import pytest
+
+import db_pool
+import notification_counters
+
+def order_payload(customer_name: str, product: dict) -> dict:
+    return {
+        "customer_name": customer_name,
+        "customer_email": "pedido@example.com",
+        "items": [{"product_id": product["id"], "product_name": product["name"], "quantity": 2, "price": product["price"]}],
+    }
+
+@pytest.fixture
+def product(client):
+    return client.get("/products").json()[0]
+
+def count(sql: str, *params) -> int:
+    conn = db_pool.connect()
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_failed_notification_rolls_back_the_order(client, product, monkeypatch):
+    def broken_adjust(cursor, type_, delta):
+        raise RuntimeError("contador no disponible")
+
+    monkeypatch.setattr(notification_counters, "adjust", broken_adjust)
+    response = client.post("/orders", json=order_payload("Sin contador", product))
+    assert response.status_code == 500
+    # Ni el pedido, ni sus líneas, ni la notificación: todo o nada
+    assert count("SELECT COUNT(*) FROM orders WHERE customer_name = 'Sin contador'") == 0
+    assert count("SELECT COUNT(*) FROM admin_notifications WHERE message LIKE 'Pedido de Sin contador%'") == 0
+
+    # La conexión volvió al pool sin la transacción a medias
+    monkeypatch.undo()
+    response = client.post("/orders", json=order_payload("Con contador", product))
+    assert response.status_code == 200
+    assert count("SELECT COUNT(*) FROM admin_notifications WHERE related_id = ? AND type = 'order'",
+                 response.json()["id"]) == 1
+
+THREADS = 12
+ORDERS_PER_THREAD = 10
+
+def test_concurrent_orders_commit_once_each(app, product, monkeypatch):
+    import main
+    from fastapi import HTTPException
+
+    commits = []
+    commit = db_pool.PooledConnection.commit
+    monkeypatch.setattr(db_pool.PooledConnection, "commit",
+                        lambda self: (commits.append(threading.get_ident()), commit(self)))
+    unread_before = count("SELECT COALESCE(MAX(unread), 0) FROM notification_counters WHERE type = 'order'")
+
+    results = Counter()
+    order_ids = []
+    idents = set()
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def customer():
+        with lock:
+            idents.add(threading.get_ident())
+        start.wait()
+        for _ in range(ORDERS_PER_THREAD):
+            data = main.OrderCreate(**order_payload("Concurrente", product))
+            try:
+                order_id = main.create_order(data).id
+                outcome = "created"
+            except HTTPException as e:
+                order_id, outcome = None, e.status_code
+            with lock:
+                results[outcome] += 1
+                if order_id is not None:
+                    order_ids.append(order_id)
+
+    threads = [threading.Thread(target=customer) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Ningún "database is locked" (HTTP 500): todos los pedidos se guardan
+    assert results == {"created": THREADS * ORDERS_PER_THREAD}
+    assert len(set(order_ids)) == THREADS * ORDERS_PER_THREAD
+    # Un commit por pedido con el pedido, sus líneas, la notificación y los emails
+    assert len([ident for ident in commits if ident in idents]) == THREADS * ORDERS_PER_THREAD
+
+    placeholders = ", ".join("?" for _ in order_ids)
+    assert count(f"SELECT COUNT(*) FROM order_items WHERE order_id IN ({placeholders})", *order_ids) == len(order_ids)
+    assert count(f"SELECT COUNT(*) FROM admin_notifications WHERE type = 'order' AND related_id IN ({placeholders})",
+                 *order_ids) == len(order_ids)
+    assert count("SELECT unread FROM notification_counters WHERE type = 'order'") == unread_before + len(order_ids)
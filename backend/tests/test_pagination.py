@@ -0,0 +1,84 @@
+import base64
+
+import pytest
+
+import db_pool
+import pagination
+
+# Tres mensajes por día y varios con la misma hora exacta: el id desempata
+CREATED_AT = [
+    "2025-03-01 09:00:00", "2025-03-01 09:00:00", "2025-03-01 12:00:00",
+    "2025-03-02 10:00:00", "2025-03-02 10:00:00", "2025-03-02 10:00:00",
+    "2025-03-03 08:00:00", "2025-03-03 23:59:59", "2025-03-03 23:59:59",
+]
+
+@pytest.fixture
+def messages(app, fresh_pool):
+    """Mensajes de contacto con fechas fijas en una base de datos vacía"""
+    import main
+    main.init_contact_db()
+    conn = db_pool.connect()
+    try:
+        conn.executemany(
+            "INSERT INTO contact_messages (name, email, subject, message, created_at) VALUES (?, ?, 'Asunto', 'Hola', ?)",
+            [(f"Cliente {i}", f"c{i}@example.com", created_at) for i, created_at in enumerate(CREATED_AT)]
+        )
+        conn.commit()
+        return [row for row in conn.execute("SELECT id, created_at FROM contact_messages")]
+    finally:
+        conn.close()
+
+def walk(client, headers, query: str) -> tuple:
+    """Recorrer todas las páginas siguiendo X-Next-Cursor: (ids, número de páginas)"""
+    ids, pages, cursor = [], 0, None
+    while True:
+        url = f"/admin/contacts?{query}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        ids += [message["id"] for message in response.json()]
+        pages += 1
+        cursor = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids, pages
+
+def expected(messages, descending=True, date_from="", date_to="9999"):
+    rows = [(created_at, id) for id, created_at in messages if date_from <= created_at[:10] <= date_to]
+    return [id for _, id in sorted(rows, reverse=descending)]
+
+@pytest.mark.parametrize("limit", [1, 2, 4, 9, 50])
+def test_cursor_round_trip_visits_every_row_once(client, admin_headers, messages, limit):
+    ids, pages = walk(client, admin_headers, f"limit={limit}")
+    # Las filas empatadas en created_at no se repiten ni se pierden al cambiar de página
+    assert ids == expected(messages)
+    assert pages == max(1, -(-len(messages) // limit))
+
+def test_ascending_order_breaks_ties_by_id(client, admin_headers, messages):
+    ids, _ = walk(client, admin_headers, "limit=2&order=asc")
+    assert ids == expected(messages, descending=False)
+
+def test_date_filters_include_both_days(client, admin_headers, messages):
+    ids, _ = walk(client, admin_headers, "limit=2&from=2025-03-02&to=2025-03-03")
+    # to incluye el final del día aunque created_at lleve hora
+    assert ids == expected(messages, date_from="2025-03-02", date_to="2025-03-03")
+    ids, _ = walk(client, admin_headers, "limit=2&to=2025-03-01")
+    assert ids == expected(messages, date_to="2025-03-01")
+
+def encoded(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+@pytest.mark.parametrize("query", [
+    "cursor=no-es-un-cursor",
+    "cursor=%C3%B1",
+    f"cursor={encoded(b'no es json')}",
+    f"cursor={encoded(bytes([0xff, 0xfe]))}",
+    f"cursor={encoded(b'{}')}",
+    f"cursor={encoded(b'[1]')}",
+    f"cursor={encoded(b'[1, 2, 3]')}",
+    f"cursor={encoded(b'[[1], 2]')}",
+    f"cursor={encoded(b'[{}, 2]')}",
+    "from=2025-13-01",
+    "to=01/03/2025",
+])
+def test_malformed_cursor_or_dates_are_rejected(client, admin_headers, messages, query):
+    response = client.get(f"/admin/contacts?{query}", headers=admin_headers)
+    assert response.status_code == 422
@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import query_cache
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(query_cache.__file__))
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        PRAGMA journal_mode=WAL;
+        CREATE TABLE cache_versions (
+            namespace TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT);
+        INSERT INTO products (id, name) VALUES (1, 'Café');
+    ''')
+    conn.commit()
+    conn.close()
+    return path
+
+def write_in_other_process(path: str, name: str, *namespaces: str):
+    """Cambiar el producto y subir cache_versions desde otro proceso, como otro worker de uvicorn"""
+    script = textwrap.dedent(f'''
+        import sqlite3, sys
+        sys.path.insert(0, {BACKEND_DIR!r})
+        import query_cache
+        conn = sqlite3.connect({path!r})
+        cursor = conn.cursor()
+        cursor.execute("UPDATE products SET name = ? WHERE id = 1", ({name!r},))
+        query_cache.bump_versions(cursor, *{namespaces!r})
+        conn.commit()
+    ''')
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+def test_stale_entry_is_dropped_after_a_write_in_another_process(database):
+    cache = query_cache.QueryCache(watcher=query_cache.VersionWatcher(database, interval=0))
+    loads = []
+
+    def load():
+        conn = sqlite3.connect(database)
+        try:
+            name = conn.execute("SELECT name FROM products WHERE id = 1").fetchone()[0]
+        finally:
+            conn.close()
+        loads.append(name)
+        return name
+
+    assert cache.get_or_load("products", (), load) == "Café"
+    assert cache.get_or_load("products", (), load) == "Café"
+    assert loads == ["Café"]
+    etag = cache.etag("products")
+
+    # Un cambio en otro espacio de nombres no descarta este
+    write_in_other_process(database, "Café", "news")
+    assert cache.get_or_load("products", (), load) == "Café"
+    assert loads == ["Café"]
+
+    write_in_other_process(database, "Té", "products")
+    assert cache.get_or_load("products", (), load) == "Té"
+    assert loads == ["Café", "Té"]
+    assert cache.etag("products") != etag
+    assert cache.stats()["remote_invalidations"] >= 1
+    cache.watcher.close()
+
+def test_watcher_only_reads_versions_when_data_version_changes(database):
+    watcher = query_cache.VersionWatcher(database, interval=0)
+    watcher.changed_namespaces()
+    assert watcher.changed_namespaces() == []
+
+    write_in_other_process(database, "Té", "products", "specials")
+    assert sorted(watcher.changed_namespaces()) == ["products", "specials"]
+    assert watcher.version("products") == 1
+    assert watcher.changed_namespaces() == []
+    watcher.close()
+
+class Clock:
+    """Reloj manual para los TTL"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def loader(loads: list, value):
+    return lambda: (loads.append(value), value)[1]
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = query_cache.QueryCache(max_entries=3, ttl=60, clock=Clock())
+    loads = []
+    for name in ("a", "b", "c"):
+        cache.get_or_load("products", (name,), loader(loads, name))
+    # Leer "a" la convierte en la más reciente: la siguiente en salir es "b"
+    cache.get_or_load("products", ("a",), loader(loads, "a"))
+    cache.get_or_load("products", ("d",), loader(loads, "d"))
+    assert list(cache._entries) == [("products", ("c",)), ("products", ("a",)), ("products", ("d",))]
+
+    cache.get_or_load("products", ("b",), loader(loads, "b"))
+    assert loads == ["a", "b", "c", "d", "b"]
+    assert ("products", ("c",)) not in cache._entries
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 5, 2, 3)
+    assert stats["hit_ratio"] == round(1 / 6, 3)
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = query_cache.QueryCache(max_entries=10, ttl=30, clock=clock)
+    loads = []
+    cache.get_or_load("specials", (), loader(loads, 1))
+    clock.now += 29.9
+    assert cache.get_or_load("specials", (), loader(loads, 2)) == 1
+
+    # Justo al cumplirse el TTL se vuelve a cargar, y el nuevo valor dura otro TTL
+    clock.now += 0.1
+    assert cache.get_or_load("specials", (), loader(loads, 2)) == 2
+    clock.now += 29.9
+    assert cache.get_or_load("specials", (), loader(loads, 3)) == 2
+    assert loads == [1, 2]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["evictions"]) == (2, 2, 1, 0)
+
+def test_invalidation_counts_and_discards_loads_in_flight():
+    cache = query_cache.QueryCache(max_entries=10, ttl=60, clock=Clock())
+    loads = []
+    cache.get_or_load("news", (True,), loader(loads, "destacadas"))
+    cache.get_or_load("news", (False,), loader(loads, "todas"))
+    cache.get_or_load("carousel", (), loader(loads, "carrusel"))
+    cache.invalidate("news", (True,))
+    assert cache.stats()["invalidations"] == 1
+    cache.invalidate("news")
+    assert cache.stats()["invalidations"] == 2
+    assert list(cache._entries) == [("carousel", ())]
+
+    # Una carga que empezó antes de invalidar no se guarda
+    def stale_load():
+        cache.invalidate("news")
+        return "antigua"
+
+    assert cache.get_or_load("news", (True,), stale_load) == "antigua"
+    assert cache.get_or_load("news", (True,), loader(loads, "nueva")) == "nueva"
+    assert cache.stats()["versions"] == {"news": 3}
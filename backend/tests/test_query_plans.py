@@ -0,0 +1,102 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+import db_pool
+import hot_queries
+import migrations
+import pagination
+import query_plans
+import reservation_dates
+
+ROWS = 5000
+
+@pytest.fixture
+def main_module(app):
+    import main
+    return main
+
+def create_schema(main):
+    """Lo mismo que hace main.py al arrancar: tablas y después migraciones"""
+    main.init_db()
+    main.init_contact_db()
+    migrations.migrate()
+
+def assert_hot_queries_use_indexes(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        query_plans.fill_hot(conn, ROWS)
+        failures = {}
+        for name, sql, params, expected in hot_queries.plans():
+            steps = query_plans.plan(conn, sql, params)
+            if not query_plans.uses_index(steps, expected):
+                failures[name] = (expected, steps)
+        assert failures == {}
+    finally:
+        conn.close()
+
+def user_version(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_hot_queries_use_indexes_on_a_fresh_database(main_module, fresh_pool):
+    create_schema(main_module)
+    assert user_version(fresh_pool.path) == migrations.LATEST_VERSION
+    assert_hot_queries_use_indexes(fresh_pool.path)
+
+def test_hot_queries_use_indexes_after_migrating_a_baseline_database(main_module, fresh_pool):
+    # Esquema anterior a las migraciones: reservas con fecha y hora solo como texto
+    conn = sqlite3.connect(fresh_pool.path)
+    conn.execute(query_plans.RESERVATIONS_TABLE)
+    for name in reservation_dates.OLD_INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON reservations (reservation_date, reservation_time)")
+    query_plans.fill(conn.cursor(), 300, date(2025, 1, 1), 30)
+    conn.commit()
+    conn.close()
+    assert user_version(fresh_pool.path) == 0
+
+    create_schema(main_module)
+    assert user_version(fresh_pool.path) == migrations.LATEST_VERSION
+    conn = sqlite3.connect(fresh_pool.path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM reservations WHERE reservation_day IS NULL").fetchone()[0] == 0
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert not indexes & set(reservation_dates.OLD_INDEXES)
+    finally:
+        conn.close()
+    # Volver a arrancar no aplica nada
+    assert migrations.migrate() == 0
+    assert_hot_queries_use_indexes(fresh_pool.path)
+
+def test_pagination_builds_the_query_it_runs(fresh_pool):
+    conn = db_pool.connect()
+    try:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, created_at TEXT)")
+        conn.executemany("INSERT INTO items (created_at) VALUES (?)", [(f"2025-01-{day:02d}",) for day in range(1, 8)])
+        sql, params = pagination.keyset_query("items", "id", ("created_at",), limit=3)
+        assert params == (4,)
+        rows, next_cursor = pagination.keyset_page(conn.cursor(), "items", "id", ("created_at",), limit=3)
+        assert [row[0] for row in rows] == [7, 6, 5]
+        assert next_cursor
+    finally:
+        conn.close()
+
+def test_filtered_query_must_search_its_index(main_module, fresh_pool):
+    create_schema(main_module)
+    conn = sqlite3.connect(fresh_pool.path)
+    try:
+        conn.execute("DROP INDEX idx_orders_status_created")
+        query_plans.fill_hot(conn, ROWS)
+        name, sql, params, expected = next(entry for entry in hot_queries.plans()
+                                           if entry[0] == "GET /admin/orders?status=")
+        steps = query_plans.plan(conn, sql, params)
+    finally:
+        conn.close()
+    # Sin el índice por estado, SQLite recorre idx_orders_created entero filtrando fila a fila
+    assert steps[0].startswith("SCAN orders USING INDEX")
+    assert query_plans.uses_index(steps)
+    assert not query_plans.uses_index(steps, expected)
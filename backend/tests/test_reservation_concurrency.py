@@ -0,0 +1,158 @@
+"""
+Reservas concurrentes contra el aforo y reintentos de write_transaction
+
+Sustituye al antiguo script reservation_stress.py: muchos hilos reservan a
+la vez el mismo día en horas solapadas y después se recalcula la ocupación
+desde reservations para comprobar que ninguna franja supera el aforo y que
+slot_occupancy coincide con las reservas guardadas.
+"""
+import random
+import sqlite3
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+import db_pool
+import reservation_capacity
+
+THREADS = 16
+BOOKINGS_PER_THREAD = 8
+TIMES = ("13:00", "13:30", "14:00")
+
+def recount(reservation_date: str) -> list:
+    """Asientos por franja recalculados desde las reservas activas"""
+    conn = db_pool.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT reservation_time, party_size FROM reservations
+            WHERE reservation_date = ?
+            AND status IN ({", ".join("?" for _ in reservation_capacity.ACTIVE_STATUSES)})
+        ''', (reservation_date, *reservation_capacity.ACTIVE_STATUSES))
+        seats = [0] * reservation_capacity.SLOT_COUNT
+        for reservation_time, party_size in cursor.fetchall():
+            for slot in reservation_capacity.slot_range(reservation_time):
+                seats[slot] += party_size
+        return seats
+    finally:
+        conn.close()
+
+def stored_occupancy(reservation_date: str) -> list:
+    conn = db_pool.connect()
+    try:
+        return reservation_capacity.day_occupancy(conn.cursor(), reservation_date)
+    finally:
+        conn.close()
+
+def test_concurrent_bookings_never_exceed_capacity(app):
+    import main
+    from fastapi import HTTPException
+
+    reservation_date = (date.today() + timedelta(days=500)).isoformat()
+    results = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def booker(seed: int):
+        rng = random.Random(seed)
+        start.wait()
+        for i in range(BOOKINGS_PER_THREAD):
+            party_size = rng.randint(1, 8)
+            data = main.ReservationCreate(
+                customer_name="Stress",
+                customer_email="stress@example.com",
+                customer_phone="000000000",
+                party_size=party_size,
+                reservation_date=reservation_date,
+                reservation_time=rng.choice(TIMES),
+                notes=f"stress {seed}-{i}",
+            )
+            try:
+                main.create_reservation(data)
+                outcome = "booked"
+            except HTTPException as e:
+                outcome = e.status_code
+            with lock:
+                results[outcome] += 1
+                if outcome == "booked":
+                    results["seats"] += party_size
+
+    threads = [threading.Thread(target=booker, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Hay más demanda que asientos: parte de las reservas debe rechazarse
+    assert results["booked"] > 0
+    assert results[409] > 0
+    assert set(results) <= {"booked", "seats", 409}
+
+    seats = recount(reservation_date)
+    assert max(seats) <= reservation_capacity.SEAT_CAPACITY
+    assert seats == stored_occupancy(reservation_date)
+
+@pytest.fixture
+def busy_pool(fresh_pool, monkeypatch):
+    """Pool sobre una base de datos vacía con un busy_timeout corto"""
+    monkeypatch.setattr(db_pool, "BUSY_TIMEOUT_MS", 50)
+    monkeypatch.setattr(db_pool, "PRAGMAS", tuple(
+        "PRAGMA busy_timeout=50" if pragma.startswith("PRAGMA busy_timeout") else pragma
+        for pragma in db_pool.PRAGMAS
+    ))
+    conn = db_pool.connect()
+    conn.execute("CREATE TABLE counter (value INTEGER)")
+    conn.commit()
+    conn.close()
+    return fresh_pool
+
+@pytest.fixture
+def writer_lock(busy_pool):
+    """Otra conexión con el bloqueo de escritura tomado (como otro worker)"""
+    other = sqlite3.connect(busy_pool.path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    yield other
+    if other.in_transaction:
+        other.execute("ROLLBACK")
+    other.close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(db_pool.time, "sleep", lambda seconds: calls.append(seconds))
+    return calls
+
+def insert(cursor):
+    cursor.execute("INSERT INTO counter (value) VALUES (1)")
+    return "ok"
+
+def test_write_transaction_gives_up_after_its_retries(writer_lock, sleeps):
+    with pytest.raises(db_pool.WriteBusy):
+        db_pool.write_transaction(insert, retries=3)
+    # Una espera entre intentos, ninguna tras el último
+    assert len(sleeps) == 2
+
+def test_write_transaction_retries_until_the_lock_is_free(writer_lock, sleeps, monkeypatch):
+    # La otra transacción termina durante la primera espera
+    monkeypatch.setattr(db_pool.time, "sleep", lambda seconds: (sleeps.append(seconds), writer_lock.execute("COMMIT")))
+    assert db_pool.write_transaction(insert, retries=3) == "ok"
+    assert len(sleeps) == 1
+    conn = db_pool.connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM counter").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+def test_write_transaction_does_not_retry_other_errors(busy_pool, sleeps):
+    calls = []
+
+    def broken(cursor):
+        calls.append(1)
+        cursor.execute("INSERT INTO missing_table VALUES (1)")
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        db_pool.write_transaction(broken, retries=3)
+    assert calls == [1]
+    assert sleeps == []
@@ -0,0 +1,98 @@
+import pytest
+
+import db_pool
+import pagination
+import query_plans
+import reservation_dates
+
+def test_keys():
+    assert reservation_dates.keys("1970-01-02", "00:00") == (1, 0)
+    assert reservation_dates.keys("2025-03-01", "9:30") == (pagination.epoch_day("2025-03-01"), 570)
+    assert reservation_dates.keys("2025-03-01", "13:05") == (pagination.epoch_day("2025-03-01"), 785)
+
+@pytest.mark.parametrize("reservation_date, reservation_time", [
+    ("2025-13-01", "13:00"),
+    ("01/03/2025", "13:00"),
+    (None, "13:00"),
+    ("2025-03-01", "24:00"),
+    ("2025-03-01", "13:60"),
+    ("2025-03-01", "mediodía"),
+    ("2025-03-01", None),
+])
+def test_keys_rejects_invalid_values(reservation_date, reservation_time):
+    with pytest.raises(ValueError):
+        reservation_dates.keys(reservation_date, reservation_time)
+
+@pytest.fixture
+def legacy_reservations(fresh_pool):
+    """Reservas con el esquema anterior: fecha y hora solo como texto"""
+    conn = db_pool.connect()
+    cursor = conn.cursor()
+    cursor.execute(query_plans.RESERVATIONS_TABLE)
+    cursor.executemany(
+        "INSERT INTO reservations (customer_name, customer_email, customer_phone, party_size, "
+        "reservation_date, reservation_time, status) VALUES ('Cliente', 'c@example.com', '600', 2, ?, ?, ?)",
+        [
+            ("2025-03-01", "13:00", "confirmed"),
+            ("2025-03-01", "9:00", "confirmed"),
+            ("2025-03-02", "20:30", "pending"),
+            ("2025-03-05", "12:00", "confirmed"),
+            ("2025-02-28", "21:00", "confirmed"),
+            ("sin fecha", "13:00", "pending"),
+        ]
+    )
+    conn.commit()
+    yield cursor
+    conn.close()
+
+def test_migrate_backfills_existing_reservations(legacy_reservations):
+    cursor = legacy_reservations
+    assert reservation_dates.migrate(cursor) == 5
+
+    cursor.execute("SELECT reservation_date, reservation_time, reservation_day, reservation_minute "
+                   "FROM reservations ORDER BY id")
+    rows = cursor.fetchall()
+    assert rows[0] == ("2025-03-01", "13:00", pagination.epoch_day("2025-03-01"), 780)
+    assert rows[1] == ("2025-03-01", "9:00", pagination.epoch_day("2025-03-01"), 540)
+    # Una fecha ilegible no rompe la migración: se queda sin clave
+    assert rows[5][2:] == (None, None)
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'reservations'")
+    indexes = {row[0] for row in cursor.fetchall()}
+    assert {"idx_reservations_day_status", "idx_reservations_day_minute",
+            "idx_reservations_status_day_minute"} <= indexes
+
+    # Idempotente: solo vuelve a intentar la fila ilegible
+    assert reservation_dates.migrate(cursor) == 0
+
+def test_range_queries_on_integer_columns(legacy_reservations):
+    cursor = legacy_reservations
+    reservation_dates.migrate(cursor)
+
+    filters = pagination.date_filters("reservation_day", "2025-03-01", "2025-03-02")
+    rows, _ = pagination.keyset_page(
+        cursor, "reservations", "reservation_date, reservation_time",
+        ("reservation_day", "reservation_minute"), filters, limit=10, descending=False
+    )
+    # Ambos extremos incluidos y '9:00' antes que '13:00'
+    assert rows == [("2025-03-01", "9:00"), ("2025-03-01", "13:00"), ("2025-03-02", "20:30")]
+
+    cursor.execute('''
+        SELECT reservation_time FROM reservations
+        WHERE reservation_day = ? AND status = 'confirmed'
+        AND reservation_minute >= ? AND reservation_minute < ?
+        ORDER BY reservation_minute
+    ''', (pagination.epoch_day("2025-03-01"), 9 * 60, 13 * 60))
+    assert cursor.fetchall() == [("9:00",)]
+
+def test_set_keys_follows_an_edit(legacy_reservations):
+    cursor = legacy_reservations
+    reservation_dates.migrate(cursor)
+    cursor.execute("UPDATE reservations SET reservation_date = '2025-04-10', reservation_time = '18:30' WHERE id = 1")
+    reservation_dates.set_keys(cursor, 1)
+    cursor.execute("SELECT reservation_day, reservation_minute FROM reservations WHERE id = 1")
+    assert cursor.fetchone() == (pagination.epoch_day("2025-04-10"), 1110)
+
+    cursor.execute("UPDATE reservations SET reservation_time = '25:00' WHERE id = 1")
+    with pytest.raises(ValueError):
+        reservation_dates.set_keys(cursor, 1)
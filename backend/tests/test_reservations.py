@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+
+import reservation_capacity
+
+def future_day(days: int) -> date:
+    return date.today() + timedelta(days=days)
+
+def book(client, reservation_date: str, reservation_time: str = "13:00", party_size: int = 20):
+    return client.post("/reservations", json={
+        "customer_name": "Test",
+        "customer_email": "test@example.com",
+        "customer_phone": "600000000",
+        "party_size": party_size,
+        "reservation_date": reservation_date,
+        "reservation_time": reservation_time,
+    })
+
+def free_seats(client, day: str, reservation_time: str = "13:00") -> int:
+    times = client.get(f"/reservations/availability/{day}").json()["available_times"]
+    return next(slot["seats_available"] for slot in times if slot["time"] == reservation_time)
+
+def test_canonical_date():
+    assert reservation_capacity.canonical_date("2027-01-05") == "2027-01-05"
+    assert reservation_capacity.canonical_date("20270105") == "2027-01-05"
+    for spelling in ("2027-1-5", "2027-01-5", "2027-1-05", "05/01/2027", ""):
+        try:
+            reservation_capacity.canonical_date(spelling)
+        except reservation_capacity.CapacityError:
+            continue
+        raise AssertionError(f"{spelling!r} debería rechazarse")
+
+def test_other_spellings_do_not_bypass_capacity(client):
+    day = future_day(400)
+    assert reservation_capacity.SEAT_CAPACITY == 40
+    assert book(client, day.isoformat()).status_code == 200
+    assert book(client, day.isoformat()).status_code == 200
+
+    for spelling in (f"{day.year}-{day.month}-{day.day}", f"{day.year}-{day.month:02d}-{day.day}"):
+        if spelling != day.isoformat():
+            assert book(client, spelling).status_code == 400
+    # Formato ISO básico: se acepta, pero cuenta para el mismo día (lleno)
+    response = book(client, day.strftime("%Y%m%d"))
+    assert response.status_code == 409
+    assert free_seats(client, day.isoformat()) == 0
+
+def test_canonical_date_is_stored(client):
+    day = future_day(401)
+    response = book(client, day.strftime("%Y%m%d"), party_size=2)
+    assert response.status_code == 200
+    assert response.json()["reservation_date"] == day.isoformat()
+
+def test_edits_are_checked_against_capacity(client, admin_headers):
+    day = future_day(402).isoformat()
+    first = book(client, day).json()["id"]
+    book(client, day)
+    late = book(client, day, "19:00", party_size=10).json()["id"]
+
+    # Mover una reserva a una hora llena
+    response = client.put(f"/admin/reservations/{late}", json={"reservation_time": "13:00"}, headers=admin_headers)
+    assert response.status_code == 409
+    # Ampliar el grupo por encima del aforo
+    book(client, day, "19:00", party_size=20)
+    book(client, day, "19:00", party_size=10)
+    response = client.put(f"/admin/reservations/{late}", json={"party_size": 11}, headers=admin_headers)
+    assert response.status_code == 409
+    assert free_seats(client, day) == 0
+    assert free_seats(client, day, "19:00") == 0
+
+    # Reactivar una cancelada cuando su hueco ya se ha ocupado
+    response = client.put(f"/admin/reservations/{first}/status", json={"status": "cancelled"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert free_seats(client, day) == 20
+    assert book(client, day).status_code == 200
+    response = client.put(f"/admin/reservations/{first}/status", json={"status": "confirmed"}, headers=admin_headers)
+    assert response.status_code == 409
+    assert free_seats(client, day) == 0
+
+    # Los cambios que caben se guardan
+    response = client.put(f"/admin/reservations/{late}", json={"reservation_time": "21:00", "party_size": 12},
+                          headers=admin_headers)
+    assert response.status_code == 200
+    assert free_seats(client, day, "19:00") == 10
+    assert free_seats(client, day, "21:00") == 28
+
+def test_edit_rejects_invalid_date(client, admin_headers):
+    reservation_id = book(client, future_day(403).isoformat(), party_size=2).json()["id"]
+    response = client.put(f"/admin/reservations/{reservation_id}", json={"reservation_date": "2027-1-5"},
+                          headers=admin_headers)
+    assert response.status_code == 400
+    response = client.put("/admin/reservations/999999", json={"notes": "x"}, headers=admin_headers)
+    assert response.status_code == 404
+
+def availability_range(client, date_from: date, date_to: date):
+    return client.get(f"/reservations/availability?from={date_from.isoformat()}&to={date_to.isoformat()}")
+
+def test_availability_range_matches_the_bookings(client):
+    day, next_day = future_day(410), future_day(411)
+    assert availability_range(client, day, next_day).status_code == 200
+
+    assert book(client, day.isoformat(), "13:00", party_size=15).status_code == 200
+    assert book(client, day.isoformat(), "14:00", party_size=10).status_code == 200
+    response = availability_range(client, day, next_day)
+    assert response.status_code == 200
+    matrix = response.json()
+    assert list(matrix["days"]) == [day.isoformat(), next_day.isoformat()]
+    seats = dict(zip(matrix["times"], matrix["days"][day.isoformat()]))
+
+    # Empezar a las 13:00 ocupa hasta las 15:00: se solapa con los dos grupos
+    capacity = reservation_capacity.SEAT_CAPACITY
+    assert (seats["11:00"], seats["12:00"], seats["13:00"], seats["15:00"], seats["16:00"]) == (
+        capacity, capacity - 15, capacity - 25, capacity - 10, capacity)
+    assert matrix["days"][next_day.isoformat()] == [capacity] * len(matrix["times"])
+    # Los mismos asientos libres que la consulta de un solo día
+    assert seats == {slot["time"]: slot["seats_available"]
+                     for slot in client.get(f"/reservations/availability/{day.isoformat()}").json()["available_times"]}
+
+def test_availability_range_is_validated(client):
+    day = future_day(420)
+    last = day + timedelta(days=reservation_capacity.MAX_RANGE_DAYS - 1)
+    response = availability_range(client, day, last)
+    assert response.status_code == 200
+    assert len(response.json()["days"]) == reservation_capacity.MAX_RANGE_DAYS
+
+    assert availability_range(client, day, last + timedelta(days=1)).status_code == 422
+    assert availability_range(client, day, day - timedelta(days=1)).status_code == 422
+    assert client.get("/reservations/availability?from=05/01/2027").status_code == 422
+    # Sin fechas: desde hoy, 31 días
+    assert len(client.get("/reservations/availability").json()["days"]) == 31
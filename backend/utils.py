@@ -1,9 +1,14 @@
 """
 Funciones de utilidades para el backend
 """
+from sqlalchemy import func, tuple_, DateTime
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from database import AdminNotification
+from database import AdminNotification, NotificationCounter
+from datetime import datetime
 import json
+import pagination
 import smtplib
 import os
 from email.mime.text import MIMEText
@@ -23,6 +28,7 @@ def create_admin_notification(db: Session, notification_type: str, title: str, m
             is_read=False
         )
         db.add(notification)
+        adjust_notification_counter(db, notification_type, 1)
         db.commit()
         print(f"✅ Notificación creada: {title}")
         return notification
@@ -31,25 +37,62 @@ def create_admin_notification(db: Session, notification_type: str, title: str, m
         db.rollback()
         return None
 
+def adjust_notification_counter(db: Session, notification_type: str, delta: int):
+    """
+    Sumar delta a los no leídos de un tipo dentro de la transacción de la sesión.
+    Un solo INSERT ... ON CONFLICT DO UPDATE (SQLite y PostgreSQL): dos
+    sesiones que crean el primer contador de un tipo a la vez no chocan.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert, clamp = postgresql_insert, func.greatest
+    else:
+        insert, clamp = sqlite_insert, func.max
+    statement = insert(NotificationCounter).values(type=notification_type, unread=max(delta, 0))
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[NotificationCounter.type],
+        set_={"unread": clamp(NotificationCounter.unread + delta, 0)}
+    ))
+
 def get_unread_notifications_count(db: Session) -> Dict[str, int]:
     """
-    Obtener el conteo de notificaciones no leídas por tipo
+    Obtener el conteo de notificaciones no leídas por tipo (desde notification_counters)
     """
     try:
-        # Conteo por tipo
-        notifications = db.query(AdminNotification).filter(AdminNotification.is_read == False).all()
-        
-        counts = {}
-        for notif in notifications:
-            if notif.type not in counts:
-                counts[notif.type] = 0
-            counts[notif.type] += 1
-        
-        return counts
+        counters = db.query(NotificationCounter).filter(NotificationCounter.unread > 0).all()
+        return {counter.type: counter.unread for counter in counters}
     except Exception as e:
         print(f"❌ Error obteniendo conteos: {e}")
         return {}
 
+def reconcile_notification_counters(db: Session) -> Dict[str, tuple]:
+    """
+    Recalcular notification_counters desde admin_notifications.
+    Devuelve los tipos corregidos como {tipo: (antes, después)}
+    """
+    before = {counter.type: counter.unread for counter in db.query(NotificationCounter).all()}
+    after = dict(
+        db.query(AdminNotification.type, func.count(AdminNotification.id))
+        .filter(AdminNotification.is_read == False)
+        .group_by(AdminNotification.type)
+        .all()
+    )
+    
+    changes = {}
+    for notification_type in set(before) | set(after):
+        old, new = before.get(notification_type, 0), after.get(notification_type, 0)
+        if old == new:
+            continue
+        changes[notification_type] = (old, new)
+        if notification_type in before:
+            db.query(NotificationCounter).filter(
+                NotificationCounter.type == notification_type
+            ).update({NotificationCounter.unread: new}, synchronize_session=False)
+        else:
+            db.add(NotificationCounter(type=notification_type, unread=new))
+    db.commit()
+    return changes
+
 def send_email(to_email: str, subject: str, body: str, is_html: bool = False):
     """
     Enviar email usando SMTP o simular envío si no hay credenciales
@@ -98,3 +141,33 @@ def deserialize_json(json_str: str, default=None):
         return json.loads(json_str) if json_str else default
     except Exception:
         return default or []
+
+def paginate_query(query, sort_columns: tuple, id_column, after: str = None, limit: int = 50, descending: bool = True):
+    """
+    Página de una consulta ordenada por sort_columns + id con cursor opaco
+    (el mismo formato que pagination.keyset_page). Devuelve (filas, cursor
+    siguiente o None); lanza pagination.InvalidCursor si el cursor no es válido.
+    """
+    key = tuple(sort_columns) + (id_column,)
+    if after:
+        values = pagination.decode_cursor(after, len(key))
+        try:
+            values = [
+                datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value else value
+                for column, value in zip(key, values)
+            ]
+        except (TypeError, ValueError):
+            raise pagination.InvalidCursor("Cursor no válido")
+        query = query.filter(tuple_(*key) < tuple_(*values) if descending else tuple_(*key) > tuple_(*values))
+    
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in key])
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = pagination.encode_cursor(tuple(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (getattr(last, column.key) for column in key)
+        ))
+    return rows, next_cursor
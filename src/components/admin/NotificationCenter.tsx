@@ -42,10 +42,77 @@ const NotificationCenter: React.FC<NotificationCenterProps> = ({ token }) => {
 
   useEffect(() => {
     fetchUnreadCounts();
-    // Actualizar cada 30 segundos
-    const interval = setInterval(fetchUnreadCounts, 30000);
-    return () => clearInterval(interval);
-  }, []);
+
+    // Sin soporte de EventSource: actualizar cada 30 segundos
+    if (typeof EventSource === 'undefined') {
+      const interval = setInterval(fetchUnreadCounts, 30000);
+      return () => clearInterval(interval);
+    }
+
+    // Notificaciones en tiempo real; el navegador reconecta solo y el
+    // servidor reenvía lo perdido gracias a Last-Event-ID. EventSource no
+    // envía cabeceras: la URL lleva un ticket de corta duración, no el token
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+    // Un EventSource nuevo no envía Last-Event-ID: se pasa en la URL
+    let lastEventId: string | null = null;
+
+    const connect = async () => {
+      try {
+        const response = await axios.post(`${API_URL}/admin/notifications/stream-ticket`, {}, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (closed) return;
+        source = new EventSource(
+          `${API_URL}/admin/notifications/stream?ticket=${encodeURIComponent(response.data.ticket)}` +
+          (lastEventId ? `&last_event_id=${lastEventId}` : '')
+        );
+        listen(source);
+      } catch (error) {
+        console.error('Error opening notification stream:', error);
+        if (!closed) retry = setTimeout(connect, 30000);
+      }
+    };
+
+    const listen = (source: EventSource) => {
+      source.addEventListener('notification', (event) => {
+        const notification: Notification = JSON.parse((event as MessageEvent).data);
+        lastEventId = (event as MessageEvent).lastEventId || lastEventId;
+        // Si la lista aún no se ha cargado se pedirá completa al abrir el panel
+        setNotifications(prev =>
+          prev.length === 0 || prev.some(n => n.id === notification.id) ? prev : [notification, ...prev]
+        );
+        if (!notification.is_read) {
+          setUnreadCounts(prev => ({
+            total_unread: prev.total_unread + 1,
+            by_type: { ...prev.by_type, [notification.type]: (prev.by_type[notification.type] || 0) + 1 }
+          }));
+        }
+      });
+
+      // El servidor pide recargar si se han perdido eventos
+      source.addEventListener('sync', () => {
+        fetchUnreadCounts();
+        fetchNotifications();
+      });
+
+      // Con el ticket caducado la reconexión automática falla: pedir otro
+      source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retry = setTimeout(connect, 3000);
+        }
+      });
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      if (retry) clearTimeout(retry);
+      source?.close();
+    };
+  }, [token]);
 
   const fetchNotifications = async () => {
     setLoading(true);
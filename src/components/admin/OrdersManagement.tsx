@@ -10,7 +10,8 @@ import {
   FaPhone,
   FaEnvelope,
   FaCalendarAlt,
-  FaEuroSign
+  FaEuroSign,
+  FaDownload
 } from 'react-icons/fa';
 import axios from 'axios';
 import toast from 'react-hot-toast';
@@ -138,6 +139,28 @@ const OrdersManagement: React.FC<OrdersManagementProps> = ({ token }) => {
     }
   };
 
+  const exportOrders = async () => {
+    try {
+      // El servidor genera el CSV en streaming con todos los pedidos
+      const response = await axios.get(`${API_URL}/admin/export/orders`, {
+        params: { format: 'csv' },
+        headers: {
+          'Authorization': `Bearer ${token}`
+        },
+        responseType: 'blob'
+      });
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `pedidos-${new Date().toISOString().slice(0, 10)}.csv`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error: any) {
+      console.error('Error exporting orders:', error);
+      toast.error('Error al exportar los pedidos');
+    }
+  };
+
   const getStatusColor = (status: string) => {
     const option = statusOptions.find(opt => opt.value === status);
     return option ? option.color : 'bg-gray-500';
@@ -186,6 +209,13 @@ const OrdersManagement: React.FC<OrdersManagementProps> = ({ token }) => {
             <FaShoppingCart className="mr-3" />
             Gestión de Pedidos
           </h2>
+          <button
+            onClick={exportOrders}
+            className="flex items-center px-4 py-2 bg-coffee-600 text-white rounded-lg hover:bg-coffee-700 transition-colors"
+          >
+            <FaDownload className="mr-2" />
+            Exportar CSV
+          </button>
         </div>
 
         {/* Stats Cards */}
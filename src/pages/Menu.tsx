@@ -95,7 +95,9 @@ const Menu: React.FC = () => {
     },
     onError: (error: any) => {
       console.error('Error creando pedido:', error);
-      alert('Error al crear el pedido. Por favor intenta de nuevo.');
+      // Los errores 400 (producto no disponible, precio cambiado) traen el motivo
+      const detail = error.response?.status === 400 ? error.response.data?.detail : null;
+      alert(detail || 'Error al crear el pedido. Por favor intenta de nuevo.');
     }
   });
 
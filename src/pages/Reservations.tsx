@@ -28,7 +28,15 @@ interface ReservationCreate {
 interface AvailabilitySlot {
   time: string;
   available: boolean;
-  current_reservations: number;
+  seats_available: number;
+}
+
+interface AvailabilityRange {
+  from: string;
+  to: string;
+  seat_capacity: number;
+  times: string[];
+  days: Record<string, number[]>;
 }
 
 const API_BASE = API_URL;
@@ -53,15 +61,31 @@ const Reservations: React.FC = () => {
     setReservationForm(prev => ({ ...prev, reservation_date: today }));
   }, []);
 
-  // Query para obtener disponibilidad
+  const getMinDate = () => {
+    return new Date().toISOString().split('T')[0];
+  };
+
+  const getMaxDate = () => {
+    const maxDate = new Date();
+    maxDate.setDate(maxDate.getDate() + 60); // 60 días en el futuro
+    return maxDate.toISOString().split('T')[0];
+  };
+
+  // Disponibilidad de todo el rango reservable en una sola petición
   const { data: availability, isLoading: loadingAvailability } = useQuery({
-    queryKey: ['availability', selectedDate],
+    queryKey: ['availability', getMinDate(), getMaxDate()],
     queryFn: async () => {
-      if (!selectedDate) return null;
-      const response = await axios.get(`${API_BASE}/reservations/availability/${selectedDate}`);
+      const response = await axios.get<AvailabilityRange>(`${API_BASE}/reservations/availability`, {
+        params: { from: getMinDate(), to: getMaxDate() }
+      });
       return response.data;
     },
-    enabled: !!selectedDate,
+  });
+
+  // Horas del día seleccionado para el tamaño de grupo elegido
+  const availableTimes: AvailabilitySlot[] = (availability?.times ?? []).map((time, index) => {
+    const seats = availability?.days[selectedDate]?.[index] ?? 0;
+    return { time, available: seats >= reservationForm.party_size, seats_available: seats };
   });
 
   // Mutación para crear reserva
@@ -136,16 +160,6 @@ const Reservations: React.FC = () => {
     setReservationForm(prev => ({ ...prev, reservation_time: time }));
   };
 
-  const getMinDate = () => {
-    return new Date().toISOString().split('T')[0];
-  };
-
-  const getMaxDate = () => {
-    const maxDate = new Date();
-    maxDate.setDate(maxDate.getDate() + 60); // 60 días en el futuro
-    return maxDate.toISOString().split('T')[0];
-  };
-
   return (
     <div className="min-h-screen bg-cream-50">
       {/* Header */}
@@ -285,7 +299,7 @@ const Reservations: React.FC = () => {
                     ) : (
                       <div className="max-h-32 overflow-y-auto border border-coffee-200 rounded-lg p-2">
                         <div className="grid grid-cols-3 gap-2">
-                          {availability?.available_times?.map((slot: AvailabilitySlot) => (
+                          {availableTimes.map((slot) => (
                             <button
                               key={slot.time}
                               type="button"